@@ -1,15 +1,148 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class Settings(BaseSettings):
-    OPENAI_API_KEY: str
-    VALYU_API_KEY: str
+    # Credentials are optional at import time; each service checks the keys it
+    # needs when it is first used, so the app boots without voice configured.
+    OPENAI_API_KEY: Optional[str] = None
+    VALYU_API_KEY: Optional[str] = None
     VALYU_API_BASE_URL: str = "https://api.valyu.ai"
-    LIVEKIT_API_KEY: str
-    LIVEKIT_API_SECRET: str
-    LIVEKIT_URL: str
+    LIVEKIT_API_KEY: Optional[str] = None
+    LIVEKIT_API_SECRET: Optional[str] = None
+    LIVEKIT_URL: Optional[str] = None
+    LIVEKIT_TOKEN_TTL_SECONDS: int = 3600
+    LIVEKIT_TOKEN_REFRESH_MARGIN_SECONDS: int = 300  # Re-mint cached tokens this close to expiry
+
+    # Bid latency bounds (seconds). A request may ask for a shorter deadline.
+    BID_DEADLINE_SECONDS: float = 45.0
+    SEARCH_STAGE_BUDGET_SECONDS: float = 12.0
+    LABOUR_RATE_STAGE_BUDGET_SECONDS: float = 6.0
+    CONTEXT_STAGE_BUDGET_SECONDS: float = 10.0
+    ESTIMATION_STAGE_BUDGET_SECONDS: float = 10.0
+    GENERATION_STAGE_BUDGET_SECONDS: float = 15.0
+
+    # Start estimation from the heuristic context while LLM extraction runs;
+    # the result is kept when the fields the estimator uses come out the same
+    SPECULATIVE_ESTIMATION: bool = False
+
+    # Record every bid's upstream traffic to CASSETTE_DIR/<bid_id>.cassette.json.gz
+    CASSETTE_RECORD: bool = False
+    CASSETTE_DIR: str = "cassettes"
+
+    # Rolling conversation memory per WebSocket coaching session (estimated tokens)
+    COACH_MEMORY_TOKENS: int = 1500
+    # Coaching sessions kept for reconnecting clients: at most this many, least recently
+    # used evicted first, each dropped after this long without a turn
+    COACH_SESSION_MAX_ENTRIES: int = 1000
+    COACH_SESSION_IDLE_SECONDS: float = 1800.0
+
+    # Upstream resilience (circuit breakers and adaptive concurrency limits)
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_SECONDS: float = 30.0
+    UPSTREAM_MAX_RETRIES: int = 2
+    OPENAI_CONCURRENCY_LIMIT: int = 16
+    OPENAI_LATENCY_TARGET_SECONDS: float = 10.0
+    VALYU_CONCURRENCY_LIMIT: int = 8
+    VALYU_LATENCY_TARGET_SECONDS: float = 5.0
+
+    # Market stats come from competitor prices found in the market search when at least
+    # MARKET_PRICE_MIN_SAMPLES survive outlier filtering
+    MARKET_PRICE_MIN_SAMPLES: int = 5
+    # Otherwise they come from earlier bids of the same job type (and postcode area when it has
+    # enough) once MARKET_STATS_MIN_SAMPLES bids have been priced; until then they are simulated
+    MARKET_STATS_MIN_SAMPLES: int = 30
+    MARKET_SKETCH_COMPRESSION: int = 100
+
+    # Admission in front of POST /bids (see app/services/admission.py). CLIENT_API_KEYS maps
+    # API keys to client ids; without it, an X-API-Key or X-Client-Id naming a CLIENT_LIMITS
+    # entry is trusted as sent. All other clients share the "other" limits. CLIENT_LIMITS
+    # overrides the defaults per client, e.g.
+    # CLIENT_LIMITS='{"estimators": {"weight": 4, "rate_per_minute": 240}}'
+    ADMISSION_CONCURRENT_BIDS: int = 8
+    ADMISSION_MAX_QUEUED: int = 200
+    CLIENT_RATE_PER_MINUTE: float = 60.0
+    CLIENT_BURST: int = 20
+    CLIENT_WEIGHT: float = 1.0
+    CLIENT_LIMITS: Dict[str, Dict[str, float]] = {}
+    CLIENT_API_KEYS: Dict[str, str] = {}
+
+    # Duplicate POST /bids join the bid in flight or get the stored bid back (see
+    # app/services/idempotency.py): by Idempotency-Key for IDEMPOTENCY_KEY_TTL_SECONDS,
+    # or without a key by normalized request content for BID_CONTENT_DEDUPE_SECONDS
+    # (0, the default, disables it; never applied to anonymous or unconfigured clients)
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 3600.0
+    BID_CONTENT_DEDUPE_SECONDS: float = 0.0
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+
+    # Logging (see app/utils/structured_logging.py): JSON lines, or "text", written by a
+    # background thread from a queue of LOG_QUEUE_SIZE records (further records are dropped).
+    # Each call site may log LOG_RATE_PER_SECOND records with bursts of LOG_BURST;
+    # LOG_SAMPLE_RATES keeps a fraction of a logger's debug/info records,
+    # e.g. LOG_SAMPLE_RATES='{"app.services.valyu_client": 0.2}'
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_RATE_PER_SECOND: float = 20.0
+    LOG_BURST: int = 100
+    LOG_SAMPLE_RATES: Dict[str, float] = {}
+
+    # Event-loop monitor (see app/utils/loop_monitor.py): a watchdog thread probes the loop every
+    # LOOP_MONITOR_INTERVAL_SECONDS (lag in event_loop.lag); a probe still waiting after
+    # LOOP_BLOCK_THRESHOLD_MS captures the stack of the blocking call for GET /admin/event-loop.
+    # LOOP_MONITOR_DEBUG also logs each stack with its route and bid id.
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.25
+    LOOP_BLOCK_THRESHOLD_MS: float = 100.0
+    LOOP_MONITOR_DEBUG: bool = False
+
+    # /admin endpoints need an X-Admin-Token header equal to ADMIN_TOKEN; they are
+    # disabled (403) while no token is configured
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Opt-in profiling (see app/utils/profiler.py): with PROFILING_ENABLED and PROFILING_TOKEN set,
+    # a request sent with an X-Profile header or ?profile= equal to PROFILING_TOKEN is sampled
+    # every PROFILE_INTERVAL_MS and kept for GET /admin/profiles. Without a token it stays off.
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILE_INTERVAL_MS: float = 1.0
+    PROFILE_MAX_CONCURRENT: int = 2
+    PROFILE_MAX_STORED: int = 20
+
+    # Resolved property contexts are reused for repeat jobs on the same address
+    PROPERTY_CACHE_FRESHNESS_DAYS: float = 30.0
+    PROPERTY_CACHE_MAX_ENTRIES: int = 10000
+
+    # Background warming of market and labour rate caches (see app/services/prefetch.py).
+    # Targets are "Region" or "Region:District" entries; empty means the most frequent in recent bids.
+    PREFETCH_ENABLED: bool = False
+    PREFETCH_INTERVAL_SECONDS: float = 300.0
+    PREFETCH_TARGETS: List[str] = []
+    PREFETCH_TOP_TARGETS: int = 10
+    PREFETCH_MAX_REQUESTS_PER_HOUR: int = 120
+    PREFETCH_REFRESH_MARGIN_MINUTES: float = 60.0
+    PREFETCH_PAUSE_IN_FLIGHT_BIDS: int = 2
+    PREFETCH_PAUSE_UTILIZATION: float = 0.5
+
+    # Skip the LLM extraction call when the local extractor finds every required
+    # field with at least LOCAL_EXTRACTION_CONFIDENCE; fields below
+    # LOCAL_EXTRACTION_MIN_CONFIDENCE are never used
+    LOCAL_EXTRACTION_SKIP_LLM: bool = True
+    LOCAL_EXTRACTION_CONFIDENCE: float = 0.8
+    LOCAL_EXTRACTION_MIN_CONFIDENCE: float = 0.5
+    LOCAL_EXTRACTION_REQUIRED_FIELDS: List[str] = ["property_type", "property_year_built", "number_of_bedrooms"]
+
+    # Per-task LLM route overrides, e.g. LLM_ROUTES='{"proposal": {"model": "gpt-4o", "max_tokens": 1200}}'
+    # Tasks: dossier, explanation, proposal, followups, estimation, extraction, coaching
+    LLM_ROUTES: Dict[str, Dict[str, Any]] = {}
+    # Switch a task to its fallback model while its recent p95 exceeds the route's latency budget
+    LLM_LATENCY_ROUTING: bool = False
+    LLM_LATENCY_MIN_SAMPLES: int = 20
 
     class Config:
         env_file = ".env"
 
+    @property
+    def livekit_enabled(self) -> bool:
+        return bool(self.LIVEKIT_API_KEY and self.LIVEKIT_API_SECRET and self.LIVEKIT_URL)
+
 settings = Settings()
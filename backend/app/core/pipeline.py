@@ -1,16 +1,64 @@
 import uuid
 import time
+import asyncio
 import logging
-from app.models.schemas import CreateBidRequest, BidResponse
+import weakref
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from app.config import settings
+from app.models.schemas import (
+    CreateBidRequest, UpdateBidRequest, BidResponse, FollowUpScripts, PropertyContext, PricingOutput, PricePoint
+)
 from app.models.entities import BidSession, bid_store
 from app.services.valyu_client import ValyuClient
 from app.services.context_optimizer import ContextOptimizer
+from app.services.property_extractor import Extraction
 from app.services.pricing_engine import PricingEngine
-from app.services.llm_client import LLMClient
+from app.services.llm_client import LLMClient, DEGRADED_TEXT, estimation_inputs
 from app.services.regional_rates import get_regional_labour_rate
+from app.services.coaching_session import coaching_sessions
+from app.services.narrative import narrative_renderer
+from app.services.market_aggregates import market_aggregates
+from app.services.price_points import extract_price_points, market_stats_from_points
+from app.services.property_context_cache import property_context_cache
+from app.services.prefetch import bid_traffic
+from app.utils.deadline import Deadline, current_deadline, run_with_budget
+from app.utils.cassette import Cassette, current_cassette, cassette_path
+from app.utils.metrics import metrics
+from app.utils.profiler import label_profile
+from app.utils.structured_logging import current_bid_id
+from app.utils.token_usage import TokenLedger, current_ledger, bid_token_usage
 
 logger = logging.getLogger(__name__)
 
+GENERATION_STAGES = ("dossier", "pricing_explanation", "proposal", "followups")
+
+# Pipeline outputs that depend on each input PATCH /bids/{bid_id} may change.
+# Property context, labour rate and search results depend only on address,
+# region and job type, which cannot be patched. Narratives refer to figures
+# through placeholders, so a price change only re-renders them.
+_JOB_TEXTS = {"estimation", "pricing", "dossier", "proposal", "followups"}
+PATCH_DEPENDENCIES = {
+    "desired_margin_percent": {"pricing"},
+    "urgency": {"estimation", "pricing"},
+    "notes": {"proposal"},
+    "job_description": _JOB_TEXTS,
+    "scope_of_work": _JOB_TEXTS,
+    "known_issues": _JOB_TEXTS,
+    "complications": _JOB_TEXTS,
+}
+
+# One lock per bid being re-priced, so concurrent PATCHes apply in turn
+# instead of each overwriting the other's revision. Entries disappear once
+# no request holds or waits on the lock.
+_reprice_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+class InvalidBidChanges(ValueError):
+    """The requested changes would leave the bid without a required input"""
+
+class RepriceUnavailable(Exception):
+    """The bid was stored without the pipeline inputs re-pricing needs"""
+
 class BidPipeline:
     def __init__(self):
         self.valyu = ValyuClient()
@@ -18,86 +66,366 @@ class BidPipeline:
         self.pricing = PricingEngine()
         self.llm = LLMClient()
 
-    async def run_full_bid(self, request: CreateBidRequest) -> BidResponse:
+    async def run_full_bid(self, request: CreateBidRequest, cassette: Optional[Cassette] = None) -> BidResponse:
+        """
+        Run the whole bid pipeline.
+
+        Pass a replay cassette to serve every upstream call from a recording
+        instead of Valyu/OpenAI. With CASSETTE_RECORD enabled, a new cassette
+        is recorded and saved under CASSETTE_DIR.
+        """
+        if cassette is None and settings.CASSETTE_RECORD:
+            cassette = Cassette("record")
+
+        # Every stage below reads this deadline, so the bid has a hard upper bound on latency
+        deadline = Deadline(request.deadline_seconds or settings.BID_DEADLINE_SECONDS)
+        deadline_token = current_deadline.set(deadline)
+        cassette_token = current_cassette.set(cassette)
+        ledger = TokenLedger()
+        ledger_token = current_ledger.set(ledger)
+        bid_id_token = current_bid_id.set(None)
+        start_time = time.time()
+        try:
+            with bid_traffic.track(request):
+                response = await self._run_stages(request, deadline)
+        finally:
+            current_bid_id.reset(bid_id_token)
+            current_ledger.reset(ledger_token)
+            current_cassette.reset(cassette_token)
+            current_deadline.reset(deadline_token)
+        bid_token_usage.record(response.bid_id, ledger)
+
+        if cassette is not None and cassette.mode == "record":
+            cassette.meta = {
+                "bid_id": response.bid_id,
+                "request": request.model_dump(),
+                "recorded_at": datetime.now(timezone.utc).isoformat(),
+                "elapsed_seconds": round(time.time() - start_time, 3),
+                "result": {
+                    "internal_cost_estimate": response.pricing.internal_cost_estimate,
+                    "balanced": response.pricing.price_bands.balanced,
+                    "degraded_stages": response.degraded_stages
+                }
+            }
+            path = cassette_path(settings.CASSETTE_DIR, response.bid_id)
+            await asyncio.to_thread(cassette.save, path)
+            logger.info("Recorded %d upstream calls to %s", sum(len(v) for v in cassette.calls.values()), path, extra={"bid_id": response.bid_id})
+
+        return response
+
+    async def _run_stages(self, request: CreateBidRequest, deadline: Deadline) -> BidResponse:
         start_time = time.time()
         bid_id = str(uuid.uuid4())
-        
-        logger.info(f"[{bid_id}] Starting bid generation for {request.address}")
-        
-        # 1. Multiple Valyu Searches in parallel
-        import asyncio
-        
+        # Log records and any profile of this bid carry its id from here on
+        current_bid_id.set(bid_id)
+        label_profile(bid_id)
+
+        logger.info("Starting bid generation for %s (deadline %.1fs)", request.address, deadline.seconds)
+
+        # Repeat jobs on a known property reuse its resolved context and search results
+        # (bypassed while recording/replaying so the cassette holds the searches)
+        cached = property_context_cache.get(request.address) if current_cassette.get() is None else None
+
+        # 1. Multiple Valyu Searches in parallel (no property search on a cache hit)
         step_start = time.time()
-        property_results, market_results = await asyncio.gather(
-            self.valyu.search_property_details(request.address, request.region),
-            self.valyu.search_market_rates(request.region, request.job_type)
+        market_search = run_with_budget(
+            "market_search",
+            lambda: self.valyu.search_market_rates(request.region, request.job_type),
+            settings.SEARCH_STAGE_BUDGET_SECONDS,
+            fallback=list
         )
-        logger.info(f"[{bid_id}] Valyu searches completed in {time.time() - step_start:.2f}s")
-        
+        if cached:
+            property_results, market_results = cached[1], await market_search
+        else:
+            property_results, market_results = await asyncio.gather(
+                run_with_budget(
+                    "property_search",
+                    lambda: self.valyu.search_property_details(request.address, request.region),
+                    settings.SEARCH_STAGE_BUDGET_SECONDS,
+                    fallback=list
+                ),
+                market_search
+            )
+        logger.info("Valyu searches completed in %.2fs", time.time() - step_start)
+
         # Combine results for context optimization
         raw_results = property_results + market_results
-        
+        price_points = extract_price_points(market_results)
+
         # 2. Detect labour rate (with caching)
         step_start = time.time()
         # Pass address to get more localized rates
-        labour_rate = await self.valyu.search_labour_rates(request.region, request.job_type, address=request.address)
-        
+        labour_rate = await run_with_budget(
+            "labour_rate",
+            lambda: self.valyu.search_labour_rates(request.region, request.job_type, address=request.address),
+            settings.LABOUR_RATE_STAGE_BUDGET_SECONDS,
+            fallback=lambda: None
+        )
+
         if not labour_rate:
             # Use regional default based on address/postcode
             labour_rate = get_regional_labour_rate(request.address, request.region)
-            logger.info(f"[{bid_id}] Using regional default labour rate: £{labour_rate}/hr")
+            logger.info("Using regional default labour rate: £%s/hr", labour_rate)
         else:
-            logger.info(f"[{bid_id}] Detected labour rate: £{labour_rate}/hr in {time.time() - step_start:.2f}s")
+            logger.info("Detected labour rate: £%s/hr in %.2fs", labour_rate, time.time() - step_start)
 
-        # 3. Context Optimization
-        step_start = time.time()
-        job_info = request.model_dump()
-        context = await self.optimizer.optimize(raw_results, job_info)
-        context.detected_labour_rate = labour_rate
-        logger.info(f"[{bid_id}] Context optimization completed in {time.time() - step_start:.2f}s")
+        # 3-4. Context Optimization and AI Estimation
+        job_info = request.model_dump(exclude={"deadline_seconds"})
+        if cached:
+            context = cached[0]
+            logger.info("Reusing cached property context for %s", request.address)
 
-        # 4. AI Estimation
-        step_start = time.time()
-        estimates = await self.llm.estimate_job_parameters(context, job_info)
-        logger.info(f"[{bid_id}] AI estimation completed in {time.time() - step_start:.2f}s")
+            step_start = time.time()
+            estimates = await self._estimate(context, job_info)
+            logger.info("AI estimation completed in %.2fs", time.time() - step_start)
+        elif settings.SPECULATIVE_ESTIMATION:
+            context, estimates = await self._speculative_context_and_estimates(raw_results, job_info)
+        else:
+            step_start = time.time()
+            context = await self._optimize_context(raw_results, job_info)
+            logger.info("Context optimization completed in %.2fs", time.time() - step_start)
+
+            step_start = time.time()
+            estimates = await self._estimate(context, job_info)
+            logger.info("AI estimation completed in %.2fs", time.time() - step_start)
+
+        # Only cache contexts resolved from a completed property search
+        if not cached and current_cassette.get() is None and property_results and not {"property_search", "context"} & set(deadline.degraded_stages):
+            property_context_cache.set(request.address, context, property_results)
+        context.detected_labour_rate = labour_rate
 
         # 5. Pricing Engine
-        pricing_output = self.pricing.calculate_pricing(
-            context, 
-            request.job_type, 
-            labour_rate,  # Use detected labour rate
-            request.desired_margin_percent,
-            estimates.get("base_hours", 0),
-            estimates.get("materials_cost", 0),
-            urgency=request.urgency or "medium"
-        )
+        pricing_output = self._price(context, request, labour_rate, estimates, price_points)
 
         # 6. LLM Generations (parallel execution for speed)
         step_start = time.time()
-        dossier, explanation, proposal, followups = await asyncio.gather(
-            self.llm.generate_dossier(context, job_info),
-            self.llm.generate_pricing_explanation(context, pricing_output),
-            self.llm.generate_proposal(context, pricing_output, job_info, request.notes or ""),
-            self.llm.generate_followups(context, pricing_output, job_info)
-        )
-        logger.info(f"[{bid_id}] LLM generations completed in {time.time() - step_start:.2f}s (parallel)")
+        templates = await self._generate_texts(GENERATION_STAGES, context, job_info, request.notes or "")
+        texts = narrative_renderer.render_sections(bid_id, 1, templates, pricing_output, labour_rate)
+        logger.info("LLM generations completed in %.2fs (parallel)", time.time() - step_start)
+
+        if deadline.degraded_stages:
+            logger.warning("Degraded stages: %s", ", ".join(deadline.degraded_stages))
 
         # 7. Construct Response
         response = BidResponse(
             bid_id=bid_id,
             property_context=context,
             pricing=pricing_output,
-            dossier_text=dossier,
-            pricing_explanation=explanation,
-            proposal_draft=proposal,
-            followup=followups,
-            raw_valyu_results=raw_results
+            dossier_text=texts["dossier"],
+            pricing_explanation=texts["pricing_explanation"],
+            proposal_draft=texts["proposal"],
+            followup=texts["followups"],
+            raw_valyu_results=raw_results,
+            degraded_stages=list(deadline.degraded_stages)
         )
 
-        # 8. Store
-        bid_store[bid_id] = BidSession(id=bid_id, data=response)
-        
+        # 8. Store (with the inputs PATCH /bids/{bid_id} needs to re-price incrementally)
+        bid_store[bid_id] = BidSession(
+            id=bid_id, data=response, request=request, estimates=estimates, templates=templates, price_points=price_points
+        )
+        # Feed the market distributions (not from replays, or from bids priced on fallback estimates)
+        if current_cassette.get() is None and "estimation" not in deadline.degraded_stages:
+            market_aggregates.record(request.job_type, request.address, pricing_output, labour_rate)
+
         total_time = time.time() - start_time
-        logger.info(f"[{bid_id}] Bid generation completed in {total_time:.2f}s")
+        logger.info("Bid generation completed in %.2fs", total_time)
+
+        return response
+
+    async def reprice_bid(self, bid_id: str, changes: UpdateBidRequest) -> BidResponse:
+        """
+        Apply changed inputs to a stored bid and recompute only what depends on them.
+
+        Stored context, labour rate and (where still valid) estimates are reused.
+        The stored bid is replaced with the new revision. Re-pricings of the
+        same bid run one at a time, each starting from the previous revision.
+
+        Raises:
+            KeyError: Unknown bid
+            InvalidBidChanges: A required input was cleared
+            RepriceUnavailable: The bid was stored without its pipeline inputs
+        """
+        # Fields sent as null are cleared, except those every bid must have
+        updates = changes.model_dump(exclude_unset=True)
+        required = [field for field, value in updates.items() if value is None and CreateBidRequest.model_fields[field].is_required()]
+        if required:
+            raise InvalidBidChanges(f"{', '.join(required)} cannot be cleared")
+
+        lock = _reprice_locks.get(bid_id)
+        if lock is None:
+            lock = _reprice_locks[bid_id] = asyncio.Lock()
+        async with lock:
+            return await self._reprice(bid_id, updates)
+
+    async def _reprice(self, bid_id: str, updates: Dict[str, Any]) -> BidResponse:
+        session = bid_store.get(bid_id)
+        if session is None:
+            raise KeyError(bid_id)
+        if session.request is None or session.estimates is None:
+            raise RepriceUnavailable("Bid was stored without its pipeline inputs and cannot be re-priced")
+
+        request = session.request.model_copy(update=updates)
+        previous = session.data
+        stale = set().union(*(PATCH_DEPENDENCIES[field] for field in updates)) if updates else set()
+        if "pricing" in stale:
+            # Sections stored as plain text (no template) cannot be re-rendered
+            stale |= set(GENERATION_STAGES) - set(session.templates)
 
+        deadline = Deadline(request.deadline_seconds or settings.BID_DEADLINE_SECONDS)
+        token = current_deadline.set(deadline)
+        ledger = TokenLedger()
+        ledger_token = current_ledger.set(ledger)
+        bid_id_token = current_bid_id.set(bid_id)
+        try:
+            start_time = time.time()
+            context = previous.property_context
+            labour_rate = context.detected_labour_rate or get_regional_labour_rate(request.address, request.region)
+            job_info = request.model_dump(exclude={"deadline_seconds"})
+
+            estimates = session.estimates
+            if "estimation" in stale:
+                estimates = await self._estimate(context, job_info)
+
+            pricing_output = self._price(context, request, labour_rate, estimates, session.price_points) if "pricing" in stale else previous.pricing
+            templates = dict(session.templates)
+            templates.update(await self._generate_texts(stale, context, job_info, request.notes or ""))
+        finally:
+            current_bid_id.reset(bid_id_token)
+            current_ledger.reset(ledger_token)
+            current_deadline.reset(token)
+        bid_token_usage.record(bid_id, ledger)
+
+        revision = previous.revision + 1
+        texts = narrative_renderer.render_sections(bid_id, revision, templates, pricing_output, labour_rate)
+        response = previous.model_copy(update={
+            "pricing": pricing_output,
+            "dossier_text": texts.get("dossier", previous.dossier_text),
+            "pricing_explanation": texts.get("pricing_explanation", previous.pricing_explanation),
+            "proposal_draft": texts.get("proposal", previous.proposal_draft),
+            "followup": texts.get("followups", previous.followup),
+            "degraded_stages": list(deadline.degraded_stages),
+            "revision": revision
+        })
+        bid_store[bid_id] = BidSession(
+            id=bid_id, data=response, request=request, estimates=estimates, templates=templates,
+            price_points=session.price_points, created_at=session.created_at
+        )
+        # A coaching session was built around the old price bands and floor
+        coaching_sessions.pop(bid_id, None)
+
+        logger.info(
+            "Revision %d: recomputed %s in %.2fs", response.revision, sorted(stale) or "nothing", time.time() - start_time,
+            extra={"bid_id": bid_id}
+        )
         return response
+
+    def _price(
+        self, context: PropertyContext, request: CreateBidRequest, labour_rate: float, estimates: dict,
+        price_points: Optional[List[PricePoint]] = None
+    ) -> PricingOutput:
+        pricing_output = self.pricing.calculate_pricing(
+            context,
+            request.job_type,
+            labour_rate,  # Use detected labour rate
+            request.desired_margin_percent,
+            estimates.get("base_hours", 0),
+            estimates.get("materials_cost", 0),
+            urgency=request.urgency or "medium"
+        )
+        # Replace the simulated market distribution with competitor prices from the market search,
+        # else with our earlier bids once there are enough (not during replay, so a replayed bid
+        # prices as recorded)
+        market_stats = market_stats_from_points(price_points or [], request.job_type, estimates.get("base_hours", 0))
+        metrics.incr("market_prices.hits" if market_stats else "market_prices.misses")
+        if market_stats is None and current_cassette.get() is None:
+            market_stats = market_aggregates.market_stats(request.job_type, request.address)
+        if market_stats is not None:
+            pricing_output.market_stats = market_stats
+        return pricing_output
+
+    async def _generate_texts(self, stages: Iterable[str], context: PropertyContext, job_info: dict, notes: str) -> Dict[str, Any]:
+        """
+        Run the requested LLM generations in parallel, each within the generation budget.
+
+        Returns templates: figures appear as placeholders to be filled by
+        narrative_renderer from the current PricingOutput.
+        """
+        budget = settings.GENERATION_STAGE_BUDGET_SECONDS
+        generators = {
+            "dossier": (
+                lambda: self.llm.generate_dossier(context, job_info),
+                lambda: DEGRADED_TEXT
+            ),
+            "pricing_explanation": (
+                lambda: self.llm.generate_pricing_explanation(context),
+                lambda: DEGRADED_TEXT
+            ),
+            "proposal": (
+                lambda: self.llm.generate_proposal(context, job_info, notes),
+                lambda: DEGRADED_TEXT
+            ),
+            "followups": (
+                lambda: self.llm.generate_followups(context, job_info),
+                lambda: FollowUpScripts(
+                    email_d2=DEGRADED_TEXT,
+                    email_d7=DEGRADED_TEXT,
+                    price_objection_script=DEGRADED_TEXT
+                )
+            )
+        }
+        stages = [stage for stage in GENERATION_STAGES if stage in stages]
+        results = await asyncio.gather(*(
+            run_with_budget(stage, generators[stage][0], budget, fallback=generators[stage][1])
+            for stage in stages
+        ))
+        return dict(zip(stages, results))
+
+    async def _optimize_context(self, raw_results: list, job_info: dict, extraction: Optional[Extraction] = None) -> PropertyContext:
+        return await run_with_budget(
+            "context",
+            lambda: self.optimizer.optimize(raw_results, job_info, extraction),
+            settings.CONTEXT_STAGE_BUDGET_SECONDS,
+            fallback=lambda: self.optimizer._heuristic_optimize(raw_results, job_info, extraction)
+        )
+
+    async def _estimate(self, context: PropertyContext, job_info: dict) -> dict:
+        return await run_with_budget(
+            "estimation",
+            lambda: self.llm.estimate_job_parameters(context, job_info),
+            settings.ESTIMATION_STAGE_BUDGET_SECONDS,
+            fallback=lambda: self.llm.default_estimates(job_info.get("job_type", "other"))
+        )
+
+    async def _speculative_context_and_estimates(self, raw_results: list, job_info: dict):
+        """
+        Run estimation on the heuristic context in parallel with LLM extraction.
+
+        The speculative estimate is kept when the fields the estimator reads
+        are identical in the extracted context; otherwise it is cancelled and
+        estimation is re-run on the extracted context. Both contexts are built
+        from a single run of the local extractor.
+        """
+        step_start = time.time()
+        extraction = self.optimizer.extractor.extract(raw_results, job_info.get("address"))
+        heuristic_context = self.optimizer._heuristic_optimize(raw_results, job_info, extraction)
+        speculative = asyncio.create_task(self._estimate(heuristic_context, job_info))
+
+        try:
+            context = await self._optimize_context(raw_results, job_info, extraction)
+        except BaseException:
+            speculative.cancel()
+            raise
+        logger.info("Context optimization completed in %.2fs", time.time() - step_start)
+
+        if estimation_inputs(context) == estimation_inputs(heuristic_context):
+            metrics.incr("speculative_estimation.hits")
+            estimates = await speculative
+            logger.info("Speculative estimate kept (%.2fs since context start)", time.time() - step_start)
+        else:
+            metrics.incr("speculative_estimation.misses")
+            speculative.cancel()
+            step_start = time.time()
+            estimates = await self._estimate(context, job_info)
+            logger.info("Speculative estimate discarded; re-estimated in %.2fs", time.time() - step_start)
+
+        return context, estimates
@@ -1,12 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import bids, voice
+from app.routers import bids, voice, admin, market
 from app.config import settings
+from app.services.prefetch import prefetch_scheduler
+from app.utils.loop_monitor import RouteContextMiddleware, loop_monitor
+from app.utils.profiler import ProfilingMiddleware
+from app.utils.structured_logging import configure_logging
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Log records are written from a background thread, never on the event loop
+    log_listener = configure_logging()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    # Keep market and labour rates warm for hot regions (needs a Valyu key)
+    if settings.PREFETCH_ENABLED:
+        prefetch_scheduler.start()
+    yield
+    await prefetch_scheduler.stop()
+    loop_monitor.stop()
+    log_listener.stop()
 
 app = FastAPI(
     title="The Bid Sniper – Tender Bender",
     description="Backend for automated construction bidding pipeline.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS - Allow all for hackathon/Lovable
@@ -17,9 +37,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RouteContextMiddleware)
+if settings.PROFILING_ENABLED and settings.PROFILING_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
 
 app.include_router(bids.router, prefix="/bids", tags=["bids"])
 app.include_router(voice.router, prefix="/voice", tags=["voice"])
+if settings.livekit_enabled:
+    app.include_router(voice.token_router, prefix="/voice", tags=["voice"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(market.router, prefix="/market", tags=["market"])
 
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -40,7 +67,7 @@ if os.path.exists(frontend_build_path):
     @app.get("/{full_path:path}")
     async def serve_react_app(full_path: str):
         # Don't intercept API routes
-        if full_path.startswith(("bids", "voice", "health")):
+        if full_path.startswith(("bids", "voice", "admin", "market", "health")):
             return {"error": "Not found"}
         return FileResponse(os.path.join(frontend_build_path, "index.html"))
 else:
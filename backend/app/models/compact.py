@@ -0,0 +1,94 @@
+"""Compact in-memory representation of a stored bid"""
+import json
+import math
+import sys
+import zlib
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.models.schemas import PricingBands
+
+SNIPPET_CHARS = 300
+# Pricing figures kept uncompressed for listings and indexes, in this order
+PRICING_FIELDS = (
+    "internal_cost_estimate", "win_at_all_costs", "balanced", "premium",
+    "min_recommended_price", "total_materials_cost", "total_labour_cost",
+)
+
+
+def pack_results(results: List[Dict[str, Any]]) -> bytes:
+    """
+    Search results with each page's content stored once.
+
+    A result in the usual shape (snippet is the first 300 characters of the
+    content, raw_metadata repeats content and url) is stored as
+    [title, url, content]; anything else is stored as given.
+    """
+    packed = []
+    for result in results:
+        content = result.get("raw_metadata", {}).get("full_content")
+        canonical = (
+            set(result) == {"title", "snippet", "url", "raw_metadata"}
+            and result["raw_metadata"] == {"full_content": content, "url": result["url"]}
+            and result["snippet"] == (content[:SNIPPET_CHARS] if content else "")
+        )
+        packed.append([result["title"], result["url"], content] if canonical else result)
+    return zlib.compress(json.dumps(packed, separators=(",", ":")).encode())
+
+
+def unpack_results(blob: bytes) -> List[Dict[str, Any]]:
+    results = []
+    for item in json.loads(zlib.decompress(blob)):
+        if isinstance(item, list):
+            title, url, content = item
+            item = {
+                "title": title,
+                "snippet": content[:SNIPPET_CHARS] if content else "",
+                "url": url,
+                "raw_metadata": {"full_content": content, "url": url},
+            }
+        results.append(item)
+    return results
+
+
+class CompactBid:
+    """
+    One stored bid in a fraction of the memory of its BidSession.
+
+    Fields used by indexes and listings are kept as plain attributes
+    (region and job type interned) with the pricing figures in a float
+    array. The rest of the session (context, texts, templates, estimates) is
+    a zlib-compressed JSON blob, and search results a second blob with each
+    page's content stored once. to_dict() gives back the full session data.
+    """
+
+    __slots__ = ("id", "created_at", "revision", "address", "region", "job_type", "pricing", "_blob", "_results")
+
+    def __init__(self, session):
+        self.id: str = session.id
+        self.created_at: datetime = session.created_at
+        self.revision: int = session.data.revision
+        request = session.request
+        self.address: Optional[str] = request.address if request else None
+        self.region: Optional[str] = sys.intern(request.region) if request else None
+        self.job_type: Optional[str] = sys.intern(request.job_type) if request else None
+        pricing = session.data.pricing
+        values = [pricing.internal_cost_estimate, *pricing.price_bands.model_dump().values(), pricing.min_recommended_price,
+                  pricing.total_materials_cost, pricing.total_labour_cost]
+        self.pricing = array("d", [math.nan if value is None else value for value in values])
+        self._blob = zlib.compress(session.model_dump_json(exclude={"data": {"raw_valyu_results"}}).encode())
+        self._results = pack_results(session.data.raw_valyu_results)
+
+    def price(self, field: str) -> Optional[float]:
+        value = self.pricing[PRICING_FIELDS.index(field)]
+        return None if math.isnan(value) else value
+
+    @property
+    def price_bands(self) -> PricingBands:
+        return PricingBands(win_at_all_costs=self.pricing[1], balanced=self.pricing[2], premium=self.pricing[3])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The full BidSession data, decompressed (validate with BidSession.model_validate)"""
+        data = json.loads(zlib.decompress(self._blob))
+        data["data"]["raw_valyu_results"] = unpack_results(self._results)
+        return data
@@ -1,12 +1,198 @@
-from pydantic import BaseModel
-from typing import Optional
-from app.models.schemas import BidResponse
+import base64
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import MutableMapping
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from app.models.compact import CompactBid
+from app.models.schemas import BidResponse, CreateBidRequest, FollowUpScripts, PricePoint
+from app.utils.address import postcode_area, postcode_district
 
 # Simple in-memory storage for now
 class BidSession(BaseModel):
     id: str
     data: BidResponse
+    # Pipeline inputs kept so a bid can be re-priced without re-running searches/extraction
+    request: Optional[CreateBidRequest] = None
+    estimates: Optional[dict] = None
+    # Narrative templates with figure placeholders, re-rendered when the price changes
+    templates: Dict[str, Union[str, FollowUpScripts]] = {}
+    # Competitor prices from the market search, re-normalized when estimates change
+    price_points: List[PricePoint] = []
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+def encode_cursor(created_at: datetime, bid_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{bid_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Raises ValueError for a cursor this store did not issue"""
+    try:
+        created_at, bid_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), bid_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Local naive time, comparable with the stored created_at values"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _first(entry: tuple):
+    return entry[0]
+
+
+class BidStore(MutableMapping):
+    """
+    Bid sessions by id, held as CompactBid records, with secondary indexes
+    maintained on every write.
+
+    Reading bid_store[bid_id] builds the full BidSession from its record;
+    listings and indexes use the record's uncompressed fields only.
+
+    Equality indexes (region, postcode district, postcode area, job type) map
+    to sets of bid ids; creation time and balanced price are kept in sorted
+    lists for range queries. A query intersects the smallest candidate sets
+    and walks creation time newest first, so it touches only matching bids
+    rather than scanning the whole store.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, CompactBid] = {}
+        self._by_region: Dict[str, Set[str]] = {}
+        self._by_district: Dict[str, Set[str]] = {}
+        self._by_area: Dict[str, Set[str]] = {}
+        self._by_job_type: Dict[str, Set[str]] = {}
+        self._by_created: List[Tuple[datetime, str]] = []
+        self._by_price: List[Tuple[float, str]] = []
+
+    def _keys(self, record: CompactBid):
+        """(equality index, key) pairs for a record"""
+        if record.region is None:
+            return []
+        keys = [(self._by_region, record.region.strip().lower()), (self._by_job_type, record.job_type)]
+        district = postcode_district(record.address)
+        if district:
+            keys += [(self._by_district, district), (self._by_area, postcode_area(district))]
+        return keys
+
+    def _index(self, record: CompactBid):
+        for index, key in self._keys(record):
+            index.setdefault(key, set()).add(record.id)
+        insort(self._by_created, (record.created_at, record.id))
+        insort(self._by_price, (record.price("balanced"), record.id))
+
+    def _unindex(self, record: CompactBid):
+        for index, key in self._keys(record):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(record.id)
+                if not ids:
+                    del index[key]
+        for entries, entry in ((self._by_created, (record.created_at, record.id)),
+                               (self._by_price, (record.price("balanced"), record.id))):
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+
+    def __getitem__(self, bid_id: str) -> BidSession:
+        return BidSession.model_validate(self._records[bid_id].to_dict())
+
+    def __setitem__(self, bid_id: str, session: BidSession):
+        previous = self._records.get(bid_id)
+        if previous is not None:
+            self._unindex(previous)
+        record = self._records[bid_id] = CompactBid(session)
+        self._index(record)
+
+    def __delitem__(self, bid_id: str):
+        self._unindex(self._records.pop(bid_id))
+
+    def __contains__(self, bid_id) -> bool:
+        return bid_id in self._records
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def record(self, bid_id: str) -> CompactBid:
+        return self._records[bid_id]
+
+    def query(
+        self,
+        region: Optional[str] = None,
+        postcode: Optional[str] = None,
+        job_type: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[CompactBid], Optional[str]]:
+        """
+        Matching records newest first, and a cursor for the next page (None on the last page).
+
+        `postcode` is a district ("SW11") or an area ("SW"). Price bounds apply
+        to the balanced price.
+        """
+        candidates: Optional[Set[str]] = None
+        equality = []
+        if region:
+            equality.append(self._by_region.get(region.strip().lower(), set()))
+        if postcode:
+            postcode = postcode.strip().upper()
+            index = self._by_district if any(c.isdigit() for c in postcode) else self._by_area
+            equality.append(index.get(postcode, set()))
+        if job_type:
+            equality.append(self._by_job_type.get(job_type, set()))
+        if min_price is not None or max_price is not None:
+            lo = bisect_left(self._by_price, min_price, key=_first) if min_price is not None else 0
+            hi = bisect_right(self._by_price, max_price, key=_first) if max_price is not None else len(self._by_price)
+            equality.append({bid_id for _, bid_id in self._by_price[lo:hi]})
+        for ids in sorted(equality, key=len):
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return [], None
+
+        created_from, created_to = _naive(created_from), _naive(created_to)
+        before = decode_cursor(cursor) if cursor else None
+        if candidates is not None and len(candidates) < len(self._by_created) // 8:
+            # Few matches: sort them rather than walk the time index
+            window = sorted(
+                (entry for entry in ((self._records[i].created_at, i) for i in candidates)
+                 if (created_from is None or entry[0] >= created_from)
+                 and (created_to is None or entry[0] <= created_to)
+                 and (before is None or entry < before)),
+                reverse=True,
+            )
+        else:
+            # Newest-first walk of the creation-time index
+            lo = bisect_left(self._by_created, created_from, key=_first) if created_from else 0
+            hi = bisect_right(self._by_created, created_to, key=_first) if created_to else len(self._by_created)
+            if before is not None:
+                hi = min(hi, bisect_left(self._by_created, before))
+            window = (self._by_created[i] for i in range(hi - 1, lo - 1, -1))
+
+        page: List[CompactBid] = []
+        for created_at, bid_id in window:
+            if candidates is not None and bid_id not in candidates:
+                continue
+            if len(page) == limit:
+                last = page[-1]
+                return page, encode_cursor(last.created_at, last.id)
+            page.append(self._records[bid_id])
+        return page, None
+
+    def clear(self):
+        self.__init__()
 
 # Global in-memory store
 # Key: bid_id, Value: BidSession
-bid_store: dict[str, BidSession] = {}
+bid_store = BidStore()
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import List, Optional, Literal, Dict, Any
 
 class CreateBidRequest(BaseModel):
@@ -16,6 +17,17 @@ class CreateBidRequest(BaseModel):
     lead_channel: Optional[str] = None
     notes: Optional[str] = None
     desired_margin_percent: float
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)  # Overall latency bound; defaults to BID_DEADLINE_SECONDS
+
+class UpdateBidRequest(BaseModel):
+    """Inputs that can be changed on a stored bid; only the fields sent are applied"""
+    desired_margin_percent: Optional[float] = None
+    urgency: Optional[Literal["low", "medium", "high", "emergency"]] = None
+    notes: Optional[str] = None
+    job_description: Optional[str] = None
+    scope_of_work: Optional[str] = None
+    known_issues: Optional[List[str]] = None
+    complications: Optional[List[str]] = None
 
 class PropertyContext(BaseModel):
     # Property details
@@ -70,6 +82,19 @@ class MarketStats(BaseModel):
     std_dev: float
     lower_bound: float
     upper_bound: float
+    # "market_search" stats come from competitor prices in the market search results
+    # (app/services/price_points.py), "historical" from our earlier bids (app/services/market_aggregates.py)
+    source: Literal["simulated", "market_search", "historical"] = "simulated"
+    percentiles: Optional[Dict[str, float]] = None  # Balanced price at p5 ... p95
+    sample_size: Optional[int] = None
+    area: Optional[str] = None  # Postcode area, or None when aggregated across all areas
+
+class PricePoint(BaseModel):
+    """A competitor price found in market search results"""
+    amount: float  # As quoted; the midpoint of a range
+    unit: Literal["job", "sqm", "day"]
+    url: Optional[str] = None
+    context: str = ""
 
 class PricingOutput(BaseModel):
     internal_cost_estimate: float
@@ -97,12 +122,30 @@ class BidResponse(BaseModel):
     proposal_draft: str
     followup: FollowUpScripts
     raw_valyu_results: List[Dict[str, Any]] = []
+    # Stages that ran out of time budget and returned a fallback result
+    degraded_stages: List[str] = []
+    revision: int = 1  # Incremented by every PATCH /bids/{bid_id}
     # New itemized breakdown fields
     materials_breakdown: Optional[List[MaterialLineItem]] = None
     labour_breakdown: Optional[List[LabourTask]] = None
     total_materials_cost: Optional[float] = None
     total_labour_cost: Optional[float] = None
 
+class BidSummary(BaseModel):
+    """One row of GET /bids"""
+    bid_id: str
+    address: Optional[str] = None
+    region: Optional[str] = None
+    job_type: Optional[str] = None
+    created_at: datetime
+    revision: int
+    internal_cost_estimate: float
+    price_bands: PricingBands
+
+class BidListResponse(BaseModel):
+    items: List[BidSummary]
+    next_cursor: Optional[str] = None  # Pass as `cursor` for the next page; None on the last page
+
 class VoiceTokenRequest(BaseModel):
     room_name: str
     identity: str
@@ -110,6 +153,15 @@ class VoiceTokenRequest(BaseModel):
 class VoiceTokenResponse(BaseModel):
     token: str
     url: str
+    expires_at: Optional[int] = None  # Unix timestamp
+
+class VoiceTokenBatchRequest(BaseModel):
+    room_name: str
+    identities: List[str]
+
+class VoiceTokenBatchResponse(BaseModel):
+    url: str
+    tokens: Dict[str, VoiceTokenResponse]  # Keyed by identity
 
 class VoiceCoachRequest(BaseModel):
     bid_id: str
@@ -0,0 +1,66 @@
+import hmac
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from app.config import settings
+from app.services.admission import bid_admission, tenant_report
+from app.utils.loop_monitor import loop_monitor
+from app.utils.metrics import metrics
+from app.utils.profiler import profile_response_body, profile_store
+from app.utils.token_usage import bid_token_usage, call_site_report
+from app.utils.resilience import upstreams
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Admin endpoints expose tenants, metrics and profiles, so they are closed without ADMIN_TOKEN"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token")
+
+router = APIRouter(tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+@router.get("/upstreams")
+async def get_upstreams():
+    """Circuit breaker and concurrency limiter state for each upstream"""
+    return {name: upstream.snapshot() for name, upstream in upstreams.items()}
+
+@router.get("/metrics")
+async def get_metrics():
+    """Counters, gauges (including hit rates) and latency summaries"""
+    return metrics.snapshot()
+
+@router.get("/tenants")
+async def get_tenants():
+    """Bid admission queue state, and throughput, queue wait and latency per tenant"""
+    return {"queue": bid_admission.snapshot(), "tenants": tenant_report()}
+
+@router.get("/tokens")
+async def get_token_usage():
+    """LLM call sites ranked by tokens (with latency), and totals of recent bids"""
+    return {"call_sites": call_site_report(), "recent_bids": bid_token_usage.recent()}
+
+@router.get("/tokens/{bid_id}")
+async def get_bid_token_usage(bid_id: str):
+    """Tokens and latency per call site for one bid (all revisions)"""
+    ledger = bid_token_usage.get(bid_id)
+    if ledger is None:
+        raise HTTPException(status_code=404, detail="No token usage recorded for this bid")
+    return ledger.snapshot()
+
+@router.get("/event-loop")
+async def get_event_loop():
+    """Event-loop lag, and the calls that blocked the loop (by site, and the most recent with stacks)"""
+    return loop_monitor.snapshot()
+
+@router.get("/profiles")
+async def get_profiles():
+    """Stored request and bid profiles, newest first"""
+    return profile_store.list()
+
+@router.get("/profiles/{key}")
+async def download_profile(key: str, format: Literal["speedscope", "collapsed"] = "speedscope"):
+    """One profile as a speedscope file or folded stacks for flamegraph tools"""
+    profile = profile_store.get(key)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    body, media_type, extension = profile_response_body(profile, format)
+    return Response(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{key}.{extension}"'})
@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import CreateBidRequest, BidResponse
+import math
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from app.models.schemas import CreateBidRequest, UpdateBidRequest, BidResponse, BidListResponse, BidSummary
+from app.models.compact import CompactBid
 from app.models.entities import bid_store
-from app.core.pipeline import BidPipeline
+from app.core.pipeline import BidPipeline, InvalidBidChanges, RepriceUnavailable
+from app.services.admission import AdmissionRejected, bid_admission, client_id_from_headers
+from app.services.bid_export import EXPORTERS, FORMATS, parquet_available, resolve_columns
+from app.services.idempotency import IdempotencyConflict, bid_deduplicator
 
 router = APIRouter(tags=["bids"])
 
@@ -9,14 +17,117 @@ def get_pipeline():
     return BidPipeline()
 
 @router.post("", response_model=BidResponse)
-async def create_bid(request: CreateBidRequest, pipeline: BidPipeline = Depends(get_pipeline)):
+async def create_bid(request: CreateBidRequest, http_request: Request, response: Response, pipeline: BidPipeline = Depends(get_pipeline)):
+    """
+    Run a bid once the client's rate limit and fair-queue turn allow it.
+
+    A duplicate submission (same Idempotency-Key, or with content dedupe on,
+    the same request from the same client shortly after) joins the bid in flight or gets the stored bid back, marked by
+    X-Deduplicated: joined or replayed, without being admitted again.
+    """
+    client_id = client_id_from_headers(http_request.headers, http_request.client.host if http_request.client else None)
+    try:
+        key, fingerprint, ttl = bid_deduplicator.key_for(client_id, request, http_request.headers.get("idempotency-key"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def start() -> BidResponse:
+        async with bid_admission.admit(client_id) as ticket:
+            response.headers["X-Queue-Position"] = str(ticket.position)
+            response.headers["X-Queue-Expected-Wait"] = f"{ticket.expected_wait:.1f}"
+            response.headers["X-Queue-Wait"] = f"{ticket.waited:.1f}"
+            return await pipeline.run_full_bid(request)
+
     try:
-        return await pipeline.run_full_bid(request)
+        bid, outcome = await bid_deduplicator.run(key, fingerprint, ttl, start)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(math.ceil(min(e.retry_after, 3600)))})
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if outcome != "new":
+        response.headers["X-Deduplicated"] = outcome
+    return bid
+
+def summarize(record: CompactBid) -> BidSummary:
+    return BidSummary(
+        bid_id=record.id,
+        address=record.address,
+        region=record.region,
+        job_type=record.job_type,
+        created_at=record.created_at,
+        revision=record.revision,
+        internal_cost_estimate=record.price("internal_cost_estimate"),
+        price_bands=record.price_bands,
+    )
+
+def bid_filters(
+    region: Optional[str] = None,
+    postcode: Optional[str] = Query(None, description='Postcode district ("SW11") or area ("SW")'),
+    job_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_price: Optional[float] = Query(None, description="Lowest balanced price"),
+    max_price: Optional[float] = Query(None, description="Highest balanced price"),
+) -> Dict[str, Any]:
+    return {
+        "region": region, "postcode": postcode, "job_type": job_type,
+        "created_from": created_from, "created_to": created_to,
+        "min_price": min_price, "max_price": max_price,
+    }
+
+@router.get("", response_model=BidListResponse)
+async def list_bids(
+    filters: Dict[str, Any] = Depends(bid_filters),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """Stored bids newest first, filtered through the store's secondary indexes"""
+    try:
+        records, next_cursor = bid_store.query(**filters, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return BidListResponse(items=[summarize(record) for record in records], next_cursor=next_cursor)
+
+@router.get("/export")
+async def export_bids(
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    columns: Optional[str] = Query(None, description="Comma-separated columns; proposal_draft and raw_valyu_results only when named"),
+    filters: Dict[str, Any] = Depends(bid_filters),
+):
+    """Stream every matching bid as flat rows, newest first, in constant memory"""
+    try:
+        selected = resolve_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+
+    media_type, extension = FORMATS[format]
+    filename = f"bids-{datetime.now():%Y%m%d-%H%M%S}.{extension}"
+    return StreamingResponse(
+        EXPORTERS[format](bid_store, filters, selected),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.get("/{bid_id}", response_model=BidResponse)
 async def get_bid(bid_id: str):
     if bid_id not in bid_store:
         raise HTTPException(status_code=404, detail="Bid not found")
     return bid_store[bid_id].data
+
+@router.patch("/{bid_id}", response_model=BidResponse)
+async def update_bid(bid_id: str, changes: UpdateBidRequest, pipeline: BidPipeline = Depends(get_pipeline)):
+    """Re-price a stored bid, recomputing only the outputs that depend on the changed inputs"""
+    try:
+        return await pipeline.reprice_bid(bid_id, changes)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Bid not found")
+    except InvalidBidChanges as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RepriceUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
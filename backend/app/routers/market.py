@@ -0,0 +1,22 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.services.market_aggregates import describe, market_aggregates
+
+router = APIRouter(tags=["market"])
+
+@router.get("/distributions")
+async def list_distributions():
+    """Job type × postcode area keys with the number of bids behind each"""
+    return market_aggregates.keys()
+
+@router.get("/distributions/{job_type}")
+async def get_distribution(job_type: str, area: Optional[str] = Query(None, description='Postcode area ("SW"); all areas when omitted')):
+    """Percentiles, mean and spread of internal cost, balanced price and labour rate for earlier bids"""
+    sketch = market_aggregates.get(job_type, area)
+    if sketch is None:
+        raise HTTPException(status_code=404, detail="No bids recorded for this job type and area")
+    return {
+        "job_type": job_type,
+        "area": area.upper() if area else None,
+        "metrics": {metric: describe(digest) for metric, digest in sketch.items() if digest.count},
+    }
@@ -1,36 +1,176 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import VoiceTokenRequest, VoiceTokenResponse, VoiceCoachRequest, VoiceCoachResponse
+import json
+import time
+import logging
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.models.schemas import (
+    VoiceTokenRequest, VoiceTokenResponse, VoiceTokenBatchRequest, VoiceTokenBatchResponse,
+    VoiceCoachRequest, VoiceCoachResponse
+)
+from app.config import settings
+from app.utils.prompt_format import compact_json
 from app.models.entities import bid_store
-from app.services.livekit_client import LiveKitClient
-from app.services.llm_client import LLMClient
+from app.services.coaching_session import CoachingSession, coaching_sessions, estimate_tokens
+from app.services.token_service import TokenService, token_service
+from app.services.llm_client import ERROR_PREFIX, LLMClient
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["voice"])
+# LiveKit token routes; only mounted when LiveKit is configured
+token_router = APIRouter(tags=["voice"])
 
-def get_livekit():
-    return LiveKitClient()
+def get_token_service():
+    return token_service
 
 def get_llm():
     return LLMClient()
 
-@router.post("/token", response_model=VoiceTokenResponse)
-async def get_token(request: VoiceTokenRequest, livekit: LiveKitClient = Depends(get_livekit)):
+def get_bid_context(bid_id: str) -> str:
+    """Serialize the stored bid's context for the coaching prompt"""
+    if bid_id not in bid_store:
+        raise HTTPException(status_code=404, detail="Bid context not found")
+
+    bid_session = bid_store[bid_id]
+    return f"Job Type: {compact_json(bid_session.data.property_context)}"
+
+@token_router.post("/token", response_model=VoiceTokenResponse)
+async def get_token(request: VoiceTokenRequest, tokens: TokenService = Depends(get_token_service)):
+    try:
+        token, expires_at = tokens.get_token(request.room_name, request.identity)
+        return VoiceTokenResponse(token=token, url=tokens.get_url(), expires_at=expires_at)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@token_router.post("/token/batch", response_model=VoiceTokenBatchResponse)
+async def get_tokens(request: VoiceTokenBatchRequest, tokens: TokenService = Depends(get_token_service)):
+    """Mint (or reuse) tokens for all participants of a room in one call"""
     try:
-        token = livekit.create_token(request.room_name, request.identity)
-        return VoiceTokenResponse(token=token, url=livekit.get_url())
+        url = tokens.get_url()
+        minted = tokens.get_tokens(request.room_name, request.identities)
+        return VoiceTokenBatchResponse(
+            url=url,
+            tokens={
+                identity: VoiceTokenResponse(token=token, url=url, expires_at=expires_at)
+                for identity, (token, expires_at) in minted.items()
+            }
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/coach", response_model=VoiceCoachResponse)
 async def coach_contractor(request: VoiceCoachRequest, llm: LLMClient = Depends(get_llm)):
-    if request.bid_id not in bid_store:
-        raise HTTPException(status_code=404, detail="Bid context not found")
-    
-    bid_session = bid_store[request.bid_id]
-    # Serialize relevant context for the LLM
-    context_summary = f"Job Type: {bid_session.data.property_context.model_dump_json()}" 
-    
+    context_summary = get_bid_context(request.bid_id)
+
     try:
         reply = await llm.generate_coaching(context_summary, request.message)
         return VoiceCoachResponse(reply=reply)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/coach/stream")
+async def coach_contractor_stream(request: VoiceCoachRequest, llm: LLMClient = Depends(get_llm)):
+    """
+    Server-Sent Events variant of /coach.
+
+    Emits one `token` event per streamed chunk as it arrives, then a `done`
+    event carrying time-to-first-token and total time in milliseconds, the
+    number of chunks and the completion tokens the API reported (estimated
+    when it reported none).
+    """
+    context_summary = get_bid_context(request.bid_id)
+    start = time.perf_counter()
+
+    async def event_stream():
+        ttft_ms = None
+        usage = {}
+        parts = []
+        async for token in llm.stream_coaching(context_summary, request.message, usage=usage):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            parts.append(token)
+            yield f"event: token\ndata: {json.dumps({'token': token})}\n\n"
+
+        total_ms = (time.perf_counter() - start) * 1000
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens("".join(parts))
+        logger.info(
+            "Coach stream: first token %.0fms, %d tokens in %.0fms", ttft_ms or 0, completion_tokens, total_ms,
+            extra={"bid_id": request.bid_id}
+        )
+        stats = {
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+            "chunks": len(parts),
+            "completion_tokens": completion_tokens,
+            "usage_estimated": "completion_tokens" not in usage
+        }
+        yield f"event: done\ndata: {json.dumps(stats)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/coach/ws/{bid_id}")
+async def coach_session(websocket: WebSocket, bid_id: str, llm: LLMClient = Depends(get_llm)):
+    """
+    Stateful coaching over a WebSocket.
+
+    Each text frame from the client is one turn. The reply is streamed as
+    {"type": "token"} frames followed by a {"type": "done"} frame with the
+    full reply, latency and token counts. Earlier turns are remembered up to
+    COACH_MEMORY_TOKENS; a turn whose generation failed is not.
+    """
+    if bid_id not in bid_store:
+        await websocket.close(code=4404, reason="Bid context not found")
+        return
+
+    await websocket.accept()
+    session = coaching_sessions.get(bid_id)
+    if session is None:
+        session = CoachingSession(bid_store[bid_id].data, memory_tokens=settings.COACH_MEMORY_TOKENS)
+        coaching_sessions.set(bid_id, session)
+
+    try:
+        while True:
+            message = await websocket.receive_text()
+            start = time.perf_counter()
+            ttft_ms = None
+            usage = {}
+            parts = []
+
+            messages = session.build_messages(message)
+            async for token in llm.stream_chat(messages, usage=usage):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                parts.append(token)
+                await websocket.send_json({"type": "token", "token": token})
+
+            reply = "".join(parts)
+            failed = reply.startswith(ERROR_PREFIX)
+            # A failed turn is not remembered, so later prompts do not carry the error text
+            if not failed:
+                session.record_turn(message, reply)
+            latency_ms = (time.perf_counter() - start) * 1000
+            prompt_tokens = usage.get("prompt_tokens") or sum(estimate_tokens(m["content"]) for m in messages)
+            completion_tokens = usage.get("completion_tokens") or estimate_tokens(reply)
+            logger.info(
+                "Coach turn %d: %.0fms, %d+%d tokens", session.turns, latency_ms, prompt_tokens, completion_tokens,
+                extra={"bid_id": bid_id}
+            )
+
+            await websocket.send_json({
+                "type": "done",
+                "reply": reply,
+                "failed": failed,
+                "turn": session.turns,
+                "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+                "latency_ms": round(latency_ms, 1),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "usage_estimated": "prompt_tokens" not in usage,
+                "history_tokens": session.history_tokens
+            })
+    except WebSocketDisconnect:
+        logger.info("Coach session disconnected after %d turns", session.turns, extra={"bid_id": bid_id})
@@ -0,0 +1,277 @@
+"""Per-client admission in front of the bid pipeline: token-bucket rate limits and weighted fair queuing"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import List, Mapping, Optional, Tuple
+from pydantic import BaseModel
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.token_bucket import TokenBucket
+
+ANONYMOUS_CLIENT = "anonymous"
+# Shared identity (rate limit, fair-queue slot and metrics label) of clients that are
+# not configured, so arbitrary header values neither get their own limits nor grow state
+OTHER_TENANT = "other"
+# Expected service time per bid until enough bids have been measured
+DEFAULT_SERVICE_SECONDS = 20.0
+MAX_TRACKED_CLIENTS = 10000
+
+
+class AdmissionRejected(Exception):
+    """A bid refused before it reaches the pipeline; the client may retry after retry_after seconds"""
+
+    status_code = 503
+
+    def __init__(self, client_id: str, reason: str, retry_after: float):
+        super().__init__(f"{reason} for client {client_id}")
+        self.client_id = client_id
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RateLimited(AdmissionRejected):
+    status_code = 429
+
+
+class QueueFull(AdmissionRejected):
+    status_code = 503
+
+
+class ClientPolicy(BaseModel):
+    rate_per_minute: float
+    burst: int
+    weight: float
+
+
+def client_policy(client_id: str) -> ClientPolicy:
+    """Default policy with any CLIENT_LIMITS overrides for the client applied"""
+    policy = ClientPolicy(
+        rate_per_minute=settings.CLIENT_RATE_PER_MINUTE,
+        burst=settings.CLIENT_BURST,
+        weight=settings.CLIENT_WEIGHT,
+    )
+    overrides = settings.CLIENT_LIMITS.get(client_id)
+    if overrides:
+        policy = ClientPolicy(**{**policy.model_dump(), **overrides})
+    return policy
+
+
+def client_id_from_headers(headers: Mapping[str, str], client_address: Optional[str] = None) -> str:
+    """
+    The client a request counts against.
+
+    With CLIENT_API_KEYS set, that is the client id of the X-API-Key sent.
+    Without it, X-API-Key (else X-Client-Id) is taken as sent, but only when
+    it names a CLIENT_LIMITS entry. A request with neither header is
+    anonymous, keyed by its client address ("anonymous:203.0.113.7") so one
+    busy caller cannot use up every anonymous caller's rate limit. Any
+    other id is the shared OTHER_TENANT, so a caller rotating keys cannot get
+    a fresh rate limit each time.
+    """
+    api_key = (headers.get("x-api-key") or "").strip()
+    claimed = (headers.get("x-client-id") or "").strip()
+    if not api_key and not claimed:
+        return f"{ANONYMOUS_CLIENT}:{client_address}" if client_address else ANONYMOUS_CLIENT
+    if settings.CLIENT_API_KEYS:
+        return settings.CLIENT_API_KEYS.get(api_key, OTHER_TENANT)
+    client_id = api_key or claimed
+    return client_id if client_id in settings.CLIENT_LIMITS else OTHER_TENANT
+
+
+def is_anonymous(client_id: str) -> bool:
+    return client_id == ANONYMOUS_CLIENT or client_id.startswith(f"{ANONYMOUS_CLIENT}:")
+
+
+def tenant_label(client_id: str) -> str:
+    """The client's own id if it is configured, ANONYMOUS_CLIENT for any anonymous caller, else OTHER_TENANT"""
+    if is_anonymous(client_id):
+        return ANONYMOUS_CLIENT
+    known = client_id in settings.CLIENT_LIMITS or client_id in settings.CLIENT_API_KEYS.values()
+    return client_id if known else OTHER_TENANT
+
+
+def rate_limit_key(client_id: str) -> str:
+    """Token bucket of a client: one per anonymous address, else one per tenant"""
+    return client_id if is_anonymous(client_id) else tenant_label(client_id)
+
+
+@dataclass
+class Ticket:
+    """One admitted bid: where it entered the queue and how long it waited"""
+    client_id: str
+    position: int  # 0 when admitted without queueing
+    expected_wait: float
+    queued_at: float = field(default_factory=time.monotonic)
+    admitted_at: Optional[float] = None
+
+    @property
+    def waited(self) -> float:
+        return (self.admitted_at or time.monotonic()) - self.queued_at
+
+
+@dataclass
+class _Waiter:
+    ticket: Ticket
+    start_tag: float
+    future: asyncio.Future
+
+
+class FairQueue:
+    """
+    Admits at most `slots` bids into the pipeline at once, queueing the rest.
+
+    Each configured client and each anonymous address has its own token
+    bucket (rate_per_minute, burst), and all other clients share one (see
+    rate_limit_key); a bid over the rate is rejected rather than queued.
+    In the queue, anonymous callers share one tenant's weight. Queued bids are ordered
+    by weighted fair queuing with virtual finish tags: a bid's tag is the
+    later of the queue's virtual time and the client's previous tag, plus
+    1/weight. A client flooding the queue pushes only its own tags out, so
+    another client's bid lands near the front, and a client with weight 4
+    gets four bids admitted for each one of a weight-1 client while both
+    are backlogged.
+    """
+
+    def __init__(self, slots: Optional[int] = None, max_queued: Optional[int] = None):
+        self.slots = slots if slots is not None else settings.ADMISSION_CONCURRENT_BIDS
+        self.max_queued = max_queued if max_queued is not None else settings.ADMISSION_MAX_QUEUED
+        self.in_service = 0
+        self.queued = 0
+        self._virtual_time = 0.0
+        self._heap: List[Tuple[float, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._finish_tags: "OrderedDict[str, float]" = OrderedDict()
+
+    def _bucket(self, client_id: str) -> TokenBucket:
+        key = rate_limit_key(client_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            policy = client_policy(tenant_label(client_id))
+            bucket = self._buckets[key] = TokenBucket(policy.rate_per_minute / 60.0, policy.burst)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        return bucket
+
+    def _tags(self, client_id: str) -> Tuple[float, float]:
+        client_id = tenant_label(client_id)
+        start = max(self._virtual_time, self._finish_tags.get(client_id, 0.0))
+        finish = start + 1.0 / max(client_policy(client_id).weight, 1e-6)
+        self._finish_tags[client_id] = finish
+        self._finish_tags.move_to_end(client_id)
+        if len(self._finish_tags) > MAX_TRACKED_CLIENTS:
+            self._finish_tags.popitem(last=False)
+        return start, finish
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the bid at a queue position (1-based) is admitted, from recent bid durations"""
+        if position <= 0:
+            return 0.0
+        recent = metrics.summary("admission.service_time").recent
+        service = sum(recent) / len(recent) if recent else DEFAULT_SERVICE_SECONDS
+        return service * position / max(self.slots, 1)
+
+    async def acquire(self, client_id: str) -> Ticket:
+        """Wait for a pipeline slot; raises RateLimited or QueueFull without queueing"""
+        tenant = tenant_label(client_id)
+        must_queue = self.in_service >= self.slots or self.queued > 0
+        if must_queue and self.queued >= self.max_queued:
+            metrics.incr(f"tenant.{tenant}.queue_full")
+            raise QueueFull(client_id, "Bid queue full", self.expected_wait(self.queued))
+
+        bucket = self._bucket(client_id)
+        if not bucket.try_take():
+            metrics.incr(f"tenant.{tenant}.rate_limited")
+            raise RateLimited(client_id, "Rate limit exceeded", bucket.retry_after())
+
+        start, finish = self._tags(client_id)
+        if not must_queue:
+            self._virtual_time = start
+            self.in_service += 1
+            return self._admitted(Ticket(client_id, position=0, expected_wait=0.0))
+
+        position = 1 + sum(1 for tag, _, waiter in self._heap if tag <= finish and not waiter.future.done())
+        waiter = _Waiter(Ticket(client_id, position, self.expected_wait(position)), start, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (finish, next(self._seq), waiter))
+        self.queued += 1
+        metrics.set_gauge("admission.queued", self.queued)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Client went away while queued, or was admitted just as it was cancelled
+            if waiter.future.cancelled():
+                self.queued -= 1
+                metrics.set_gauge("admission.queued", self.queued)
+            else:
+                self.release(waiter.ticket)
+            raise
+        return self._admitted(waiter.ticket)
+
+    def _admitted(self, ticket: Ticket) -> Ticket:
+        ticket.admitted_at = time.monotonic()
+        tenant = tenant_label(ticket.client_id)
+        metrics.incr(f"tenant.{tenant}.admitted")
+        metrics.observe(f"tenant.{tenant}.queue_wait", ticket.waited)
+        metrics.set_gauge("admission.in_service", self.in_service)
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Free the ticket's slot and admit the next queued bid, if any"""
+        self.in_service -= 1
+        while self._heap and self.in_service < self.slots:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.cancelled():
+                continue
+            self.queued -= 1
+            self.in_service += 1
+            self._virtual_time = waiter.start_tag
+            waiter.future.set_result(None)
+        metrics.set_gauge("admission.queued", self.queued)
+        metrics.set_gauge("admission.in_service", self.in_service)
+
+    @asynccontextmanager
+    async def admit(self, client_id: str):
+        """Hold a pipeline slot for the duration of one bid"""
+        ticket = await self.acquire(client_id)
+        tenant = tenant_label(client_id)
+        failed = False
+        try:
+            yield ticket
+        except Exception:
+            failed = True
+            raise
+        finally:
+            service_time = time.monotonic() - ticket.admitted_at
+            self.release(ticket)
+            metrics.observe("admission.service_time", service_time)
+            metrics.observe(f"tenant.{tenant}.latency", time.monotonic() - ticket.queued_at)
+            metrics.incr(f"tenant.{tenant}.{'failed' if failed else 'completed'}")
+
+    def snapshot(self) -> dict:
+        return {
+            "slots": self.slots,
+            "in_service": self.in_service,
+            "queued": self.queued,
+            "expected_wait_seconds": round(self.expected_wait(self.queued), 2),
+        }
+
+
+def tenant_report() -> dict:
+    """Admitted, completed and rejected bids with queue wait and latency per tenant"""
+    snapshot = metrics.snapshot()
+    tenants: dict = {}
+    for section in ("counters", "summaries"):
+        for name, value in snapshot.get(section, {}).items():
+            if name.startswith("tenant."):
+                tenant, _, stat = name[len("tenant."):].rpartition(".")
+                tenants.setdefault(tenant, {})[stat] = value
+    return tenants
+
+# Global admission queue for POST /bids
+bid_admission = FairQueue()
@@ -0,0 +1,188 @@
+"""Streaming export of stored bids as NDJSON, CSV or Parquet with a flat pricing/context schema"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from app.models.entities import BidSession, BidStore
+from app.utils.address import postcode_area, postcode_district
+
+# Sessions read from the store per batch; memory is bounded by one batch, not the export
+BATCH_SIZE = 500
+# Rows per Parquet row group
+ROW_GROUP_SIZE = 5000
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _request(session: BidSession, field: str):
+    return getattr(session.request, field) if session.request else None
+
+
+def _district(session: BidSession) -> Optional[str]:
+    return postcode_district(session.request.address) if session.request else None
+
+
+def _market(session: BidSession, field: str):
+    stats = session.data.pricing.market_stats
+    return getattr(stats, field) if stats else None
+
+
+# name -> (type, getter); type is one of str, float, int, datetime
+COLUMNS: Dict[str, Tuple[str, Callable[[BidSession], Any]]] = {
+    "bid_id": ("str", lambda s: s.id),
+    "created_at": ("datetime", lambda s: s.created_at),
+    "revision": ("int", lambda s: s.data.revision),
+    "address": ("str", lambda s: _request(s, "address")),
+    "region": ("str", lambda s: _request(s, "region")),
+    "postcode_district": ("str", _district),
+    "postcode_area": ("str", lambda s: postcode_area(_district(s)) if _district(s) else None),
+    "job_type": ("str", lambda s: _request(s, "job_type")),
+    "urgency": ("str", lambda s: _request(s, "urgency")),
+    "desired_margin_percent": ("float", lambda s: _request(s, "desired_margin_percent")),
+    "internal_cost_estimate": ("float", lambda s: s.data.pricing.internal_cost_estimate),
+    "price_win": ("float", lambda s: s.data.pricing.price_bands.win_at_all_costs),
+    "price_balanced": ("float", lambda s: s.data.pricing.price_bands.balanced),
+    "price_premium": ("float", lambda s: s.data.pricing.price_bands.premium),
+    "min_recommended_price": ("float", lambda s: s.data.pricing.min_recommended_price),
+    "total_materials_cost": ("float", lambda s: s.data.pricing.total_materials_cost),
+    "total_labour_cost": ("float", lambda s: s.data.pricing.total_labour_cost),
+    "market_mean": ("float", lambda s: _market(s, "mean")),
+    "market_std_dev": ("float", lambda s: _market(s, "std_dev")),
+    "market_source": ("str", lambda s: _market(s, "source")),
+    "property_type": ("str", lambda s: s.data.property_context.property_type),
+    "property_year_built": ("int", lambda s: s.data.property_context.property_year_built),
+    "architectural_period": ("str", lambda s: s.data.property_context.architectural_period),
+    "number_of_bedrooms": ("int", lambda s: s.data.property_context.number_of_bedrooms),
+    "property_size_sqm": ("float", lambda s: s.data.property_context.property_size_sqm),
+    "material_cost_band": ("str", lambda s: s.data.property_context.material_cost_band),
+    "labour_rate_band": ("str", lambda s: s.data.property_context.labour_rate_band),
+    "detected_labour_rate": ("float", lambda s: s.data.property_context.detected_labour_rate),
+    "degraded_stages": ("str", lambda s: ";".join(s.data.degraded_stages)),
+    "proposal_draft": ("str", lambda s: s.data.proposal_draft),
+    "raw_valyu_results": ("str", lambda s: json.dumps(s.data.raw_valyu_results)),
+}
+# Large columns only exported when asked for by name
+OPTIONAL_COLUMNS = {"proposal_draft", "raw_valyu_results"}
+DEFAULT_COLUMNS = [name for name in COLUMNS if name not in OPTIONAL_COLUMNS]
+
+
+def resolve_columns(requested: Optional[str]) -> List[str]:
+    """Comma-separated column names, or the default columns; raises ValueError for unknown names"""
+    if not requested:
+        return list(DEFAULT_COLUMNS)
+    columns = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def iter_sessions(store: BidStore, filters: Dict[str, Any]) -> AsyncIterator[List[BidSession]]:
+    """
+    Matching sessions newest first, one batch at a time, yielding to the event loop between batches.
+
+    Sessions are built from the store's compact records a batch at a time and dropped after.
+    """
+    cursor = None
+    while True:
+        records, cursor = store.query(**filters, limit=BATCH_SIZE, cursor=cursor)
+        if records:
+            yield [BidSession.model_validate(record.to_dict()) for record in records]
+        if cursor is None:
+            return
+        await asyncio.sleep(0)
+
+
+def _rows(sessions: List[BidSession], columns: List[str]) -> List[list]:
+    getters = [COLUMNS[name][1] for name in columns]
+    return [[getter(session) for getter in getters] for session in sessions]
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def export_ndjson(store: BidStore, filters: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    async for sessions in iter_sessions(store, filters):
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_json_value, row))), separators=(",", ":")) + "\n"
+            for row in _rows(sessions, columns)
+        ).encode()
+
+
+async def export_csv(store: BidStore, filters: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for sessions in iter_sessions(store, filters):
+        writer.writerows([_json_value(value) for value in row] for row in _rows(sessions, columns))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes to the response as they are produced"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def export_parquet(store: BidStore, filters: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    """Parquet written one row group at a time; bytes are streamed as each row group is flushed"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"str": pa.string(), "float": pa.float64(), "int": pa.int64(), "datetime": pa.timestamp("us")}
+    schema = pa.schema([(name, types[COLUMNS[name][0]]) for name in columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    pending: List[list] = []
+    try:
+        async for sessions in iter_sessions(store, filters):
+            pending.extend(_rows(sessions, columns))
+            if len(pending) >= ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in pending], schema=schema))
+                pending = []
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in pending], schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+EXPORTERS = {"ndjson": export_ndjson, "csv": export_csv, "parquet": export_parquet}
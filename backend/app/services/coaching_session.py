@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.config import settings
+from app.models.schemas import BidResponse
+from app.utils.metrics import metrics
+
+COACH_SYSTEM_PROMPT = """You are a real-time negotiation coach for a UK contractor who is standing in front of the homeowner.
+Use the bid context below. Never go below the floor price. Give short, actionable advice (2-4 sentences) the contractor can say or do right now."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def build_coaching_context(bid: BidResponse) -> str:
+    """Compact, null-free summary of a bid for the coach prompt"""
+    ctx = bid.property_context
+    pricing = bid.pricing
+    bands = pricing.price_bands
+
+    prop = [ctx.property_type or "property"]
+    if ctx.property_year_built:
+        prop.append(f"built {ctx.property_year_built}")
+    if ctx.architectural_period:
+        prop.append(f"({ctx.architectural_period})")
+    if ctx.property_size_sqm:
+        prop.append(f"{ctx.property_size_sqm:g} sqm")
+    if ctx.number_of_bedrooms:
+        prop.append(f"{ctx.number_of_bedrooms} bed")
+
+    lines = [
+        f"PROPERTY: {' '.join(prop)}",
+        f"PRICING: win £{bands.win_at_all_costs:,.0f} | balanced £{bands.balanced:,.0f} | premium £{bands.premium:,.0f} | floor £{pricing.min_recommended_price:,.0f}",
+    ]
+    if pricing.market_stats:
+        stats = pricing.market_stats
+        lines.append(f"MARKET: mean £{stats.mean:,.0f}, typical £{stats.mean - stats.std_dev:,.0f}-£{stats.mean + stats.std_dev:,.0f}")
+    if ctx.detected_labour_rate:
+        lines.append(f"LABOUR: £{ctx.detected_labour_rate:g}/hr")
+    if ctx.neighbourhood_price_median:
+        trend = f" ({ctx.neighbourhood_price_trend})" if ctx.neighbourhood_price_trend else ""
+        lines.append(f"AREA: median £{ctx.neighbourhood_price_median:,.0f}{trend}")
+    lines.append(f"RISKS: {'; '.join(ctx.likely_risk_flags) if ctx.likely_risk_flags else 'none identified'}")
+    return "\n".join(lines)
+
+
+class CoachingSession:
+    """
+    Conversation state for one bid's coaching session.
+
+    The system prompt and bid context are built once and always sent first,
+    so consecutive turns share an identical prompt prefix (prefix-cache
+    friendly). Only the rolling history and new message vary per turn.
+    """
+
+    def __init__(self, bid: BidResponse, memory_tokens: int = 1500):
+        self.bid_id = bid.bid_id
+        self.memory_tokens = memory_tokens
+        self.system_prompt = f"{COACH_SYSTEM_PROMPT}\n\nBID CONTEXT:\n{build_coaching_context(bid)}"
+        self.history: List[Dict[str, str]] = []
+        self.turns = 0
+        self.last_used = datetime.now()
+
+    @property
+    def history_tokens(self) -> int:
+        return sum(estimate_tokens(m["content"]) for m in self.history)
+
+    def build_messages(self, message: str) -> List[Dict[str, str]]:
+        return (
+            [{"role": "system", "content": self.system_prompt}]
+            + self.history
+            + [{"role": "user", "content": message}]
+        )
+
+    def record_turn(self, message: str, reply: str):
+        """Append an exchange and drop the oldest exchanges beyond the memory budget"""
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": reply})
+        self.turns += 1
+        self.last_used = datetime.now()
+        while len(self.history) > 2 and self.history_tokens > self.memory_tokens:
+            del self.history[:2]
+
+
+class CoachingSessionStore:
+    """
+    Coaching sessions by bid_id, so a reconnecting client keeps its memory.
+
+    Least recently used sessions are evicted beyond max_entries, and a
+    session idle for longer than idle_seconds is dropped when next looked up.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, idle_seconds: Optional[float] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.COACH_SESSION_MAX_ENTRIES
+        self.idle = timedelta(seconds=idle_seconds if idle_seconds is not None else settings.COACH_SESSION_IDLE_SECONDS)
+        self._sessions: "OrderedDict[str, CoachingSession]" = OrderedDict()
+
+    def get(self, bid_id: str) -> Optional[CoachingSession]:
+        session = self._sessions.get(bid_id)
+        if session is None:
+            return None
+        if datetime.now() - session.last_used > self.idle:
+            del self._sessions[bid_id]
+            metrics.set_gauge("coaching_sessions.entries", len(self._sessions))
+            return None
+        self._sessions.move_to_end(bid_id)
+        return session
+
+    def set(self, bid_id: str, session: CoachingSession):
+        self._sessions[bid_id] = session
+        self._sessions.move_to_end(bid_id)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+        metrics.set_gauge("coaching_sessions.entries", len(self._sessions))
+
+    def pop(self, bid_id: str, default: Optional[CoachingSession] = None) -> Optional[CoachingSession]:
+        return self._sessions.pop(bid_id, default)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def clear(self):
+        self._sessions.clear()
+
+
+# Global session store
+coaching_sessions = CoachingSessionStore()
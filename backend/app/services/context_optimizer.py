@@ -1,26 +1,47 @@
-from typing import List, Dict, Any
+import logging
+from typing import List, Dict, Any, Optional
 from app.models.schemas import PropertyContext
-from openai import AsyncOpenAI
 from app.config import settings
+from app.utils.cassette import CassetteMiss, replaying
+from app.services.model_routing import complete_for_task
+from app.services.property_extractor import Extraction, PropertyExtractor, property_extractor
+from app.utils.metrics import metrics
 import json
 
+logger = logging.getLogger(__name__)
+
 class ContextOptimizer:
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
         if self.api_key and "sk-" in self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # Imported on first use to keep app startup fast.
+            # Retries are handled by the shared OpenAI upstream policy.
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
         else:
             self.client = None
+        self.extractor: PropertyExtractor = property_extractor
     
-    async def optimize(self, raw_results: List[Dict[str, Any]], job_info: Dict[str, Any]) -> PropertyContext:
+    async def optimize(self, raw_results: List[Dict[str, Any]], job_info: Dict[str, Any], extraction: Optional[Extraction] = None) -> PropertyContext:
         """
         Use LLM to extract structured property context from raw Valyu search results.
         Falls back to heuristic extraction if LLM is not available.
+
+        The LLM call is skipped when the local extractor is confident about
+        every required field (LOCAL_EXTRACTION_REQUIRED_FIELDS). Callers that
+        already ran the local extractor pass its result as `extraction`.
         """
-        
-        if not self.client:
-            print("OpenAI client not available. Using heuristic extraction.")
-            return self._heuristic_optimize(raw_results, job_info)
+        if extraction is None:
+            extraction = self.extractor.extract(raw_results, job_info.get("address"))
+        if settings.LOCAL_EXTRACTION_SKIP_LLM and extraction.confident(settings.LOCAL_EXTRACTION_REQUIRED_FIELDS, settings.LOCAL_EXTRACTION_CONFIDENCE):
+            metrics.incr("local_extraction.hits")
+            logger.info("Local extraction confident on required fields. Skipping LLM extraction.")
+            return self._heuristic_optimize(raw_results, job_info, extraction)
+        metrics.incr("local_extraction.misses")
+
+        if not self.client and not replaying():
+            logger.info("OpenAI client not available. Using heuristic extraction.")
+            return self._heuristic_optimize(raw_results, job_info, extraction)
         
         try:
             # Prepare the raw data for LLM
@@ -63,14 +84,14 @@ Also determine the property type (flat, house type, etc.) from context clues.
 Return ONLY valid JSON matching the schema."""
 
             # Call OpenAI with JSON mode
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = await complete_for_task(
+                self.client,
+                "extraction",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                response_format={"type": "json_object"},
-                temperature=0.1
+                response_format={"type": "json_object"}
             )
             
             # Parse the response
@@ -82,6 +103,13 @@ Return ONLY valid JSON matching the schema."""
             if not extracted_data.get("labour_rate_band"):
                 extracted_data["labour_rate_band"] = "unknown"
             
+            # Fill fields the LLM left empty from confident matches in results about this address
+            for field, extracted in extraction.fields.items():
+                if extracted_data.get(field) is None and extraction.trusted(field, settings.LOCAL_EXTRACTION_CONFIDENCE):
+                    extracted_data[field] = extracted.value
+                    if field == "property_year_built":
+                        extracted_data["year_built_confidence"] = extracted.detail
+
             # Create PropertyContext from extracted data
             context = PropertyContext(
                 # Property details
@@ -111,12 +139,17 @@ Return ONLY valid JSON matching the schema."""
                 labour_rate_band=extracted_data.get("labour_rate_band", "unknown")
             )
             
-            print(f"LLM extracted context: year={context.property_year_built} ({context.year_built_confidence}), type={context.property_type}, period={context.architectural_period}")
+            logger.info(
+                "LLM extracted context: year=%s (%s), type=%s, period=%s",
+                context.property_year_built, context.year_built_confidence, context.property_type, context.architectural_period,
+            )
             return context
-            
+
+        except CassetteMiss:
+            raise
         except Exception as e:
-            print(f"LLM extraction failed: {e}. Falling back to heuristic extraction.")
-            return self._heuristic_optimize(raw_results, job_info)
+            logger.warning("LLM extraction failed: %s. Falling back to heuristic extraction.", e)
+            return self._heuristic_optimize(raw_results, job_info, extraction)
     
     def _format_raw_results(self, raw_results: List[Dict[str, Any]]) -> str:
         """Format raw Valyu results into text for LLM processing"""
@@ -131,13 +164,12 @@ Return ONLY valid JSON matching the schema."""
             formatted.append(f"Result {i}:\nTitle: {title}\nContent: {content}\nURL: {url}\n")
         return "\n".join(formatted)
     
-    def _heuristic_optimize(self, raw_results: List[Dict[str, Any]], job_info: Dict[str, Any]) -> PropertyContext:
-        """Fallback heuristic extraction (original logic)"""
-        # Start with unknown bands so we don't introduce defaults when no evidence exists
-        context = PropertyContext(
-            material_cost_band="unknown",
-            labour_rate_band="unknown"
-        )
+    def _heuristic_optimize(self, raw_results: List[Dict[str, Any]], job_info: Dict[str, Any], extraction: Optional[Extraction] = None) -> PropertyContext:
+        """Local extraction: pattern matches over result text, then structured metadata keys and risk heuristics"""
+        # Bands start unknown so we don't introduce defaults when no evidence exists
+        if extraction is None:
+            extraction = self.extractor.extract(raw_results, job_info.get("address"))
+        context = extraction.to_context(settings.LOCAL_EXTRACTION_MIN_CONFIDENCE)
 
         for doc in raw_results:
             meta = doc.get("raw_metadata", {})
@@ -0,0 +1,158 @@
+"""Deduplication of POST /bids by Idempotency-Key or by a hash of the normalized request"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from app.config import settings
+from app.models.entities import bid_store
+from app.models.schemas import BidResponse, CreateBidRequest
+from app.services.admission import ANONYMOUS_CLIENT, OTHER_TENANT, is_anonymous
+from app.utils.address import canonical_address
+from app.utils.metrics import metrics
+
+MAX_KEY_LENGTH = 255
+# Request fields that do not change the bid produced
+IGNORED_FIELDS = {"deadline_seconds"}
+# Identities shared by many callers: the same request from two of them is two submissions
+SHARED_CLIENTS = {ANONYMOUS_CLIENT, OTHER_TENANT}
+_WHITESPACE = re.compile(r"\s+")
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key reused with a different request body"""
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip().lower()
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, list):
+        return sorted(_normalize(item) for item in value)
+    return value
+
+
+def request_fingerprint(request: CreateBidRequest) -> str:
+    """
+    SHA-256 of the request with whitespace and case folded, list order ignored
+    and the address reduced to its canonical form where it has one
+    """
+    data = {field: _normalize(value) for field, value in request.model_dump(exclude=IGNORED_FIELDS).items()}
+    data["address"] = canonical_address(request.address) or data["address"]
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    ttl: float
+    task: Optional[asyncio.Task] = None
+    bid_id: Optional[str] = None
+    expires_at: float = 0.0
+
+
+class BidDeduplicator:
+    """
+    Makes duplicate bid submissions share one pipeline run.
+
+    A submission with an Idempotency-Key is keyed by (client, key); without
+    one it is keyed by (client, request fingerprint) when content dedupe is
+    on and the client is a configured one, not a SHARED_CLIENTS identity. A duplicate that arrives while the first run is in flight awaits the
+    same task; one that arrives after it succeeded gets the stored bid back
+    until the entry expires. Failed runs are forgotten, so a retry runs again.
+
+    The pipeline task is shielded from the requests awaiting it: a client
+    that disconnects does not cancel a bid others are waiting on, and its
+    own retry finds the finished bid.
+    """
+
+    def __init__(self, key_ttl: Optional[float] = None, content_ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.key_ttl = key_ttl if key_ttl is not None else settings.IDEMPOTENCY_KEY_TTL_SECONDS
+        self.content_ttl = content_ttl if content_ttl is not None else settings.BID_CONTENT_DEDUPE_SECONDS
+        self.max_entries = max_entries if max_entries is not None else settings.IDEMPOTENCY_MAX_ENTRIES
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.in_flight = 0
+
+    def key_for(self, client_id: str, request: CreateBidRequest, idempotency_key: Optional[str] = None) -> Tuple[Optional[str], str, float]:
+        """
+        (dedupe key or None, request fingerprint, TTL) for a submission.
+
+        Raises ValueError for an empty or overlong Idempotency-Key.
+        """
+        fingerprint = request_fingerprint(request)
+        if idempotency_key is not None:
+            idempotency_key = idempotency_key.strip()
+            if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+                raise ValueError(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return f"{client_id}|key|{idempotency_key}", fingerprint, self.key_ttl
+        if self.content_ttl > 0 and client_id not in SHARED_CLIENTS and not is_anonymous(client_id):
+            return f"{client_id}|content|{fingerprint}", fingerprint, self.content_ttl
+        return None, fingerprint, 0.0
+
+    async def run(self, key: Optional[str], fingerprint: str, ttl: float, start: Callable[[], Awaitable[BidResponse]]) -> Tuple[BidResponse, str]:
+        """
+        The bid for a submission and how it was produced: "new", "joined"
+        (attached to the run in flight) or "replayed" (stored bid returned).
+
+        A replayed bid is the stored bid as it is now, including any later
+        PATCH. Raises IdempotencyConflict when the key was used for a
+        different request.
+        """
+        if key is None:
+            return await start(), "new"
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.task is None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            entry = None
+        if entry is not None and entry.fingerprint != fingerprint:
+            metrics.incr("dedupe.conflicts")
+            raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+        if entry is not None and entry.task is not None:
+            metrics.incr("dedupe.hits")
+            metrics.incr("dedupe.joined")
+            return await asyncio.shield(entry.task), "joined"
+        if entry is not None and entry.bid_id in bid_store:
+            metrics.incr("dedupe.hits")
+            metrics.incr("dedupe.replayed")
+            return bid_store[entry.bid_id].data, "replayed"
+
+        metrics.incr("dedupe.misses")
+        entry = _Entry(fingerprint=fingerprint, ttl=ttl, task=asyncio.ensure_future(start()))
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        entry.task.add_done_callback(lambda task: self._finished(key, entry, task))
+        self._evict()
+        self.in_flight += 1
+        metrics.set_gauge("dedupe.in_flight", self.in_flight)
+        return await asyncio.shield(entry.task), "new"
+
+    def _finished(self, key: str, entry: _Entry, task: asyncio.Task):
+        failed = task.cancelled() or task.exception() is not None
+        if self._entries.get(key) is entry:
+            if failed:
+                del self._entries[key]
+            else:
+                entry.task = None
+                entry.bid_id = task.result().bid_id
+                entry.expires_at = time.monotonic() + entry.ttl
+                self._entries.move_to_end(key)
+        self.in_flight -= 1
+        metrics.set_gauge("dedupe.in_flight", self.in_flight)
+
+    def _evict(self):
+        # Oldest first (expired entries are dropped when looked up). An evicted
+        # in-flight run still finishes; it just cannot be joined.
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Global deduplicator for POST /bids
+bid_deduplicator = BidDeduplicator()
@@ -27,6 +27,11 @@ class LabourRateCache:
         
         return entry["labour_rate"]
     
+    def expires_in(self, region: str, job_type: str) -> Optional[timedelta]:
+        """Time until the cached rate expires, or None if there is none"""
+        entry = self._cache.get(self._make_key(region, job_type))
+        return entry["timestamp"] + self.ttl - datetime.now() if entry else None
+    
     def set(self, region: str, job_type: str, labour_rate: float):
         """Cache a labour rate for a region and job type"""
         key = self._make_key(region, job_type)
@@ -1,36 +1,64 @@
 from app.config import settings
+from typing import Optional
+import datetime
 import time
 
-# Try importing livekit sdk, else fallback to manual JWT
-try:
-    from livekit import api
-    HAS_LIVEKIT_SDK = True
-except ImportError:
-    HAS_LIVEKIT_SDK = False
-    import jwt # fallback
+_livekit_api = None
+
+def load_livekit_sdk():
+    """Import the LiveKit SDK on first use; returns None if it is not installed (manual JWT fallback)"""
+    global _livekit_api
+    if _livekit_api is None:
+        try:
+            from livekit import api
+            _livekit_api = api
+        except ImportError:
+            _livekit_api = False
+    return _livekit_api or None
+
+# Grants given to a participant unless the caller overrides them (SDK VideoGrants defaults)
+DEFAULT_GRANTS = {
+    "can_publish": True,
+    "can_subscribe": True,
+    "can_publish_data": True,
+}
 
 class LiveKitClient:
-    def create_token(self, room_name: str, identity: str) -> str:
-        if HAS_LIVEKIT_SDK:
+    def __init__(self):
+        if not settings.livekit_enabled:
+            raise RuntimeError("LiveKit is not configured. Set LIVEKIT_API_KEY, LIVEKIT_API_SECRET and LIVEKIT_URL in .env")
+
+    def create_token(self, room_name: str, identity: str, ttl_seconds: Optional[int] = None, grants: Optional[dict] = None) -> str:
+        ttl = ttl_seconds or settings.LIVEKIT_TOKEN_TTL_SECONDS
+        grants = {**DEFAULT_GRANTS, **(grants or {})}
+
+        api = load_livekit_sdk()
+        if api:
             token = api.AccessToken(settings.LIVEKIT_API_KEY, settings.LIVEKIT_API_SECRET) \
                 .with_identity(identity) \
                 .with_name(identity) \
-                .with_grants(api.VideoGrants(room_join=True, room=room_name))
+                .with_ttl(datetime.timedelta(seconds=ttl)) \
+                .with_grants(api.VideoGrants(room_join=True, room=room_name, **grants))
             return token.to_jwt()
         else:
-            # Manual JWT generation if SDK not present
-            # This is a simplified version, might need adjustment for exact LiveKit claims
+            # Manual JWT generation if SDK not present, emitting the same claims as AccessToken.to_jwt()
+            import jwt
+            now = int(time.time())
+            video = {"roomJoin": True, "room": room_name}
+            video.update({_camel_case(k): v for k, v in grants.items()})
             payload = {
+                "name": identity,
+                "video": video,
                 "sub": identity,
                 "iss": settings.LIVEKIT_API_KEY,
-                "nbf": int(time.time()),
-                "exp": int(time.time()) + 3600,
-                "video": {
-                    "room": room_name,
-                    "roomJoin": True
-                }
+                "nbf": now,
+                "exp": now + ttl
             }
             return jwt.encode(payload, settings.LIVEKIT_API_SECRET, algorithm="HS256")
 
     def get_url(self) -> str:
         return settings.LIVEKIT_URL
+
+def _camel_case(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(part.title() for part in rest)
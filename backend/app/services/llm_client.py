@@ -1,39 +1,82 @@
-from openai import AsyncOpenAI
+import logging
+import time
+from contextlib import aclosing
+from typing import AsyncIterator, List, Optional
 from app.config import settings
-from app.models.schemas import PropertyContext, PricingOutput, FollowUpScripts
+from app.utils.resilience import upstreams
+from app.utils.cassette import CassetteMiss, replaying
+from app.utils.prompt_format import compact_json
+from app.utils.token_usage import record_llm_call
+from app.services.model_routing import complete_for_task, chat_params
+from app.models.schemas import PropertyContext, FollowUpScripts
+from app.services.narrative import placeholder_instructions
+
+logger = logging.getLogger(__name__)
+
+# Fallback estimates per job type when the LLM estimate is unavailable
+JOB_TYPE_DEFAULTS = {
+    "roof_repair": {"base_hours": 40.0, "materials_cost": 4000.0},
+    "bathroom_remodel": {"base_hours": 80.0, "materials_cost": 6000.0},
+    "electrical_rewire": {"base_hours": 60.0, "materials_cost": 3000.0},
+    "general_renovation": {"base_hours": 100.0, "materials_cost": 8000.0},
+    "other": {"base_hours": 30.0, "materials_cost": 3000.0}
+}
+
+# PropertyContext fields that appear in the estimation prompt
+ESTIMATION_CONTEXT_FIELDS = (
+    "property_type", "property_year_built", "architectural_period", "property_size_sqm",
+    "number_of_bedrooms", "material_cost_band", "labour_rate_band"
+)
+
+def estimation_inputs(context: PropertyContext) -> dict:
+    """The parts of a PropertyContext that estimate_job_parameters depends on"""
+    return {field: getattr(context, field) for field in ESTIMATION_CONTEXT_FIELDS}
+
+# Prefix of the text returned in place of a generation that failed
+ERROR_PREFIX = "[ERROR]"
+# Placeholder text returned for a generation that ran out of time
+DEGRADED_TEXT = "[DEGRADED] Generation timed out. Please regenerate this section."
 
 class LLMClient:
     def __init__(self):
         self.api_key = settings.OPENAI_API_KEY
         if self.api_key and "sk-" in self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # Imported on first use to keep app startup fast.
+            # Retries are handled by the shared OpenAI upstream policy.
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
         else:
             self.client = None
 
-    async def _generate(self, system_prompt: str, user_prompt: str) -> str:
-        if not self.client:
+    async def _generate(self, task: str, system_prompt: str, user_prompt: str) -> str:
+        """Single completion using the model route configured for `task` (see app.services.model_routing)"""
+        if not self.client and not replaying():
             return "[MOCK] OpenAI API Key missing. This is generated text."
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-3.5-turbo", # Or gpt-4 if available/preferred
+            response = await complete_for_task(
+                self.client,
+                task,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7
+                ]
             )
             return response.choices[0].message.content
+        except CassetteMiss:
+            # A replay that diverged from its recording must fail, not degrade
+            raise
         except Exception as e:
-            print(f"OpenAI call failed: {e}")
-            return f"[ERROR] Failed to generate text: {e}"
+            logger.warning("OpenAI call failed for %s: %s", task, e)
+            return f"{ERROR_PREFIX} Failed to generate text: {e}"
 
     async def generate_dossier(self, context: PropertyContext, job_info: dict) -> str:
         system = "You are an expert construction estimator assistant. Create a pre-meeting dossier for a contractor."
-        user = f"Context: {context.model_dump_json()}\nJob: {job_info}\n\nSummarize the property history, neighbourhood vibe, and key talking points."
-        return await self._generate(system, user)
+        user = f"Context: {compact_json(context)}\nJob: {compact_json(job_info)}\n\nSummarize the property history, neighbourhood vibe, and key talking points."
+        return await self._generate("dossier", system, user)
 
-    async def generate_pricing_explanation(self, context: PropertyContext, pricing: PricingOutput) -> str:
+    async def generate_pricing_explanation(self, context: PropertyContext) -> str:
+        """Pricing explanation template; figures are placeholders rendered by app.services.narrative"""
         system = """You are a pricing strategist for construction contractors. Create a UNIQUE, LOCATION-SPECIFIC explanation of the pricing strategy.
 
 DO NOT use generic templates. Customize based on:
@@ -54,16 +97,16 @@ PROPERTY DETAILS:
 MARKET CONTEXT:
 - Neighbourhood Median Price: £{context.neighbourhood_price_median or 'unknown'}
 - Price Trend: {context.neighbourhood_price_trend or 'unknown'}
-- Labour Rate: £{context.detected_labour_rate or 65}/hr
+- Labour Rate: {{{{rate.labour}}}}
 
 RISK FACTORS:
 {', '.join(context.likely_risk_flags) if context.likely_risk_flags else 'None identified'}
 
 PRICING:
-- Internal Cost: £{pricing.internal_cost_estimate}
-- Win Price: £{pricing.price_bands.win_at_all_costs}
-- Balanced: £{pricing.price_bands.balanced}
-- Premium: £{pricing.price_bands.premium}
+- Internal Cost: {{{{cost.internal}}}}
+- Win Price: {{{{price.win}}}}
+- Balanced: {{{{price.balanced}}}}
+- Premium: {{{{price.premium}}}}
 """
 
         user = f"""{location_context}
@@ -75,11 +118,13 @@ Explain the pricing strategy for THIS SPECIFIC property. Address:
 4. Why each pricing tier makes sense for THIS location
 
 Make it conversational and specific - mention the property type, area characteristics, etc.
-Keep it under 200 words."""
+Keep it under 200 words.
+{placeholder_instructions('pricing_explanation')}"""
 
-        return await self._generate(system, user)
+        return await self._generate("explanation", system, user)
 
-    async def generate_proposal(self, context: PropertyContext, pricing: PricingOutput, job_info: dict, notes: str) -> str:
+    async def generate_proposal(self, context: PropertyContext, job_info: dict, notes: str) -> str:
+        """Proposal email template; figures are placeholders rendered by app.services.narrative"""
         system = """You are a senior construction estimator and bid writer for a UK building contractor.
 
 Your job is to take rough project details (address, job type, scope, context, prices, assumptions) and turn them into a clear, professional proposal email that a contractor can send directly to a homeowner or small landlord.
@@ -154,7 +199,7 @@ Scope I want to include:
 
 Pricing:
 - Currency: GBP
-- Quoted amount to show to client: £{pricing.price_bands.balanced:,.2f} + VAT
+- Quoted amount to show to client: {{{{price.balanced}}}} + VAT
 - (Internal margin: around 20% – DO NOT mention this in the email)
 
 Programme:
@@ -170,13 +215,17 @@ Exclusions:
 - Third-party design or engineering fees
 - Loose furniture and accessories
 
-Write a proposal email based on the above."""
+Write a proposal email based on the above.
+{placeholder_instructions('proposal')}"""
         
-        return await self._generate(system, user)
+        return await self._generate("proposal", system, user)
 
-    async def generate_followups(self, context: PropertyContext, pricing: PricingOutput, job_info: dict) -> FollowUpScripts:
+    async def generate_followups(self, context: PropertyContext, job_info: dict) -> FollowUpScripts:
+        """Follow-up script templates; figures are placeholders rendered by app.services.narrative"""
         system = "You are a sales coach. Generate follow-up scripts."
-        user = f"Job: {job_info}\nPrice: £{pricing.price_bands.balanced}\n\nGenerate 3 scripts: 1) Email 2 days later, 2) Email 7 days later, 3) Script for handling 'too expensive' objection."
+        # The internal margin is not something the client should ever see
+        client_job_info = {k: v for k, v in job_info.items() if k != "desired_margin_percent"}
+        user = f"Job: {compact_json(client_job_info)}\nPrice: {{{{price.balanced}}}}\n\nGenerate 3 scripts: 1) Email 2 days later, 2) Email 7 days later, 3) Script for handling 'too expensive' objection.\n{placeholder_instructions('followups')}"
         
         # In a real app, we might use function calling or JSON mode to get structured output.
         # For now, we'll just ask for a combined string and parse it or just return raw text in fields for simplicity if parsing is hard.
@@ -184,9 +233,9 @@ Write a proposal email based on the above."""
         # The schema expects specific fields. I will do a simple split or just put the whole text in one if I can't parse.
         # Actually, let's just do 3 simple calls to ensure structure, or one call and heuristic split. 3 calls is safer for this demo.
         
-        email_d2 = await self._generate(system, user + "\n\nOutput ONLY the Day 2 Email body.")
-        email_d7 = await self._generate(system, user + "\n\nOutput ONLY the Day 7 Email body.")
-        objection = await self._generate(system, user + "\n\nOutput ONLY the Objection Handling Script.")
+        email_d2 = await self._generate("followups", system, user + "\n\nOutput ONLY the Day 2 Email body.")
+        email_d7 = await self._generate("followups", system, user + "\n\nOutput ONLY the Day 7 Email body.")
+        objection = await self._generate("followups", system, user + "\n\nOutput ONLY the Objection Handling Script.")
 
         return FollowUpScripts(
             email_d2=email_d2,
@@ -194,10 +243,61 @@ Write a proposal email based on the above."""
             price_objection_script=objection
         )
 
-    async def generate_coaching(self, bid_context: str, message: str) -> str:
+    def _coaching_prompts(self, bid_context: str, message: str) -> tuple:
         system = "You are a real-time negotiation coach for a contractor."
         user = f"Bid Context: {bid_context}\nUser Message/Situation: {message}\n\nGive short, actionable advice."
-        return await self._generate(system, user)
+        return system, user
+
+    async def generate_coaching(self, bid_context: str, message: str) -> str:
+        system, user = self._coaching_prompts(bid_context, message)
+        return await self._generate("coaching", system, user)
+
+    async def stream_coaching(self, bid_context: str, message: str, usage: Optional[dict] = None) -> AsyncIterator[str]:
+        """Yield coaching advice token by token as the model produces it"""
+        system, user = self._coaching_prompts(bid_context, message)
+        async for token in self.stream_chat([
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+        ], usage=usage):
+            yield token
+
+    async def stream_chat(self, messages: List[dict], usage: Optional[dict] = None) -> AsyncIterator[str]:
+        """
+        Stream a chat completion for an explicit message list.
+
+        If `usage` is given it is filled with the API's prompt/completion
+        token counts once the stream ends.
+        """
+        if not self.client:
+            yield "[MOCK] OpenAI API Key missing. This is generated text."
+            return
+
+        params = chat_params("coaching")
+        start = time.monotonic()
+        parts, api_usage = [], None
+        try:
+            # Closed explicitly so a reader that stops early frees the upstream slot now, not at GC
+            async with aclosing(upstreams["openai"].stream(lambda: self.client.chat.completions.create(
+                messages=messages,
+                **params,
+                stream=True,
+                stream_options={"include_usage": True}
+            ))) as stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                    if chunk.usage:
+                        api_usage = chunk.usage
+                        if usage is not None:
+                            usage["prompt_tokens"] = chunk.usage.prompt_tokens
+                            usage["completion_tokens"] = chunk.usage.completion_tokens
+            record_llm_call("coaching", messages, params["model"], api_usage, "".join(parts), time.monotonic() - start)
+        except CassetteMiss:
+            raise
+        except Exception as e:
+            logger.warning("OpenAI streaming call failed: %s", e)
+            yield f"{ERROR_PREFIX} Failed to generate text: {e}"
 
     async def estimate_job_parameters(self, context: PropertyContext, job_info: dict) -> dict:
         system = """You are an expert construction cost estimator specializing in UK repair and renovation work.
@@ -261,7 +361,7 @@ Output ONLY valid JSON:
 }}
 """
         
-        response_text = await self._generate(system, user)
+        response_text = await self._generate("estimation", system, user)
         
         import json
         import re
@@ -279,11 +379,11 @@ Output ONLY valid JSON:
             base_hours = estimates.get("base_hours", 30.0)
             
             if materials_cost > 50000:
-                print(f"WARNING: Unrealistic materials_cost: £{materials_cost}. Using default.")
+                logger.warning("Unrealistic materials_cost: £%s. Using default.", materials_cost)
                 materials_cost = 5000.0
             
             if base_hours > 500:
-                print(f"WARNING: Unrealistic base_hours: {base_hours}. Using default.")
+                logger.warning("Unrealistic base_hours: %s. Using default.", base_hours)
                 base_hours = 40.0
             
             return {
@@ -296,16 +396,13 @@ Output ONLY valid JSON:
             }
             
         except Exception as e:
-            print(f"Failed to parse LLM estimation: {e}. Using defaults.")
-            job_defaults = {
-                "roof_repair": {"base_hours": 40.0, "materials_cost": 4000.0},
-                "bathroom_remodel": {"base_hours": 80.0, "materials_cost": 6000.0},
-                "electrical_rewire": {"base_hours": 60.0, "materials_cost": 3000.0},
-                "general_renovation": {"base_hours": 100.0, "materials_cost": 8000.0},
-                "other": {"base_hours": 30.0, "materials_cost": 3000.0}
-            }
-            default = job_defaults.get(job_type, job_defaults["other"])
-            default["labour_tasks"] = []
-            default["materials"] = []
-            return default
+            logger.warning("Failed to parse LLM estimation: %s. Using defaults.", e)
+            return self.default_estimates(job_type)
+
+    def default_estimates(self, job_type: str) -> dict:
+        """Job-type defaults used when estimation fails or runs out of time"""
+        default = dict(JOB_TYPE_DEFAULTS.get(job_type, JOB_TYPE_DEFAULTS["other"]))
+        default["labour_tasks"] = []
+        default["materials"] = []
+        return default
 
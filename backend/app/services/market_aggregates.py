@@ -0,0 +1,98 @@
+"""Distributions of our own priced bids per job type and postcode area, kept as streaming quantile sketches"""
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.models.schemas import MarketStats, PricingOutput
+from app.utils.address import postcode_area, postcode_district
+from app.utils.quantile_sketch import TDigest
+
+METRICS = ("internal_cost", "balanced_price", "labour_rate")
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+# Key for a job type across all postcode areas
+ALL_AREAS = "*"
+
+
+def area_for_address(address: str) -> Optional[str]:
+    district = postcode_district(address)
+    return postcode_area(district) if district else None
+
+
+def describe(digest: TDigest) -> dict:
+    return {
+        "count": digest.count,
+        "mean": round(digest.mean, 2),
+        "std_dev": round(digest.std_dev, 2),
+        "min": round(digest.min, 2),
+        "max": round(digest.max, 2),
+        "percentiles": {f"p{p}": round(digest.quantile(p / 100), 2) for p in PERCENTILES},
+    }
+
+
+class MarketAggregates:
+    """
+    One t-digest per metric (internal cost, balanced price, labour rate) for each
+    job type × postcode area, plus one per job type across all areas.
+
+    Each stored bid is added once when it is first priced; memory per key is
+    bounded by the sketch compression, not the number of bids.
+    """
+
+    def __init__(self, compression: Optional[int] = None):
+        self.compression = compression or settings.MARKET_SKETCH_COMPRESSION
+        self._sketches: Dict[Tuple[str, str], Dict[str, TDigest]] = {}
+
+    def _sketch(self, job_type: str, area: str) -> Dict[str, TDigest]:
+        key = (job_type, area)
+        if key not in self._sketches:
+            self._sketches[key] = {metric: TDigest(self.compression) for metric in METRICS}
+        return self._sketches[key]
+
+    def record(self, job_type: str, address: str, pricing: PricingOutput, labour_rate: Optional[float]):
+        values = {
+            "internal_cost": pricing.internal_cost_estimate,
+            "balanced_price": pricing.price_bands.balanced,
+            "labour_rate": labour_rate,
+        }
+        area = area_for_address(address)
+        for key_area in ([area] if area else []) + [ALL_AREAS]:
+            sketch = self._sketch(job_type, key_area)
+            for metric, value in values.items():
+                if value:
+                    sketch[metric].add(value)
+
+    def get(self, job_type: str, area: Optional[str] = None) -> Optional[Dict[str, TDigest]]:
+        return self._sketches.get((job_type, area.upper() if area else ALL_AREAS))
+
+    def market_stats(self, job_type: str, address: str) -> Optional[MarketStats]:
+        """
+        Balanced-price distribution of earlier bids for this job type in the
+        address's postcode area, or across all areas when the area has too few;
+        None until MARKET_STATS_MIN_SAMPLES bids have been seen.
+        """
+        area = area_for_address(address)
+        for key_area in ([area] if area else []) + [ALL_AREAS]:
+            sketch = self._sketches.get((job_type, key_area))
+            digest = sketch["balanced_price"] if sketch else None
+            if digest is not None and digest.count >= settings.MARKET_STATS_MIN_SAMPLES:
+                return MarketStats(
+                    mean=round(digest.mean, 2),
+                    std_dev=round(digest.std_dev, 2),
+                    lower_bound=round(digest.quantile(0.01), 2),
+                    upper_bound=round(digest.quantile(0.99), 2),
+                    percentiles={f"p{p}": round(digest.quantile(p / 100), 2) for p in PERCENTILES},
+                    sample_size=digest.count,
+                    area=None if key_area == ALL_AREAS else key_area,
+                    source="historical",
+                )
+        return None
+
+    def keys(self) -> List[dict]:
+        return [
+            {"job_type": job_type, "area": None if area == ALL_AREAS else area, "count": sketch["balanced_price"].count}
+            for (job_type, area), sketch in sorted(self._sketches.items())
+        ]
+
+    def clear(self):
+        self._sketches.clear()
+
+# Global aggregates, fed by every new bid
+market_aggregates = MarketAggregates()
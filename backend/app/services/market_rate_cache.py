@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+class MarketRateCache:
+    """Simple in-memory cache for market rate search results by region and job type"""
+    
+    def __init__(self, ttl_hours: int = 24):
+        self._cache: Dict[str, Dict] = {}
+        self.ttl = timedelta(hours=ttl_hours)
+    
+    def _make_key(self, region: str, job_type: str) -> str:
+        """Create cache key from region and job type"""
+        return f"{region.strip().lower()}:{job_type.lower()}"
+    
+    def get(self, region: str, job_type: str) -> Optional[List[Dict[str, Any]]]:
+        """Get cached search results if available and not expired"""
+        key = self._make_key(region, job_type)
+        
+        if key not in self._cache:
+            return None
+        
+        entry = self._cache[key]
+        if datetime.now() - entry["timestamp"] > self.ttl:
+            # Expired, remove from cache
+            del self._cache[key]
+            return None
+        
+        return entry["results"]
+    
+    def expires_in(self, region: str, job_type: str) -> Optional[timedelta]:
+        """Time until the cached results expire, or None if there are none"""
+        entry = self._cache.get(self._make_key(region, job_type))
+        return entry["timestamp"] + self.ttl - datetime.now() if entry else None
+    
+    def set(self, region: str, job_type: str, results: List[Dict[str, Any]]):
+        """Cache market rate search results for a region and job type"""
+        key = self._make_key(region, job_type)
+        self._cache[key] = {
+            "results": results,
+            "timestamp": datetime.now()
+        }
+    
+    def clear(self):
+        """Clear all cached entries"""
+        self._cache.clear()
+
+# Global cache instance
+market_rate_cache = MarketRateCache()
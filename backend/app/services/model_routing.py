@@ -0,0 +1,94 @@
+"""Per-call-site model routing: model, output cap, temperature and timeout for each LLM task"""
+import time
+import logging
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+from app.config import settings
+from app.utils.cassette import current_cassette
+from app.utils.metrics import metrics
+from app.utils.token_usage import record_llm_call
+from app.services.openai_chat import create_chat_completion
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRoute(BaseModel):
+    model: str
+    max_tokens: int
+    temperature: float
+    timeout: float  # Seconds per request
+    latency_budget: Optional[float] = None  # p95 seconds above which fallback_model is used
+    fallback_model: Optional[str] = None
+
+
+# Output caps are sized to what each prompt asks for; unbounded outputs are
+# the main source of tail latency.
+DEFAULT_ROUTES: Dict[str, ModelRoute] = {
+    "dossier": ModelRoute(model="gpt-3.5-turbo", max_tokens=450, temperature=0.7, timeout=20.0, latency_budget=8.0, fallback_model="gpt-4o-mini"),
+    "explanation": ModelRoute(model="gpt-3.5-turbo", max_tokens=350, temperature=0.7, timeout=20.0, latency_budget=8.0, fallback_model="gpt-4o-mini"),
+    "proposal": ModelRoute(model="gpt-3.5-turbo", max_tokens=900, temperature=0.7, timeout=30.0, latency_budget=12.0, fallback_model="gpt-4o-mini"),
+    "followups": ModelRoute(model="gpt-3.5-turbo", max_tokens=300, temperature=0.7, timeout=15.0, latency_budget=6.0, fallback_model="gpt-4o-mini"),
+    "estimation": ModelRoute(model="gpt-3.5-turbo", max_tokens=1200, temperature=0.2, timeout=30.0, latency_budget=10.0, fallback_model="gpt-4o-mini"),
+    "extraction": ModelRoute(model="gpt-4o-mini", max_tokens=500, temperature=0.1, timeout=20.0),
+    "coaching": ModelRoute(model="gpt-3.5-turbo", max_tokens=250, temperature=0.7, timeout=15.0, latency_budget=4.0, fallback_model="gpt-4o-mini"),
+}
+
+
+def get_route(task: str) -> ModelRoute:
+    """Default route for a task with any LLM_ROUTES overrides from settings applied"""
+    route = DEFAULT_ROUTES[task]
+    overrides = settings.LLM_ROUTES.get(task)
+    if overrides:
+        route = ModelRoute(**{**route.model_dump(), **overrides})
+    return route
+
+
+def latency_metric(task: str) -> str:
+    return f"llm.{task}.latency"
+
+
+def select_model(task: str, route: ModelRoute) -> str:
+    """
+    Primary model, or the route's fallback while the task's recent p95 is over budget.
+
+    Latency is tracked per task rather than per model, so once the fallback
+    brings p95 back under budget the primary model is tried again. Disabled
+    while a cassette records or replays, so a replayed bid makes the same
+    calls it recorded whatever the latency history of either process.
+    """
+    if not settings.LLM_LATENCY_ROUTING or current_cassette.get() is not None:
+        return route.model
+    if not route.fallback_model or route.latency_budget is None:
+        return route.model
+
+    summary = metrics.summary(latency_metric(task))
+    if len(summary.recent) >= settings.LLM_LATENCY_MIN_SAMPLES and summary.percentile(0.95) > route.latency_budget:
+        metrics.incr(f"llm.{task}.fallbacks")
+        return route.fallback_model
+    return route.model
+
+
+def chat_params(task: str) -> dict:
+    """Request parameters for one call of a task"""
+    route = get_route(task)
+    return {
+        "model": select_model(task, route),
+        "max_tokens": route.max_tokens,
+        "temperature": route.temperature,
+        "timeout": route.timeout,
+    }
+
+
+async def complete_for_task(client, task: str, messages: List[dict], **extra):
+    """Non-streaming chat completion routed for a task, with its tokens and latency accounted"""
+    params = chat_params(task)
+    start = time.monotonic()
+    try:
+        response = await create_chat_completion(client, messages=messages, **params, **extra)
+    except Exception:
+        metrics.observe(latency_metric(task), time.monotonic() - start)
+        raise
+
+    content = response.choices[0].message.content if response.choices else ""
+    record_llm_call(task, messages, params["model"], response.usage, content or "", time.monotonic() - start)
+    return response
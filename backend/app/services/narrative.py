@@ -0,0 +1,130 @@
+"""Typed numeric placeholders in LLM narratives, filled locally from PricingOutput"""
+import re
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Optional, Tuple
+from app.models.schemas import PricingOutput, FollowUpScripts
+
+# Placeholder name -> (value type, getter). Types control formatting.
+PLACEHOLDERS: Dict[str, Tuple[str, Callable[[PricingOutput, Optional[float]], Optional[float]]]] = {
+    "price.win": ("money", lambda p, rate: p.price_bands.win_at_all_costs),
+    "price.balanced": ("money", lambda p, rate: p.price_bands.balanced),
+    "price.premium": ("money", lambda p, rate: p.price_bands.premium),
+    "price.min": ("money", lambda p, rate: p.min_recommended_price),
+    "cost.internal": ("money", lambda p, rate: p.internal_cost_estimate),
+    "cost.materials": ("money", lambda p, rate: p.total_materials_cost),
+    "cost.labour": ("money", lambda p, rate: p.total_labour_cost),
+    "rate.labour": ("hourly_rate", lambda p, rate: rate),
+}
+
+FORMATTERS = {
+    "money": lambda v: f"£{v:,.2f}",
+    "hourly_rate": lambda v: f"£{v:,.2f}/hr",
+}
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*([a-z_]+\.[a-z_]+)\s*\}\}")
+
+PLACEHOLDER_DESCRIPTIONS = {
+    "price.win": "win-at-all-costs price",
+    "price.balanced": "balanced (quoted) price",
+    "price.premium": "premium price",
+    "price.min": "minimum recommended price",
+    "cost.internal": "internal cost estimate",
+    "cost.materials": "total materials cost",
+    "cost.labour": "total labour cost",
+    "rate.labour": "labour rate per hour",
+}
+
+# Placeholders each section may contain. Client-facing text only ever shows the
+# quoted price; costs, the floor and the other bands stay in the contractor's own notes.
+SECTION_PLACEHOLDERS: Dict[str, FrozenSet[str]] = {
+    "dossier": frozenset(PLACEHOLDERS),
+    "pricing_explanation": frozenset(PLACEHOLDERS),
+    "proposal": frozenset({"price.balanced"}),
+    "followups": frozenset({"price.balanced"}),
+}
+
+
+def placeholder_instructions(section: str) -> str:
+    """Prompt text telling a generator which placeholders it may use (appended to templated prompts)"""
+    lines = "\n".join(
+        f"- {{{{{name}}}}} {PLACEHOLDER_DESCRIPTIONS[name]}"
+        for name in PLACEHOLDERS if name in SECTION_PLACEHOLDERS[section]
+    )
+    return f"""
+FIGURES: Never write prices, costs or rates as numbers. Wherever you mention one, write its placeholder exactly as shown (including the double braces); it is filled in automatically. Do not mention any other figure:
+{lines}"""
+
+
+def section_values(section: str, values: Dict[str, str]) -> Dict[str, str]:
+    """
+    `values` restricted to the placeholders `section` may show. The others
+    render as empty text, so a template that uses one anyway cannot leak it.
+    """
+    allowed = SECTION_PLACEHOLDERS.get(section, frozenset())
+    return {name: value if name in allowed else "" for name, value in values.items()}
+
+
+def placeholder_values(pricing: PricingOutput, labour_rate: Optional[float]) -> Dict[str, str]:
+    """Formatted value for every placeholder that has a value"""
+    values = {}
+    for name, (kind, getter) in PLACEHOLDERS.items():
+        value = getter(pricing, labour_rate)
+        if value is not None:
+            values[name] = FORMATTERS[kind](value)
+    return values
+
+
+def render(template: str, values: Dict[str, str]) -> str:
+    """Fill placeholders in one pass; unknown placeholders are left as written"""
+    return PLACEHOLDER_PATTERN.sub(lambda m: values.get(m.group(1), m.group(0)), template)
+
+
+class NarrativeRenderer:
+    """
+    Renders templated narratives and caches the result per (bid, revision, section).
+
+    A re-priced bid gets a new revision, so its sections are rendered once
+    from the new PricingOutput and then served from the cache.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, int, str], str]" = OrderedDict()
+
+    def render(self, bid_id: str, revision: int, section: str, template: str, values: Dict[str, str]) -> str:
+        key = (bid_id, revision, section)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        text = render(template, values)
+        self._cache[key] = text
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return text
+
+    def render_sections(self, bid_id: str, revision: int, templates: Dict[str, object], pricing: PricingOutput, labour_rate: Optional[float]) -> Dict[str, object]:
+        """
+        Render each templated section (str or FollowUpScripts) for one bid
+        revision, with only the placeholders in SECTION_PLACEHOLDERS filled
+        """
+        values = placeholder_values(pricing, labour_rate)
+        rendered = {}
+        for section, template in templates.items():
+            allowed = section_values(section, values)
+            if isinstance(template, FollowUpScripts):
+                rendered[section] = FollowUpScripts(**{
+                    field: self.render(bid_id, revision, f"{section}.{field}", text, allowed)
+                    for field, text in template.model_dump().items()
+                })
+            else:
+                rendered[section] = self.render(bid_id, revision, section, template, allowed)
+        return rendered
+
+    def clear(self):
+        """Clear all cached renders"""
+        self._cache.clear()
+
+# Global renderer instance
+narrative_renderer = NarrativeRenderer()
@@ -0,0 +1,21 @@
+from app.utils.cassette import through_cassette
+from app.utils.resilience import upstreams
+
+def _decode_completion(data: dict):
+    from openai.types.chat import ChatCompletion
+    return ChatCompletion.model_validate(data)
+
+async def create_chat_completion(client, **params):
+    """
+    Non-streaming chat completion shared by every OpenAI call site.
+
+    Goes through the OpenAI upstream policy (breaker, concurrency limit,
+    retries) and is recorded to / replayed from the active cassette.
+    """
+    return await through_cassette(
+        "openai",
+        params,
+        lambda: upstreams["openai"].call(lambda: client.chat.completions.create(**params)),
+        encode=lambda response: response.model_dump(mode="json"),
+        decode=_decode_completion
+    )
@@ -0,0 +1,152 @@
+"""Background warming of the market-rate and labour-rate caches for hot regions and job types"""
+import asyncio
+import time
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Deque, Dict, List, Optional, Tuple, get_args
+from app.config import settings
+from app.models.schemas import CreateBidRequest
+from app.services.labour_rate_cache import labour_rate_cache
+from app.services.market_rate_cache import market_rate_cache
+from app.services.valyu_client import ValyuClient, labour_rate_area
+from app.utils.address import postcode_district
+from app.utils.metrics import metrics
+from app.utils.resilience import upstreams
+from app.utils.token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES: Tuple[str, ...] = get_args(CreateBidRequest.model_fields["job_type"].annotation)
+
+# (region, postcode district or None, job type)
+Target = Tuple[str, Optional[str], str]
+
+
+class BidTraffic:
+    """Recent bid requests (for ranking prefetch targets) and the number of bids in flight"""
+
+    def __init__(self, window: int = 1000):
+        self.recent: Deque[Target] = deque(maxlen=window)
+        self.in_flight = 0
+
+    @contextmanager
+    def track(self, request: CreateBidRequest):
+        self.recent.append((request.region, postcode_district(request.address), request.job_type))
+        self.in_flight += 1
+        metrics.set_gauge("bids.in_flight", self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("bids.in_flight", self.in_flight)
+
+    def top(self, n: int) -> List[Target]:
+        return [target for target, _ in Counter(self.recent).most_common(n)]
+
+
+class PrefetchScheduler:
+    """
+    Keeps market and labour rate lookups warm before their cache entries expire.
+
+    Targets come from PREFETCH_TARGETS ("Region" or "Region:District" entries,
+    each for every job type) or, when none are configured, from the most
+    frequent (region, district, job type) combinations in recent bids. Each
+    Valyu request spends from an hourly budget, and a run stops early while
+    foreground bids are in flight or the Valyu concurrency limit is busy.
+    """
+
+    def __init__(self, valyu=None):
+        self._valyu = valyu
+        # Hourly request budget for the upstream
+        self.budget = TokenBucket(settings.PREFETCH_MAX_REQUESTS_PER_HOUR / 3600.0, settings.PREFETCH_MAX_REQUESTS_PER_HOUR)
+        self.refresh_margin = timedelta(minutes=settings.PREFETCH_REFRESH_MARGIN_MINUTES)
+        self._attempted: Dict[Tuple[str, Target], float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def valyu(self) -> ValyuClient:
+        if self._valyu is None:
+            self._valyu = ValyuClient()
+        return self._valyu
+
+    def targets(self) -> List[Target]:
+        if settings.PREFETCH_TARGETS:
+            targets = []
+            for entry in settings.PREFETCH_TARGETS:
+                region, _, district = entry.partition(":")
+                targets.extend((region.strip(), district.strip().upper() or None, job_type) for job_type in JOB_TYPES)
+            return targets
+        return bid_traffic.top(settings.PREFETCH_TOP_TARGETS)
+
+    def foreground_busy(self) -> bool:
+        if bid_traffic.in_flight >= settings.PREFETCH_PAUSE_IN_FLIGHT_BIDS:
+            return True
+        limiter = upstreams["valyu"].limiter
+        return limiter.in_flight >= limiter.limit * settings.PREFETCH_PAUSE_UTILIZATION
+
+    def _due(self, kind: str, target: Target) -> bool:
+        region, district, job_type = target
+        if kind == "market":
+            expires_in = market_rate_cache.expires_in(region, job_type)
+        else:
+            expires_in = labour_rate_cache.expires_in(labour_rate_area(region, district), job_type)
+        if expires_in is not None and expires_in > self.refresh_margin:
+            return False
+        # Lookups that found nothing to cache are not retried until the margin has passed
+        attempted = self._attempted.get((kind, target))
+        return attempted is None or time.monotonic() - attempted > self.refresh_margin.total_seconds()
+
+    async def run_once(self) -> int:
+        """Refresh due lookups until done, paused or out of budget; returns the number of requests made"""
+        requests = 0
+        for target in self.targets():
+            region, district, job_type = target
+            for kind in ("market", "labour"):
+                if not self._due(kind, target):
+                    continue
+                if self.foreground_busy():
+                    metrics.incr("prefetch.paused")
+                    return requests
+                if not self.budget.try_take():
+                    metrics.incr("prefetch.budget_exhausted")
+                    return requests
+
+                self._attempted[(kind, target)] = time.monotonic()
+                requests += 1
+                metrics.incr(f"prefetch.{kind}_refreshes")
+                if kind == "market":
+                    await self.valyu.search_market_rates(region, job_type, refresh=True)
+                else:
+                    await self.valyu.search_labour_rates(region, job_type, address=district, refresh=True)
+        return requests
+
+    async def _run(self):
+        while True:
+            try:
+                requests = await self.run_once()
+                if requests:
+                    logger.info("Prefetch made %d Valyu requests", requests)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Prefetch run failed: %s", e)
+            await asyncio.sleep(settings.PREFETCH_INTERVAL_SECONDS)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global traffic tracker and scheduler
+bid_traffic = BidTraffic()
+prefetch_scheduler = PrefetchScheduler()
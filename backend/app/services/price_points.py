@@ -0,0 +1,157 @@
+"""Competitor price points parsed from market-rate search results"""
+import math
+import re
+from bisect import bisect_left
+from statistics import mean, stdev
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.models.schemas import MarketStats, PricePoint
+
+# One pass per result: an amount or range, optional "k", and an optional unit
+AMOUNT = r"(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s*(k\b)?"
+PRICE_PATTERN = re.compile(
+    r"£\s?" + AMOUNT
+    + r"(?:\s*(?:-|–|to)\s*£?\s?" + AMOUNT + r")?"
+    + r"(?:\s*(?:\+\s*)?(?:vat|inc(?:l\.?|luding)?\s+vat))?"
+    + r"\s*(?P<unit>"
+    + r"(?:per|/|a|an|each)\s*(?:m2|m²|sqm|sq\.?\s*m(?:etre|eter)?s?|square\s+met(?:re|er)s?)"
+    + r"|(?:per|/|a)\s*(?:day|d\b)|pd\b"
+    + r"|(?:per|/|an?)\s*(?:hour|hr)s?\b|ph\b"
+    + r"|(?:per|/|a)\s*(?:week|wk|month|mo|year|yr|annum)\b|pa\b|pcm\b"
+    + r")?",
+    re.IGNORECASE,
+)
+# Amounts in the same sentence as these words are property prices, wages or rents, not job prices.
+# Whole words only, so "current" or "learn" do not match. Matched against lower-cased text:
+# an IGNORECASE alternation is several times slower.
+EXCLUDED_CONTEXT = re.compile(
+    r"\b(?:house prices?|property (?:prices?|values?)|sold for|asking prices?|valuations?|mortgages?|"
+    r"salar(?:y|ies)|earn(?:s|ed|ing|ings)?|incomes?|rent(?:s|ed|al|als)?|stamp duty|council tax|"
+    r"insurance|per ?cent)\b"
+)
+CONTEXT_CHARS = 60
+# An amount with a percentage this close is a rise or a share of something else ("up 5% to £310,000")
+PERCENT_CHARS = 8
+SENTENCE_BREAK = re.compile(r"[.!?]\s|\n")
+
+# Typical job size, used to turn per-m² prices into per-job prices
+TYPICAL_JOB_SQM = {
+    "roof_repair": 15.0,
+    "bathroom_remodel": 6.0,
+    "electrical_rewire": 85.0,
+    "general_renovation": 40.0,
+    "other": 20.0,
+}
+HOURS_PER_DAY = 8.0
+# Sanity bounds for a whole-job price
+MIN_JOB_PRICE = 50.0
+MAX_JOB_PRICE = 250000.0
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+MIN_LOG_IQR = math.log(1.5)
+
+
+def _amount(digits: str, thousands: Optional[str]) -> float:
+    value = float(digits.replace(",", ""))
+    return value * 1000 if thousands else value
+
+
+def _unit(text: Optional[str]) -> Optional[str]:
+    """job / sqm / day for job prices; None for hourly, weekly, monthly or yearly amounts"""
+    if not text:
+        return "job"
+    word = re.sub(r"^(?:per|/|an?|each)\s*", "", text.strip().lower())
+    if word.startswith(("m2", "m²", "sq", "square")):
+        return "sqm"
+    if word.startswith(("day", "d")) or word == "pd":
+        return "day"
+    return None
+
+
+def extract_price_points(results: List[Dict[str, Any]]) -> List[PricePoint]:
+    """
+    £ amounts in market search results with their unit and surrounding text.
+
+    Each result's text is scanned once with a single compiled pattern.
+    Hourly rates (labour rates, detected separately), period amounts
+    (rent, salaries), amounts in a sentence with property-price or wage
+    words and amounts right next to a percentage are skipped.
+    """
+    points: List[PricePoint] = []
+    for result in results:
+        text = result.get("raw_metadata", {}).get("full_content") or result.get("snippet", "")
+        # Excluded words are found in one pass over the text, then looked up per amount
+        excluded = [m.start() for m in EXCLUDED_CONTEXT.finditer(text.lower())]
+        for match in PRICE_PATTERN.finditer(text):
+            unit = _unit(match.group("unit"))
+            if unit is None:
+                continue
+            # Context is limited to the amount's own sentence
+            before = SENTENCE_BREAK.split(text[max(0, match.start() - CONTEXT_CHARS):match.start()])[-1]
+            after = SENTENCE_BREAK.split(text[match.end():match.end() + 20])[0]
+            start, end = match.start() - len(before), match.end() + len(after)
+            nearest = bisect_left(excluded, start)
+            if nearest < len(excluded) and excluded[nearest] < end:
+                continue
+            if "%" in before[-PERCENT_CHARS:] or "%" in after[:PERCENT_CHARS]:
+                continue
+            context = text[start:end]
+            amount = _amount(match.group(1), match.group(2))
+            if match.group(3):
+                high = _amount(match.group(3), match.group(4) or match.group(2))
+                if high < amount:
+                    continue
+                amount = (amount + high) / 2
+            points.append(PricePoint(amount=amount, unit=unit, url=result.get("url"), context=" ".join(context.split())))
+    return points
+
+
+def normalize(point: PricePoint, job_type: str, estimated_hours: float) -> float:
+    """Whole-job price: per-m² prices times a typical job area, day rates times the estimated days"""
+    if point.unit == "sqm":
+        return point.amount * TYPICAL_JOB_SQM.get(job_type, TYPICAL_JOB_SQM["other"])
+    if point.unit == "day":
+        return point.amount * max(estimated_hours / HOURS_PER_DAY, 1.0)
+    return point.amount
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def filter_outliers(values: List[float]) -> List[float]:
+    """
+    Drop values outside Tukey fences (1.5 × IQR) on a log scale, where job prices are roughly symmetric.
+
+    The IQR is floored at a factor of 1.5 so a tight cluster of quotes does
+    not reject every other plausible price.
+    """
+    if len(values) < 4:
+        return values
+    logs = sorted(math.log(v) for v in values)
+    q1, q3 = percentile(logs, 25), percentile(logs, 75)
+    spread = max(q3 - q1, MIN_LOG_IQR)
+    low, high = q1 - 1.5 * spread, q3 + 1.5 * spread
+    return [v for v in values if low <= math.log(v) <= high]
+
+
+def market_stats_from_points(points: List[PricePoint], job_type: str, estimated_hours: float) -> Optional[MarketStats]:
+    """Distribution of normalized competitor prices; None when fewer than MARKET_PRICE_MIN_SAMPLES survive filtering"""
+    values = [normalize(point, job_type, estimated_hours) for point in points]
+    values = filter_outliers([v for v in values if MIN_JOB_PRICE <= v <= MAX_JOB_PRICE])
+    if len(values) < max(settings.MARKET_PRICE_MIN_SAMPLES, 2):
+        return None
+
+    ordered = sorted(values)
+    average, spread = mean(ordered), stdev(ordered)
+    return MarketStats(
+        mean=round(average, 2),
+        std_dev=round(spread, 2),
+        lower_bound=round(max(0.0, average - 3 * spread), 2),
+        upper_bound=round(average + 3 * spread, 2),
+        source="market_search",
+        percentiles={f"p{p}": round(percentile(ordered, p), 2) for p in PERCENTILES},
+        sample_size=len(ordered),
+    )
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.models.schemas import PropertyContext
+from app.utils.address import canonical_address
+from app.utils.metrics import metrics
+
+# Set per bid by the pipeline, not a property fact
+BID_SPECIFIC_FIELDS = {"detected_labour_rate"}
+MAX_CACHED_RESULTS = 20
+
+
+class PropertyContextCache:
+    """
+    In-memory cache of resolved PropertyContexts and their property search
+    results, keyed by canonical address (see app.utils.address).
+
+    Property facts such as year built do not change between bids, so a
+    repeat job on the same property reuses them within the freshness window.
+    Expired entries are kept until evicted so a refreshed context can be
+    merged with what was known before.
+    """
+
+    def __init__(self, freshness_days: Optional[float] = None, max_entries: Optional[int] = None):
+        self.freshness = timedelta(days=freshness_days if freshness_days is not None else settings.PROPERTY_CACHE_FRESHNESS_DAYS)
+        self.max_entries = max_entries if max_entries is not None else settings.PROPERTY_CACHE_MAX_ENTRIES
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, address: str) -> Optional[Tuple[PropertyContext, List[Dict[str, Any]]]]:
+        """Fresh (context copy, property search results) for an address, counted as a hit or miss"""
+        key = canonical_address(address)
+        entry = self._cache.get(key) if key else None
+        if entry is None or datetime.now() - entry["timestamp"] > self.freshness:
+            metrics.incr("property_cache.misses")
+            return None
+
+        self._cache.move_to_end(key)
+        metrics.incr("property_cache.hits")
+        return entry["context"].model_copy(deep=True), list(entry["results"])
+
+    def set(self, address: str, context: PropertyContext, results: List[Dict[str, Any]]):
+        """
+        Cache a resolved context, merged with any earlier entry for the address.
+
+        Fields found now take precedence; fields only the earlier entry had are
+        kept. Search results are merged by URL, newest first.
+        """
+        key = canonical_address(address)
+        if not key:
+            return
+
+        data = context.model_dump(exclude=BID_SPECIFIC_FIELDS)
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            for field, value in previous["context"].model_dump().items():
+                if data.get(field) in (None, [], "unknown") and value not in (None, [], "unknown"):
+                    data[field] = value
+            results = self._merge_results(results, previous["results"])
+
+        self._cache[key] = {
+            "context": PropertyContext(**data),
+            "results": results[:MAX_CACHED_RESULTS],
+            "timestamp": datetime.now(),
+        }
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        metrics.set_gauge("property_cache.entries", len(self._cache))
+
+    def _merge_results(self, new: List[Dict[str, Any]], old: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        seen = {r.get("url") for r in new if r.get("url")}
+        return list(new) + [r for r in old if not r.get("url") or r.get("url") not in seen]
+
+    def clear(self):
+        """Clear all cached entries"""
+        self._cache.clear()
+
+# Global cache instance
+property_context_cache = PropertyContextCache()
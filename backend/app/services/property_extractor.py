@@ -0,0 +1,339 @@
+"""Local pattern-based extraction of property details from search result text, with confidence scores"""
+import re
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from app.models.schemas import PropertyContext
+from app.utils.address import normalize_postcode
+
+CURRENT_YEAR = datetime.date.today().year
+YEAR = r"(1[6-9]\d{2}|20[0-2]\d)"
+
+# (pattern, confidence, year_built_confidence). Group 1 is the year.
+YEAR_BUILT_PATTERNS = [
+    (re.compile(rf"\b(?:year built|construction date|date built)\s*[:\-]?\s*{YEAR}\b", re.I), 0.95, "exact"),
+    (re.compile(rf"\b(?:built|constructed|erected|completed)\s+(?:in\s+)?{YEAR}\b", re.I), 0.9, "exact"),
+    (re.compile(rf"\b(?:dating|dates)\s+(?:back\s+)?(?:from|to)\s+{YEAR}\b", re.I), 0.85, "exact"),
+    (re.compile(rf"\b(?:built|constructed)\s+(?:in\s+)?(?:circa|c\.|around|about|approximately)\s*{YEAR}\b", re.I), 0.75, "estimated"),
+    (re.compile(rf"\b(?:circa|c\.)\s*{YEAR}\b", re.I), 0.6, "estimated"),
+    (re.compile(rf"\b{YEAR}s[- ](?:built|era)\b", re.I), 0.6, "estimated"),
+]
+
+PERIODS = {
+    "georgian": "Georgian", "regency": "Regency", "victorian": "Victorian", "edwardian": "Edwardian",
+    "inter-war": "Inter-war", "interwar": "Inter-war", "art deco": "Inter-war", "post-war": "Post-war",
+    "postwar": "Post-war", "new build": "Modern", "new-build": "Modern",
+}
+PERIOD_PATTERN = re.compile(r"\b(georgian|regency|victorian|edwardian|inter-?war|art deco|post-?war|new[- ]build)\b", re.I)
+DWELLING = r"(?:house|home|property|terrace|semi|villa|cottage|conversion|building|flat|apartment|townhouse|detached|era)"
+PERIOD_DWELLING_PATTERN = re.compile(rf"\b(georgian|regency|victorian|edwardian|inter-?war|art deco|post-?war|new[- ]build)\s+(?:\w+\s+)?{DWELLING}\b", re.I)
+
+# First year of each period, latest first, for deriving a period from a year
+PERIOD_STARTS = [(2000, "Modern"), (1945, "Post-war"), (1918, "Inter-war"), (1901, "Edwardian"), (1837, "Victorian"), (1714, "Georgian")]
+
+# Type words followed by these describe something else: a "flat rate", a "detached garage"
+NOT_A_DWELLING = r"(?![\s-]+(?:rates?|fees?|prices?|costs?|charges?|roof(?:s|ed|ing)?|pack|garages?|outbuildings?)\b)"
+PROPERTY_TYPE_PATTERNS = [
+    # A "detached bungalow" is a bungalow
+    (re.compile(rf"\bsemi[- ]detached\b(?!\s+bungalow){NOT_A_DWELLING}", re.I), "semi_detached"),
+    (re.compile(rf"\b(?<!semi-)(?<!semi )detached\b(?!\s+bungalow){NOT_A_DWELLING}", re.I), "detached"),
+    # A roof or garden terrace is not a terraced house
+    (re.compile(r"\b(?:(?:mid|end)[- ]?)?(?<!roof )(?<!garden )(?<!patio )terrace[d]?\b", re.I), "terraced"),
+    (re.compile(rf"\bbungalow\b{NOT_A_DWELLING}", re.I), "bungalow"),
+    (re.compile(rf"\b(?:flat|apartment|maisonette|studio)\b{NOT_A_DWELLING}", re.I), "flat"),
+]
+# "3 bedroom semi-detached house" / "Edwardian end terrace" style mentions describe the listed property itself
+TYPED_LISTING_PATTERN = re.compile(
+    r"\b(?:\w+[- ]bed(?:room)?|georgian|regency|victorian|edwardian|inter-?war|post-?war|modern)\s+(?:\w+\s+)?"
+    r"(semi[- ]detached|detached|(?:mid|end)?[- ]?terraced?|bungalow|flat|apartment|maisonette)\b", re.I
+)
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8}
+BEDROOM_PATTERN = re.compile(r"\b(\d{1,2}|one|two|three|four|five|six|seven|eight)[- ]bed(?:room)?s?\b", re.I)
+
+SQM_PATTERN = re.compile(r"\b(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*(?:sq\.?\s*m(?:etres|eters)?\b|sqm\b|m²|m2\b|square met(?:re|er)s\b)", re.I)
+SQFT_PATTERN = re.compile(r"\b(\d{1,3}(?:,\d{3})*(?:\.\d+)?)\s*(?:sq\.?\s*ft\b|sqft\b|ft²|square f(?:ee|oo)t\b)", re.I)
+SQFT_TO_SQM = 0.092903
+
+SOLD_PATTERN = re.compile(r"\b(?:last sold|sold|sale price|purchased|bought)\b", re.I)
+PRICE_PATTERN = re.compile(r"£\s?(\d{1,3}(?:,\d{3})+|\d+(?:\.\d+)?)\s?(k|m|million)?\b", re.I)
+MONTHS = {m: i for i, m in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+DATE_PATTERNS = [
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"), "iso"),
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b"), "dmy"),
+    (re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{4})\b", re.I), "d_month_y"),
+    (re.compile(r"\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+(\d{4})\b", re.I), "month_y"),
+]
+SALE_WINDOW = 80  # Characters after a "sold" mention searched for its price and date
+
+STREET_LINE_PATTERN = re.compile(r"^\d+[a-z]?\s+(.+)$", re.I)
+OFF_TARGET_WEIGHT = 0.75  # Confidence multiplier for results that do not mention the address
+
+
+class ExtractedField:
+    """One extracted value with its confidence (0-1)"""
+
+    __slots__ = ("value", "confidence", "detail", "on_target")
+
+    def __init__(self, value: Any, confidence: float, detail: Optional[str] = None, on_target: bool = True):
+        self.value = value
+        self.confidence = confidence
+        self.detail = detail  # e.g. year_built_confidence for the year
+        # False when only results that never mention the address support the value
+        self.on_target = on_target
+
+    def __repr__(self) -> str:
+        return f"ExtractedField({self.value!r}, {self.confidence:.2f})"
+
+
+class Extraction:
+    """Extracted fields of one set of search results"""
+
+    def __init__(self, fields: Dict[str, ExtractedField]):
+        self.fields = fields
+
+    def confident(self, required: Iterable[str], threshold: float) -> bool:
+        """Whether every required field was extracted from address-matched results with at least `threshold` confidence"""
+        return all(name in self.fields and self.trusted(name, threshold) for name in required)
+
+    def trusted(self, name: str, threshold: float) -> bool:
+        """Whether a field is supported by address-matched results with at least `threshold` confidence"""
+        extracted = self.fields.get(name)
+        return extracted is not None and extracted.on_target and extracted.confidence >= threshold
+
+    def value(self, name: str, min_confidence: float = 0.0) -> Any:
+        extracted = self.fields.get(name)
+        return extracted.value if extracted and extracted.confidence >= min_confidence else None
+
+    def to_context(self, min_confidence: float) -> PropertyContext:
+        """PropertyContext with the fields extracted at or above `min_confidence`; cost bands are left unknown"""
+        context = PropertyContext(material_cost_band="unknown", labour_rate_band="unknown")
+        for name, extracted in self.fields.items():
+            if extracted.confidence >= min_confidence:
+                setattr(context, name, extracted.value)
+
+        year = self.fields.get("property_year_built")
+        if context.property_year_built is not None:
+            context.year_built_confidence = year.detail
+
+        if context.last_sale_date:
+            context.ownership_duration_years = float(CURRENT_YEAR - int(context.last_sale_date[:4]))
+        return context
+
+
+def _combine(candidates: List[Tuple[Any, float]]) -> Optional[Tuple[Any, float]]:
+    """
+    Pick the best-supported value among candidates.
+
+    Mentions of the same value reinforce each other (noisy-or); a competing
+    value lowers the winner's confidence in proportion to its own support.
+    """
+    if not candidates:
+        return None
+    grouped: Dict[Any, List[float]] = {}
+    for value, confidence in candidates:
+        grouped.setdefault(value, []).append(confidence)
+    support = {value: _noisy_or(confidences) for value, confidences in grouped.items()}
+    ranked = sorted(support.items(), key=lambda item: item[1], reverse=True)
+    value, score = ranked[0]
+    if len(ranked) > 1:
+        score *= score / (score + ranked[1][1])
+    return value, round(score, 3)
+
+
+def _noisy_or(confidences: Iterable[float]) -> float:
+    remaining = 1.0
+    for confidence in confidences:
+        remaining *= 1 - confidence
+    return round(1 - remaining, 3)
+
+
+def _parse_number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _parse_price(match: re.Match) -> Optional[float]:
+    amount = _parse_number(match.group(1))
+    suffix = (match.group(2) or "").lower()
+    if suffix == "k":
+        amount *= 1_000
+    elif suffix in ("m", "million"):
+        amount *= 1_000_000
+    # Sale prices, not rents or fees
+    return amount if 20_000 <= amount <= 50_000_000 else None
+
+
+def _parse_date(text: str) -> Optional[Tuple[str, float]]:
+    """First date in text as (YYYY-MM-DD, confidence); month-only dates use the 1st and score lower"""
+    for pattern, kind in DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        try:
+            if kind == "iso":
+                date = datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            elif kind == "dmy":
+                date = datetime.date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+            elif kind == "d_month_y":
+                date = datetime.date(int(match.group(3)), MONTHS[match.group(2).lower()[:3]], int(match.group(1)))
+            else:
+                date = datetime.date(int(match.group(2)), MONTHS[match.group(1).lower()[:3]], 1)
+        except ValueError:
+            continue
+        if date.year > CURRENT_YEAR:
+            continue
+        return date.isoformat(), 0.65 if kind == "month_y" else 0.85
+    return None
+
+
+def period_for_year(year: int) -> str:
+    for start, period in PERIOD_STARTS:
+        if year >= start:
+            return period
+    return "Pre-Georgian"
+
+
+class PropertyExtractor:
+    """
+    Extracts year built, period, property type, size, bedrooms and last sale
+    from search result text using compiled patterns.
+
+    Every candidate carries a confidence from the pattern that matched it.
+    Results that mention the target address (postcode or street line) are
+    preferred: other results, which often describe neighbouring sales, are
+    only used for a field when no address-matched result mentions it, and
+    at reduced confidence and marked off-target, so they never count as
+    confident. Candidates are then combined across results (agreement raises
+    confidence, conflict lowers it).
+    """
+
+    def extract(self, raw_results: List[Dict[str, Any]], address: Optional[str] = None) -> Extraction:
+        # Candidates per field, split into (address-matched, other) results
+        candidates: Dict[str, Tuple[List[Tuple[Any, float]], List[Tuple[Any, float]]]] = {}
+        year_details: Dict[int, str] = {}
+        # (date, price, date confidence, price confidence), split like candidates
+        dated_sales: Tuple[List[Tuple[str, float, float, float]], List[Tuple[str, float, float, float]]] = ([], [])
+        markers = self._address_markers(address)
+        street_name = self._street_name(address)
+        on_target = True
+
+        def add(name: str, value: Any, confidence: float):
+            on, off = candidates.setdefault(name, ([], []))
+            (on if on_target else off).append((value, confidence if on_target else confidence * OFF_TARGET_WEIGHT))
+
+        for doc in raw_results:
+            text = self._document_text(doc)
+            if not text:
+                continue
+            lowered = text.lower()
+            on_target = not markers or any(marker in lowered for marker in markers)
+
+            for pattern, confidence, detail in YEAR_BUILT_PATTERNS:
+                for match in pattern.finditer(text):
+                    year = int(match.group(1))
+                    if year <= CURRENT_YEAR:
+                        add("property_year_built", year, confidence)
+                        # Keep the most certain wording seen for this year
+                        if year_details.get(year) != "exact":
+                            year_details[year] = detail
+
+            qualified = {m.group(1).lower() for m in PERIOD_DWELLING_PATTERN.finditer(text)}
+            for match in PERIOD_PATTERN.finditer(text):
+                word = match.group(1).lower()
+                period = PERIODS.get(word) or PERIODS.get(word.replace("-", ""))
+                add("architectural_period", period, 0.8 if word in qualified else 0.55)
+
+            # Street names such as "Park Terrace" say nothing about the property type
+            type_text = re.sub(re.escape(street_name), " ", text, flags=re.I) if street_name else text
+            listed_types = set()
+            for match in TYPED_LISTING_PATTERN.finditer(type_text):
+                listed_types.add(self._property_type(match.group(1)))
+            for pattern, property_type in PROPERTY_TYPE_PATTERNS:
+                if pattern.search(type_text):
+                    add("property_type", property_type, 0.85 if property_type in listed_types else 0.6)
+
+            for match in BEDROOM_PATTERN.finditer(text):
+                raw = match.group(1).lower()
+                bedrooms = NUMBER_WORDS.get(raw) or int(raw)
+                if 0 < bedrooms <= 15:
+                    add("number_of_bedrooms", bedrooms, 0.8)
+
+            for match in SQM_PATTERN.finditer(text):
+                sqm = _parse_number(match.group(1))
+                if 15 <= sqm <= 2000:
+                    add("property_size_sqm", round(sqm, 1), 0.85)
+            for match in SQFT_PATTERN.finditer(text):
+                sqm = _parse_number(match.group(1)) * SQFT_TO_SQM
+                if 15 <= sqm <= 2000:
+                    add("property_size_sqm", round(sqm, 1), 0.8)
+
+            for match in SOLD_PATTERN.finditer(text):
+                window = text[match.end():match.end() + SALE_WINDOW]
+                price_match = PRICE_PATTERN.search(window)
+                price = _parse_price(price_match) if price_match else None
+                date = _parse_date(window)
+                if price and date:
+                    weight = 1.0 if on_target else OFF_TARGET_WEIGHT
+                    dated_sales[0 if on_target else 1].append((date[0], price, date[1] * weight, 0.85 * weight))
+
+        fields: Dict[str, ExtractedField] = {}
+        for name, (on, off) in candidates.items():
+            best = _combine(on or off)
+            if best:
+                detail = year_details.get(best[0]) if name == "property_year_built" else None
+                fields[name] = ExtractedField(best[0], best[1], detail, on_target=bool(on))
+
+        # A confidently dated property implies its period better than weak period mentions
+        if "property_year_built" in fields:
+            year = fields["property_year_built"]
+            derived = round(year.confidence * 0.9, 3)
+            if "architectural_period" not in fields or fields["architectural_period"].confidence < derived:
+                fields["architectural_period"] = ExtractedField(period_for_year(year.value), derived, on_target=year.on_target)
+
+        sales = dated_sales[0] or dated_sales[1]
+        if sales:
+            # The most recent dated sale is the last sale
+            date, price = max(sales, key=lambda sale: sale[0])[:2]
+            agreeing = [(dc, pc) for d, p, dc, pc in sales if d == date and p == price]
+            on_target = bool(dated_sales[0])
+            fields["last_sale_date"] = ExtractedField(date, _noisy_or(dc for dc, _ in agreeing), on_target=on_target)
+            fields["last_sale_price"] = ExtractedField(price, _noisy_or(pc for _, pc in agreeing), on_target=on_target)
+
+        return Extraction(fields)
+
+    def _document_text(self, doc: Dict[str, Any]) -> str:
+        content = doc.get("raw_metadata", {}).get("full_content") or doc.get("snippet", "")
+        return f"{doc.get('title', '')}\n{content}" if content else doc.get("title", "")
+
+    def _address_markers(self, address: Optional[str]) -> List[str]:
+        """Lower-cased strings whose presence ties a result to the address: the postcode and the street line"""
+        if not address:
+            return []
+        markers = []
+        postcode = normalize_postcode(address)
+        if postcode:
+            markers.append(postcode.lower())
+            markers.append(postcode.replace(" ", "").lower())
+        street = self._street_line(address)
+        if len(street) > 4:
+            markers.append(street)
+        return markers
+
+    def _street_line(self, address: str) -> str:
+        """The numbered street part of an address ("27 harbour court" in "Flat 3, 27 Harbour Court, Bristol")"""
+        parts = [part.strip().lower() for part in address.split(",")]
+        return next((part for part in parts if STREET_LINE_PATTERN.match(part)), parts[0])
+
+    def _street_name(self, address: Optional[str]) -> Optional[str]:
+        if not address:
+            return None
+        match = STREET_LINE_PATTERN.match(self._street_line(address))
+        return match.group(1) if match else None
+
+    def _property_type(self, text: str) -> str:
+        for pattern, property_type in PROPERTY_TYPE_PATTERNS:
+            if pattern.search(text):
+                return property_type
+        return "other"
+
+# Global extractor instance
+property_extractor = PropertyExtractor()
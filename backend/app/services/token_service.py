@@ -0,0 +1,74 @@
+import time
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.livekit_client import LiveKitClient
+
+class TokenService:
+    """
+    Mints LiveKit access tokens and reuses them while they are still valid.
+
+    Tokens are cached per (room, identity, grants) and re-minted once they
+    are within `refresh_margin` seconds of expiry, so a client never gets a
+    token that is about to lapse.
+    """
+
+    def __init__(self, client: Optional[LiveKitClient] = None, ttl_seconds: int = 3600, refresh_margin: int = 300, max_entries: int = 10000):
+        self._client = client
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self._cache: Dict[Tuple, Tuple[str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self) -> LiveKitClient:
+        # Built on first use so importing this module does not require LiveKit settings
+        if self._client is None:
+            self._client = LiveKitClient()
+        return self._client
+
+    def _make_key(self, room_name: str, identity: str, grants: Optional[dict]) -> Tuple:
+        return (room_name, identity, tuple(sorted((grants or {}).items())))
+
+    def get_token(self, room_name: str, identity: str, grants: Optional[dict] = None) -> Tuple[str, int]:
+        """Return (token, expires_at) for a participant, minting only when needed"""
+        key = self._make_key(room_name, identity, grants)
+        now = time.time()
+
+        entry = self._cache.get(key)
+        if entry and entry[1] - now > self.refresh_margin:
+            self.hits += 1
+            return entry[0], int(entry[1])
+
+        self.misses += 1
+        token = self.client.create_token(room_name, identity, ttl_seconds=self.ttl_seconds, grants=grants)
+        expires_at = now + self.ttl_seconds
+        if len(self._cache) >= self.max_entries:
+            self._evict(now)
+        self._cache[key] = (token, expires_at)
+        return token, int(expires_at)
+
+    def get_tokens(self, room_name: str, identities: List[str], grants: Optional[dict] = None) -> Dict[str, Tuple[str, int]]:
+        """Tokens for every participant of a room in one call"""
+        return {identity: self.get_token(room_name, identity, grants) for identity in dict.fromkeys(identities)}
+
+    def _evict(self, now: float):
+        """Drop tokens that are no longer reusable; if still full, drop the oldest"""
+        for key in [k for k, (_, exp) in self._cache.items() if exp - now <= self.refresh_margin]:
+            del self._cache[key]
+        while len(self._cache) >= self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    def get_url(self) -> str:
+        return self.client.get_url()
+
+    def clear(self):
+        """Clear all cached tokens"""
+        self._cache.clear()
+
+# Global token service instance
+token_service = TokenService(
+    ttl_seconds=settings.LIVEKIT_TOKEN_TTL_SECONDS,
+    refresh_margin=settings.LIVEKIT_TOKEN_REFRESH_MARGIN_SECONDS
+)
@@ -1,14 +1,38 @@
+import logging
 from typing import List, Dict, Any, Optional
 import re
+import asyncio
 from app.config import settings
 from app.services.labour_rate_cache import labour_rate_cache
-from app.utils.retry import with_retry
+from app.services.market_rate_cache import market_rate_cache
+from app.utils.address import postcode_district
+from app.utils.resilience import upstreams
+from app.utils.cassette import CassetteMiss, current_cassette, replaying, through_cassette
+
+logger = logging.getLogger(__name__)
+
+def labour_rate_area(region: str, address: Optional[str] = None) -> str:
+    """Labour rate cache key: the postcode district when the address has one, else the region"""
+    return postcode_district(address or "") or region.strip().lower()
+
+
+class ValyuSearchError(Exception):
+    """A search the Valyu SDK reported as unsuccessful"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class ValyuClient:
     def __init__(self):
         self.api_key = settings.VALYU_API_KEY
         self.valyu_client = None
         
+        # Replayed bids are served from a cassette and never reach the SDK
+        if replaying():
+            return
+
         # Only initialize if we have a real API key
         if self.api_key and not self.api_key.startswith("placeholder"):
             try:
@@ -21,7 +45,6 @@ class ValyuClient:
         else:
             raise RuntimeError("Valid Valyu API key required. Please set VALYU_API_KEY in .env")
 
-    @with_retry(max_retries=3, initial_delay=1.0)
     async def search_property_details(self, address: str, region: str) -> List[Dict[str, Any]]:
         """Search for comprehensive property information including type, year, size"""
         # Enhanced query with multiple property attributes
@@ -33,26 +56,27 @@ number of bedrooms bedrooms rooms
 property history building permits sales price value zoning 
 architectural style Victorian Edwardian Georgian modern new build"""
         
-        print(f"DEBUG: Executing Valyu search with query: {query}")
+        logger.debug("Executing Valyu property search", extra={"query": query})
 
         try:
-            response = self.valyu_client.search(query, search_type="web")
-            results = self._transform_results(response.results)
-            print(f"Property search returned {len(results)} results for: {address}")
+            results = await self._search(query)
+            logger.info("Property search returned %d results for: %s", len(results), address)
             return results
+        except CassetteMiss:
+            raise
         except Exception as e:
-            print(f"Property search failed: {e}")
+            logger.warning("Property search failed: %s", e)
             return []
 
-    @with_retry(max_retries=3, initial_delay=1.0)
-    async def search_labour_rates(self, region: str, job_type: str, address: str = None) -> Optional[float]:
-        """Search for labour rates in the region for the job type, with caching"""
+    async def search_labour_rates(self, region: str, job_type: str, address: str = None, refresh: bool = False) -> Optional[float]:
+        """Search for labour rates in the region for the job type, with caching (refresh skips the cache read)"""
         
-        # Check cache first
-        cache_key = f"{address or region}"
-        cached_rate = labour_rate_cache.get(cache_key, job_type)
+        # Check cache first (bypassed while recording/replaying so the cassette holds the search)
+        cache_key = labour_rate_area(region, address)
+        use_cache = current_cassette.get() is None
+        cached_rate = labour_rate_cache.get(cache_key, job_type) if use_cache and not refresh else None
         if cached_rate is not None:
-            print(f"Using cached labour rate for {cache_key}, {job_type}: £{cached_rate}/hr")
+            logger.info("Using cached labour rate for %s, %s: £%s/hr", cache_key, job_type, cached_rate)
             return cached_rate
         
         # Search Valyu for labour rates
@@ -61,39 +85,71 @@ architectural style Victorian Edwardian Georgian modern new build"""
         query = f"hourly labour rate for {job_type} in {location_query} cost per hour tradesperson price"
         
         try:
-            response = self.valyu_client.search(query, search_type="web")
-            results = self._transform_results(response.results)
+            results = await self._search(query)
             
             # Extract labour rate from results
             labour_rate = self._extract_labour_rate(results)
             
             if labour_rate:
                 # Cache the result
-                labour_rate_cache.set(cache_key, job_type, labour_rate)
-                print(f"Detected labour rate for {location_query}, {job_type}: £{labour_rate}/hr")
+                if use_cache:
+                    labour_rate_cache.set(cache_key, job_type, labour_rate)
+                logger.info("Detected labour rate for %s, %s: £%s/hr", location_query, job_type, labour_rate)
                 return labour_rate
             
-            print(f"Could not detect labour rate from search results for {location_query}")
+            logger.info("Could not detect labour rate from search results for %s", location_query)
             return None
             
+        except CassetteMiss:
+            raise
         except Exception as e:
-            print(f"Labour rate search failed: {e}")
+            logger.warning("Labour rate search failed: %s", e)
             return None
 
-    @with_retry(max_retries=3, initial_delay=1.0)
-    async def search_market_rates(self, region: str, job_type: str) -> List[Dict[str, Any]]:
-        """Search for average market rates and costs for the job type in the region"""
+    async def search_market_rates(self, region: str, job_type: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Search for average market rates and costs for the job type in the region, with caching"""
+        use_cache = current_cassette.get() is None
+        cached_results = market_rate_cache.get(region, job_type) if use_cache and not refresh else None
+        if cached_results is not None:
+            logger.info("Using cached market rates for %s, %s", region, job_type)
+            return cached_results
+
         query = f"{region} {job_type} average cost price market rate"
         
         try:
-            response = self.valyu_client.search(query, search_type="web")
-            results = self._transform_results(response.results)
-            print(f"Market rate search returned {len(results)} results for: {query}")
+            results = await self._search(query)
+            logger.info("Market rate search returned %d results for: %s", len(results), query)
+            if results and use_cache:
+                market_rate_cache.set(region, job_type, results)
             return results
+        except CassetteMiss:
+            raise
         except Exception as e:
-            print(f"Market rate search failed: {e}")
+            logger.warning("Market rate search failed: %s", e)
             return []
 
+    async def _search(self, query: str) -> List[Dict[str, Any]]:
+        """Run one web search through the Valyu circuit breaker, concurrency limit and cassette"""
+        async def do_search():
+            # The SDK is synchronous; run it off the event loop so stage budgets can time it out
+            response = await asyncio.to_thread(self.valyu_client.search, query, search_type="web")
+            if not response.success:
+                # The SDK reports HTTP failures as tx_id "error-<status>" instead of raising
+                # and transport failures as "exception-<hash>"
+                tx_id = getattr(response, "tx_id", "") or ""
+                if tx_id.startswith("error-") and tx_id[6:].isdigit():
+                    raise ValyuSearchError(response.error or "Valyu search failed", status_code=int(tx_id[6:]))
+                raise ConnectionError(response.error or "Valyu search failed")
+            return self._transform_results(response.results)
+
+        return await through_cassette(
+            "valyu",
+            {"query": query, "search_type": "web"},
+            lambda: upstreams["valyu"].call(do_search),
+            encode=lambda results: results,
+            decode=lambda results: results
+        )
+
     def _transform_results(self, results) -> List[Dict[str, Any]]:
         """Transform Valyu results to our format"""
         transformed = []
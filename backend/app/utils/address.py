@@ -0,0 +1,70 @@
+"""UK address normalization: postcodes and canonical address keys"""
+import re
+from typing import Optional
+
+POSTCODE_PATTERN = re.compile(r"\b([A-Z]{1,2}\d[A-Z\d]?)\s*(\d[A-Z]{2})\b", re.I)
+OUTWARD_CODE_PATTERN = re.compile(r"\b([A-Z]{1,2}\d[A-Z\d]?)\b")
+UNIT_PATTERN = re.compile(r"\b(?:flat|apartment|apt|unit|suite|room)\.?\s*([a-z0-9]+)\b", re.I)
+NUMBERED_STREET_PATTERN = re.compile(r"^(\d+[a-z]?)(?:\s*-\s*\d+[a-z]?)?\s+(.+)$", re.I)
+
+STREET_ABBREVIATIONS = {
+    "rd": "road", "st": "street", "ave": "avenue", "av": "avenue", "ln": "lane", "cl": "close",
+    "cres": "crescent", "cresc": "crescent", "dr": "drive", "gdns": "gardens", "gr": "grove",
+    "gro": "grove", "pl": "place", "sq": "square", "ter": "terrace", "terr": "terrace", "ct": "court",
+    "pde": "parade", "hse": "house", "mws": "mews", "wy": "way", "hl": "hill", "pk": "park",
+}
+
+
+def normalize_postcode(text: str) -> Optional[str]:
+    """First full UK postcode in text, upper-cased with a single space ("sw111aa" -> "SW11 1AA")"""
+    match = POSTCODE_PATTERN.search(text or "")
+    return f"{match.group(1)} {match.group(2)}".upper() if match else None
+
+
+def postcode_district(text: str) -> Optional[str]:
+    """Outward code of the first postcode in text, full or partial ("10 Test Rd, SW11 1AA" / "Battersea SW11" -> "SW11")"""
+    postcode = normalize_postcode(text)
+    if postcode:
+        return postcode.split()[0]
+    match = OUTWARD_CODE_PATTERN.search(text or "")
+    return match.group(1).upper() if match else None
+
+
+def postcode_area(postcode: str) -> str:
+    """Leading letters of a postcode ("SW11 1AA" -> "SW")"""
+    return re.match(r"[A-Z]*", postcode.upper()).group(0)
+
+
+def _normalize_words(text: str) -> str:
+    words = re.sub(r"[^a-z0-9 ]", " ", text.lower()).split()
+    return " ".join(STREET_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def canonical_address(address: str) -> Optional[str]:
+    """
+    Key identifying one property: "<postcode>|<flat>|<house number or name>|<street>".
+
+    "Flat 3, 27 Harbour Ct., Bristol bs1 5ty" and "flat 3 27 harbour court BS15TY"
+    give the same key. Returns None without a postcode, or without a house
+    number or name, since the address could then match several properties.
+    """
+    postcode = normalize_postcode(address)
+    if not postcode:
+        return None
+
+    without_postcode = POSTCODE_PATTERN.sub(" ", address)
+    unit_match = UNIT_PATTERN.search(without_postcode)
+    unit = unit_match.group(1).lower() if unit_match else ""
+    if unit_match:
+        without_postcode = without_postcode[:unit_match.start()] + without_postcode[unit_match.end():]
+
+    parts = [part.strip() for part in re.split(r"[,\n]", without_postcode) if part.strip()]
+    for part in parts:
+        numbered = NUMBERED_STREET_PATTERN.match(part)
+        if numbered:
+            return f"{postcode}|{unit}|{numbered.group(1).lower()}|{_normalize_words(numbered.group(2))}"
+
+    # Named house ("Rose Cottage, Mill Lane"): the first part names the property
+    if len(parts) >= 2:
+        return f"{postcode}|{unit}|{_normalize_words(parts[0])}|{_normalize_words(parts[1])}"
+    return None
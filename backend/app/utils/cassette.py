@@ -0,0 +1,123 @@
+"""Record/replay of upstream traffic (Valyu, OpenAI) for reproducing bids"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(Exception):
+    """A replayed bid made an upstream call that is not in its cassette"""
+
+
+def call_key(upstream: str, request: Dict[str, Any]) -> str:
+    """Stable key for an upstream call: hash of the upstream name and canonical request JSON"""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(f"{upstream}:{canonical}".encode()).hexdigest()[:16]
+
+
+class Cassette:
+    """
+    Upstream requests/responses of one bid, indexed by call key.
+
+    A key maps to a list of entries so repeated identical calls replay in
+    the order they were recorded. Stored as gzip-compressed compact JSON.
+    """
+
+    def __init__(self, mode: str, replay_latency: bool = True):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.meta: Dict[str, Any] = {}
+        self.calls: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+
+    def record(self, key: str, upstream: str, request: Dict[str, Any], response: Any, latency: float):
+        self.calls.setdefault(key, []).append({
+            "upstream": upstream,
+            "request": request,
+            "response": response,
+            "latency": round(latency, 4),
+        })
+
+    def next_entry(self, key: str) -> Dict[str, Any]:
+        entries = self.calls.get(key)
+        index = self._cursor.get(key, 0)
+        if not entries or index >= len(entries):
+            raise CassetteMiss(f"No recorded response for call {key}")
+        self._cursor[key] = index + 1
+        return entries[index]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {"version": CASSETTE_VERSION, "meta": self.meta, "calls": self.calls}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"), default=str)
+
+    @classmethod
+    def load(cls, path: str, replay_latency: bool = True) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {payload.get('version')}")
+        cassette = cls("replay", replay_latency=replay_latency)
+        cassette.meta = payload.get("meta", {})
+        cassette.calls = payload["calls"]
+        return cassette
+
+
+# Cassette of the bid currently executing in this task (propagated to child tasks)
+current_cassette: ContextVar[Optional[Cassette]] = ContextVar("current_cassette", default=None)
+
+
+def replaying() -> bool:
+    """True while a bid is being served from a cassette (no upstream credentials needed)"""
+    cassette = current_cassette.get()
+    return cassette is not None and cassette.mode == "replay"
+
+
+def cassette_path(directory: str, bid_id: str) -> str:
+    return os.path.join(directory, f"{bid_id}.cassette.json.gz")
+
+
+async def through_cassette(
+    upstream: str,
+    request: Dict[str, Any],
+    func: Callable[[], Awaitable[T]],
+    encode: Callable[[T], Any],
+    decode: Callable[[Any], T],
+) -> T:
+    """
+    Run an upstream call through the active cassette, if any.
+
+    record: the real call is made and its encoded response and latency stored.
+    replay: the stored response is decoded and returned, after sleeping the
+    recorded latency unless the cassette was loaded with replay_latency=False.
+    Without a cassette the call is made directly.
+    """
+    cassette = current_cassette.get()
+    if cassette is None:
+        return await func()
+
+    key = call_key(upstream, request)
+    if cassette.mode == "replay":
+        entry = cassette.next_entry(key)
+        if cassette.replay_latency and entry["latency"] > 0:
+            await asyncio.sleep(entry["latency"])
+        return decode(entry["response"])
+
+    start = time.perf_counter()
+    result = await func()
+    cassette.record(key, upstream, request, encode(result), time.perf_counter() - start)
+    return result
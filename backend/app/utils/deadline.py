@@ -0,0 +1,83 @@
+"""Per-bid deadlines and stage time budgets"""
+import asyncio
+import time
+import logging
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class Deadline:
+    """An absolute point in time (monotonic clock) by which a bid must finish."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.degraded_stages: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def budget(self, stage_seconds: float) -> float:
+        """Time a stage may use: its own budget, capped by what is left overall"""
+        return min(stage_seconds, self.remaining())
+
+    def mark_degraded(self, stage: str):
+        if stage not in self.degraded_stages:
+            self.degraded_stages.append(stage)
+
+
+# Deadline of the bid currently executing in this task (propagated to child tasks)
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def get_remaining_time() -> Optional[float]:
+    """Remaining seconds of the current bid's deadline, or None when there is none"""
+    deadline = current_deadline.get()
+    return deadline.remaining() if deadline else None
+
+
+async def run_with_budget(
+    stage: str,
+    func: Callable[[], Awaitable[T]],
+    budget_seconds: float,
+    fallback: Callable[[], T],
+) -> T:
+    """
+    Run one pipeline stage within its time budget.
+
+    If the stage does not finish within min(budget_seconds, time left on the
+    current deadline), it is cancelled, the stage is flagged as degraded on the
+    deadline and the result of ``fallback()`` is returned instead.
+
+    Args:
+        stage: Stage name reported in ``degraded_stages``
+        func: Zero-argument callable returning the stage coroutine
+        budget_seconds: Maximum time this stage may take
+        fallback: Produces the degraded result when the budget runs out
+
+    Returns:
+        The stage result, or the fallback result on timeout
+    """
+    deadline = current_deadline.get()
+    timeout = deadline.budget(budget_seconds) if deadline else budget_seconds
+
+    if timeout <= 0:
+        logger.warning("No time left for stage '%s'. Using degraded result.", stage)
+    else:
+        try:
+            return await asyncio.wait_for(func(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stage '%s' exceeded its %.2fs budget. Using degraded result.", stage, timeout)
+
+    if deadline:
+        deadline.mark_degraded(stage)
+    return fallback()
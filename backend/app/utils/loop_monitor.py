@@ -0,0 +1,208 @@
+"""Event-loop lag monitor and blocking-call detector"""
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.structured_logging import current_bid_id
+
+logger = logging.getLogger(__name__)
+
+# Request being handled in this task, "<METHOD> <path>"
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+MAX_STALLS = 50
+MAX_SITES = 200
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# asyncio.Task accepts a context (and loops pass one to task factories) from Python 3.11
+_TASK_TAKES_CONTEXT = sys.version_info >= (3, 11)
+
+
+def _trim(stack: traceback.StackSummary) -> List[traceback.FrameSummary]:
+    """Frames below the event loop's callback dispatch (asyncio.events.Handle._run)"""
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i].name == "_run" and stack[i].filename.endswith(os.path.join("asyncio", "events.py")):
+            return list(stack[i + 1:])
+    return list(stack)
+
+
+def _blocking_site(frames: List[traceback.FrameSummary]) -> str:
+    """Innermost frame in app/ (the app code making the blocking call), else the innermost frame"""
+    for frame in reversed(frames):
+        if frame.filename.startswith(_APP_DIR):
+            return f"{os.path.relpath(frame.filename, os.path.dirname(_APP_DIR))}:{frame.lineno} in {frame.name}"
+    return f"{frames[-1].filename}:{frames[-1].lineno} in {frames[-1].name}" if frames else "<unknown>"
+
+
+class LoopMonitor:
+    """
+    Watches an event loop from a background thread.
+
+    Every `interval` seconds the thread schedules a no-op callback on the loop
+    and times how long it takes to run: that delay is the loop's lag
+    (event_loop.lag summary and event_loop.lag_ms gauge). If the callback has
+    not run after `threshold` seconds, something is blocking the loop, and the
+    loop thread's stack is captured at that moment along with the route and
+    bid id of the task that was running (read from the task's context, which
+    a task factory records). Stalls are counted per blocking site (the
+    innermost app frame) and the most recent are kept with their stacks; with
+    `debug` each one is also logged.
+
+    The cost is one thread wake-up and one loop callback per interval, plus
+    a weak reference per task created.
+    """
+
+    def __init__(self, interval: Optional[float] = None, threshold: Optional[float] = None, debug: Optional[bool] = None):
+        self.interval = interval if interval is not None else settings.LOOP_MONITOR_INTERVAL_SECONDS
+        self.threshold = threshold if threshold is not None else settings.LOOP_BLOCK_THRESHOLD_MS / 1000
+        self.debug = debug if debug is not None else settings.LOOP_MONITOR_DEBUG
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=MAX_STALLS)
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id = 0
+        self._contexts: "weakref.WeakKeyDictionary[asyncio.Task, contextvars.Context]" = weakref.WeakKeyDictionary()
+        self._previous_factory = None
+        self._lock = threading.Lock()
+
+    def _task_factory(self, loop, coro, context=None):
+        # A context is forwarded only when the loop gave one, so factories and
+        # Task on Python 3.10 are never passed an argument they do not accept
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro, context=context) if context is not None else self._previous_factory(loop, coro)
+        else:
+            if context is None and _TASK_TAKES_CONTEXT:
+                context = contextvars.copy_context()
+            task = asyncio.Task(coro, loop=loop, context=context) if context is not None else asyncio.Task(coro, loop=loop)
+        if context is None:
+            # Task.get_context() exists from Python 3.12; before that the route and bid id go unreported
+            get_context = getattr(task, "get_context", None)
+            context = get_context() if get_context is not None else None
+        if context is not None:
+            self._contexts[task] = context
+        return task
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start watching `loop` (the running loop by default); call from the loop's thread"""
+        if self._thread is not None:
+            return
+        self.loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_factory = self.loop.get_task_factory()
+        self.loop.set_task_factory(self._task_factory)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.set_task_factory(self._previous_factory)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            answered = threading.Event()
+            sent = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:
+                # Loop closed
+                return
+            stall = None
+            if not answered.wait(self.threshold):
+                stall = self._capture()
+                while not answered.wait(self.interval):
+                    if self._stopped.is_set():
+                        return
+            lag = time.perf_counter() - sent
+            metrics.observe("event_loop.lag", lag)
+            metrics.set_gauge("event_loop.lag_ms", round(lag * 1000, 2))
+            if stall is not None:
+                self._record(stall, lag)
+
+    def _capture(self) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        frames = _trim(traceback.extract_stack(frame)) if frame is not None else []
+        task = asyncio.current_task(self.loop)
+        context = self._contexts.get(task) if task is not None else None
+        return {
+            "at": datetime.now().isoformat(),
+            "route": context.get(current_route) if context is not None else None,
+            "bid_id": context.get(current_bid_id) if context is not None else None,
+            "task": task.get_name() if task is not None else None,
+            "site": _blocking_site(frames),
+            "stack": traceback.format_list(frames),
+        }
+
+    def _record(self, stall: Dict[str, Any], blocked: float):
+        stall["blocked_ms"] = round(blocked * 1000, 1)
+        metrics.incr("event_loop.stalls")
+        metrics.observe("event_loop.stall", blocked)
+        with self._lock:
+            self.stalls.append(stall)
+            site = self.sites.get(stall["site"])
+            if site is None and len(self.sites) < MAX_SITES:
+                site = self.sites[stall["site"]] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "routes": set()}
+            if site is not None:
+                site["count"] += 1
+                site["total_ms"] += stall["blocked_ms"]
+                site["max_ms"] = max(site["max_ms"], stall["blocked_ms"])
+                if stall["route"] and len(site["routes"]) < 20:
+                    site["routes"].add(stall["route"])
+        if self.debug:
+            logger.warning(
+                "Event loop blocked for %.0f ms at %s (route %s)\n%s",
+                stall["blocked_ms"], stall["site"], stall["route"], "".join(stall["stack"]),
+                extra={"bid_id": stall["bid_id"], "route": stall["route"], "blocked_ms": stall["blocked_ms"]},
+            )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lag summary, blocking sites by total time blocked, and the most recent stalls"""
+        with self._lock:
+            sites = [
+                {"site": name, **site, "total_ms": round(site["total_ms"], 1), "routes": sorted(site["routes"])}
+                for name, site in self.sites.items()
+            ]
+            stalls = list(reversed(self.stalls))
+        return {
+            "running": self._thread is not None,
+            "threshold_ms": self.threshold * 1000,
+            "lag": metrics.summary("event_loop.lag").snapshot(),
+            "sites": sorted(sites, key=lambda site: site["total_ms"], reverse=True),
+            "recent_stalls": stalls,
+        }
+
+    def clear(self):
+        with self._lock:
+            self.stalls.clear()
+            self.sites.clear()
+
+
+class RouteContextMiddleware:
+    """Sets current_route for each HTTP/WebSocket request so stalls can be traced back to it"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            current_route.set(f"{scope.get('method', 'WS')} {scope['path']}")
+        await self.app(scope, receive, send)
+
+
+# Global monitor for the app's event loop
+loop_monitor = LoopMonitor()
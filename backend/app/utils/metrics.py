@@ -0,0 +1,97 @@
+"""In-process metrics: counters, gauges and latency summaries"""
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+
+class Summary:
+    """Count/sum/min/max plus a sliding window of recent values for percentiles"""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+    def snapshot(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+            "p50": round(self.percentile(0.5), 4),
+            "p95": round(self.percentile(0.95), 4),
+        }
+
+
+class Metrics:
+    """
+    Named counters, gauges and summaries.
+
+    Counters named "<prefix>.hits" / "<prefix>.misses" also get a derived
+    "<prefix>.hit_rate" in the snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.summaries: Dict[str, Summary] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self.summaries.get(name)
+            if summary is None:
+                summary = self.summaries[name] = Summary()
+            summary.observe(value)
+
+    def summary(self, name: str) -> Summary:
+        return self.summaries.get(name) or Summary()
+
+    def hit_rates(self) -> Dict[str, float]:
+        rates = {}
+        for name, hits in self.counters.items():
+            if name.endswith(".hits"):
+                prefix = name[:-len(".hits")]
+                total = hits + self.counters.get(f"{prefix}.misses", 0)
+                rates[f"{prefix}.hit_rate"] = round(hits / total, 4) if total else 0.0
+        return rates
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": {**self.gauges, **self.hit_rates()},
+                "summaries": {name: s.snapshot() for name, s in self.summaries.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.summaries.clear()
+
+
+# Global metrics registry
+metrics = Metrics()
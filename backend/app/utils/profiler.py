@@ -0,0 +1,372 @@
+"""Opt-in sampling profiler for one request or bid, following its task across await points"""
+import asyncio
+import functools
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (function, file, first line of the function)
+Frame = Tuple[str, str, int]
+READY = ("<ready: waiting for the event loop>", "", 0)
+MAX_TASK_DEPTH = 32
+# Frame paths are shown relative to backend/ or the sys.path entry they were imported from
+_PATH_ROOTS = sorted(
+    {os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))}
+    | {os.path.abspath(entry) for entry in sys.path if entry},
+    key=len, reverse=True,
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def _short_path(path: str) -> str:
+    for root in _PATH_ROOTS:
+        if path.startswith(root + os.sep):
+            return path[len(root) + 1:]
+    return path
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return code.co_name, _short_path(code.co_filename), code.co_firstlineno
+
+
+def _coroutine_frames(coro) -> list:
+    """Frames of a coroutine and the coroutines it is awaiting, outermost first"""
+    frames = []
+    while coro is not None and len(frames) < 256:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return frames
+
+
+def _thread_frames(thread_id: int) -> list:
+    frame = sys._current_frames().get(thread_id)
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+# Following an await into other tasks needs asyncio's private Task._fut_waiter
+# and Future._callbacks (and a gather future's _children), which have no public
+# equivalent. If a Python release drops one, stacks stop at the await and a
+# warning is logged once instead of every sample failing.
+_MISSING = object()
+_warned_missing: set = set()
+
+
+def _internal(obj, name: str, default=None):
+    value = getattr(obj, name, _MISSING)
+    if value is _MISSING:
+        if name not in _warned_missing:
+            _warned_missing.add(name)
+            logger.warning("Profiler cannot read asyncio's %s.%s on this Python; awaits on other tasks are not followed", type(obj).__name__, name)
+        return default
+    return value
+
+
+def _completes(callback) -> list:
+    """Futures a done callback resolves: wait_for and shield waiters, gather outers, awaiting tasks"""
+    if isinstance(callback, functools.partial):
+        return [arg for arg in callback.args if isinstance(arg, asyncio.Future)]
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Future):
+        return [owner]
+    futures = []
+    for cell in getattr(callback, "__closure__", None) or ():
+        try:
+            value = cell.cell_contents
+        except ValueError:
+            continue
+        if isinstance(value, asyncio.Future):
+            futures.append(value)
+    return futures
+
+
+class Profile:
+    """
+    Wall-clock samples of one task, as stacks of function frames.
+
+    Each sample walks the task's coroutine chain (so time spent suspended in
+    an await is attributed to the awaiting code) and, when the task is the
+    one running, the synchronous frames below it on the loop thread. Time
+    awaiting other tasks (gather, wait_for, shield, or awaiting a task
+    directly) follows into those tasks, split evenly between them. A task
+    that is ready but not running is waiting on whatever holds the loop, so
+    its sample gets the loop thread's stack under a READY frame.
+    """
+
+    def __init__(self, name: str, task: asyncio.Task, loop: asyncio.AbstractEventLoop, thread_id: int):
+        self.key = uuid.uuid4().hex[:12]
+        self.name = name
+        self.task = task
+        self.loop = loop
+        self.thread_id = thread_id
+        self.started_at = datetime.now()
+        self.duration = 0.0
+        self.frames: Dict[Frame, int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._awaited_by: Optional[Dict[int, list]] = None
+
+    def _frame_id(self, frame: Frame) -> int:
+        index = self.frames.get(frame)
+        if index is None:
+            index = self.frames[frame] = len(self.frames)
+        return index
+
+    def _add(self, stack: List[Frame], weight: float):
+        ids = [self._frame_id(frame) for frame in stack]
+        # Runs of identical stacks are kept as one sample
+        if self.samples and self.samples[-1] == ids:
+            self.weights[-1] += weight
+        else:
+            self.samples.append(ids)
+            self.weights.append(weight)
+
+    def _tasks_completing(self, waiter) -> list:
+        """Tasks whose completion resolves `waiter`, found from their done callbacks (built once per sample)"""
+        if self._awaited_by is None:
+            self._awaited_by = {}
+            for task in asyncio.all_tasks(self.loop):
+                for callback, _ in _internal(task, "_callbacks") or ():
+                    for future in _completes(callback):
+                        self._awaited_by.setdefault(id(future), []).append(task)
+        return self._awaited_by.get(id(waiter), [])
+
+    def _sample_task(self, task: asyncio.Task, prefix: List[Frame], weight: float, thread: list, depth: int):
+        frames = _coroutine_frames(task.get_coro())
+        stack = prefix + [_frame_key(frame) for frame in frames]
+        if asyncio.current_task(self.loop) is task:
+            innermost = frames[-1] if frames else None
+            below = next((i for i, frame in enumerate(thread) if frame is innermost), None)
+            self._add(stack + [_frame_key(frame) for frame in thread[below + 1 if below is not None else 0:]], weight)
+            return
+
+        waiter = _internal(task, "_fut_waiter", _MISSING)
+        if waiter is _MISSING:
+            self._add(stack, weight)
+            return
+        if waiter is None:
+            self._add(stack + [READY] + [_frame_key(frame) for frame in thread], weight)
+            return
+        if isinstance(waiter, asyncio.Task):
+            children = [waiter]
+        else:
+            # Only gather futures have _children; other waiters are matched through done callbacks
+            children = [child for child in getattr(waiter, "_children", None) or () if isinstance(child, asyncio.Task)]
+            children = children or self._tasks_completing(waiter)
+        children = [child for child in children if not child.done()]
+        if not children or depth >= MAX_TASK_DEPTH:
+            self._add(stack + [(f"<await {type(waiter).__name__}>", "", 0)], weight)
+            return
+        for child in children:
+            self._sample_task(child, stack, weight / len(children), thread, depth + 1)
+
+    def sample(self, weight: float):
+        self._awaited_by = None
+        self._sample_task(self.task, [], weight, _thread_frames(self.thread_id), 0)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(self.duration, 4),
+            "samples": len(self.samples),
+        }
+
+    def _label(self, frame: Frame) -> str:
+        name, path, line = frame
+        return f"{name} ({path}:{line})" if path else name
+
+    def speedscope(self) -> Dict[str, Any]:
+        """Sampled profile in speedscope's file format (https://www.speedscope.app)"""
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{self.name} [{self.key}]",
+            "exporter": "bid-sniper profiler",
+            "shared": {"frames": [
+                {"name": name, "file": path, "line": line} if path else {"name": name}
+                for name, path, line in self.frames
+            ]},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+    def collapsed(self) -> str:
+        """Folded stacks ("a;b;c <microseconds>") for flamegraph.pl, inferno or speedscope"""
+        labels = [self._label(frame).replace(";", ":") for frame in self.frames]
+        totals: Dict[str, float] = {}
+        for ids, weight in zip(self.samples, self.weights):
+            line = ";".join(labels[i] for i in ids)
+            totals[line] = totals.get(line, 0.0) + weight
+        return "".join(f"{line} {round(weight * 1e6)}\n" for line, weight in totals.items() if round(weight * 1e6))
+
+
+class _Sampler(threading.Thread):
+    """Background thread sampling a profile; weights are the wall time since the previous sample"""
+
+    def __init__(self, profile: Profile, interval: float):
+        super().__init__(name=f"profiler-{profile.key}", daemon=True)
+        self.profile = profile
+        self.interval = interval
+        self.dropped = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            try:
+                self.profile.sample(now - last)
+            except Exception as e:
+                # The loop thread mutates what is being read; drop the sample
+                self.dropped += 1
+                logger.debug("Profile sample dropped: %r", e)
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        if self.dropped:
+            logger.warning("Profile %s dropped %d samples (kept %d stacks)", self.profile.name, self.dropped, len(self.profile.samples))
+
+
+class ProfileStore:
+    """The most recent profiles by key (bid id, or a generated id for other requests)"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else settings.PROFILE_MAX_STORED
+        self._profiles: "OrderedDict[str, Profile]" = OrderedDict()
+
+    def add(self, profile: Profile):
+        self._profiles.pop(profile.key, None)
+        self._profiles[profile.key] = profile
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Profile]:
+        return self._profiles.get(key)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+    def clear(self):
+        self._profiles.clear()
+
+
+# Profile of the request or bid running in this task, if it is being profiled
+current_profile: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+profile_store = ProfileStore()
+_active_profiles = 0
+
+
+def label_profile(key: str):
+    """Key the current profile, if any, by e.g. the bid id once it is known"""
+    profile = current_profile.get()
+    if profile is not None:
+        profile.key = key
+
+
+@asynccontextmanager
+async def profiled(name: str):
+    """
+    Sample the current task until the block exits and keep the result in
+    profile_store. Yields None (and profiles nothing) when
+    PROFILE_MAX_CONCURRENT profiles are already running.
+    """
+    global _active_profiles
+    if _active_profiles >= settings.PROFILE_MAX_CONCURRENT:
+        logger.warning("Not profiling %s: %d profiles already running", name, _active_profiles)
+        yield None
+        return
+
+    profile = Profile(name, asyncio.current_task(), asyncio.get_running_loop(), threading.get_ident())
+    sampler = _Sampler(profile, settings.PROFILE_INTERVAL_MS / 1000)
+    token = current_profile.set(profile)
+    _active_profiles += 1
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        yield profile
+    finally:
+        sampler.stop()
+        profile.duration = time.perf_counter() - start
+        _active_profiles -= 1
+        current_profile.reset(token)
+        profile_store.add(profile)
+
+
+def _profiling_requested(scope) -> bool:
+    flag = None
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile":
+            flag = value.decode("latin-1")
+            break
+    if flag is None and b"profile=" in scope.get("query_string", b""):
+        flag = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+    # Profiling exposes stacks and timings, so it is never available without a token
+    if not flag or not settings.PROFILING_TOKEN:
+        return False
+    return hmac.compare_digest(flag.encode("latin-1"), settings.PROFILING_TOKEN.encode())
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests sent with an X-Profile header or ?profile= equal to
+    PROFILING_TOKEN. The profile's key is returned in X-Profile-Id and the
+    profile is downloadable from GET /admin/profiles/{key}.
+
+    Only installed with PROFILING_ENABLED and a PROFILING_TOKEN; other
+    requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        async with profiled(f"{scope['method']} {scope['path']}") as profile:
+            async def send_with_profile_id(message):
+                if profile is not None and message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.key.encode())]}
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile_id)
+
+
+def profile_response_body(profile: Profile, format: str) -> Tuple[str, str, str]:
+    """(body, media type, file extension) of a profile download"""
+    if format == "collapsed":
+        return profile.collapsed(), "text/plain", "folded.txt"
+    return json.dumps(profile.speedscope()), "application/json", "speedscope.json"
@@ -0,0 +1,27 @@
+"""Compact serialization of models and dicts interpolated into LLM prompts"""
+import json
+from typing import Any
+from pydantic import BaseModel
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json", exclude_none=True, exclude_defaults=True)
+    if isinstance(value, dict):
+        items = ((k, _compact(v)) for k, v in value.items())
+        return {k: v for k, v in items if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_compact(v) for v in value if v is not None]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def compact_json(value: Any) -> str:
+    """
+    JSON for a prompt without the fields that carry no information.
+
+    Drops None, empty strings/collections and (for pydantic models) fields
+    left at their defaults, and uses no whitespace between tokens.
+    """
+    return json.dumps(_compact(value), separators=(",", ":"), ensure_ascii=False, default=str)
@@ -0,0 +1,138 @@
+"""Streaming quantile estimation in bounded memory (merging t-digest)"""
+import math
+from typing import List, Optional, Tuple
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl).
+
+    Values are summarized as at most ~compression centroids (mean, weight),
+    small near the tails and larger in the middle, so extreme quantiles stay
+    accurate. New values are buffered and merged in batches; memory does not
+    grow with the number of values added. Count, mean, standard deviation,
+    min and max are tracked exactly alongside.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.centroids: List[Tuple[float, float]] = []  # (mean, weight), sorted by mean
+        self._buffer: List[float] = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._sum = 0.0
+        self._sum_squares = 0.0
+
+    def add(self, value: float):
+        self._buffer.append(value)
+        self.count += 1
+        self._sum += value
+        self._sum_squares += value * value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other: "TDigest"):
+        """Fold another digest into this one"""
+        other._compress()
+        self._compress()
+        self.centroids = sorted(self.centroids + other.centroids)
+        self.count += other.count
+        self._sum += other._sum
+        self._sum_squares += other._sum_squares
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._merge_centroids()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        self.centroids = sorted(self.centroids + [(value, 1.0) for value in self._buffer])
+        self._buffer = []
+        self._merge_centroids()
+
+    def _merge_centroids(self):
+        """Merge neighbouring centroids while each stays within its k1 scale-function size limit"""
+        total = sum(weight for _, weight in self.centroids)
+        if total == 0:
+            return
+        merged: List[Tuple[float, float]] = []
+        seen = 0.0
+        mean, weight = self.centroids[0]
+        limit = self._k_inverse(self._k(0.0) + 1.0) * total
+        for next_mean, next_weight in self.centroids[1:]:
+            if seen + weight + next_weight <= limit:
+                mean = (mean * weight + next_mean * next_weight) / (weight + next_weight)
+                weight += next_weight
+            else:
+                merged.append((mean, weight))
+                seen += weight
+                limit = self._k_inverse(self._k(seen / total) + 1.0) * total
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0..1), interpolating between centroid centres"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        target = q * self.count
+        cumulative = 0.0
+        previous_mean, previous_position = self.min, 0.0
+        for mean, weight in self.centroids:
+            # A centroid's mean sits at the middle of its weight
+            position = cumulative + weight / 2
+            if target < position:
+                span = position - previous_position
+                fraction = (target - previous_position) / span if span else 0.0
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_mean, previous_position = mean, position
+            cumulative += weight
+        span = self.count - previous_position
+        fraction = (target - previous_position) / span if span else 1.0
+        return previous_mean + fraction * (self.max - previous_mean)
+
+    def cdf(self, value: float) -> float:
+        """Estimated fraction of values at or below value"""
+        self._compress()
+        if not self.centroids or value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+        cumulative = 0.0
+        previous_mean, previous_position = self.min, 0.0
+        for mean, weight in self.centroids:
+            position = cumulative + weight / 2
+            if value < mean:
+                span = mean - previous_mean
+                fraction = (value - previous_mean) / span if span else 1.0
+                return (previous_position + fraction * (position - previous_position)) / self.count
+            previous_mean, previous_position = mean, position
+            cumulative += weight
+        span = self.max - previous_mean
+        fraction = (value - previous_mean) / span if span else 1.0
+        return (previous_position + fraction * (self.count - previous_position)) / self.count
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self.count if self.count else 0.0
+
+    @property
+    def std_dev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        variance = (self._sum_squares - self._sum * self._sum / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
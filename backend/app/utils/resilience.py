@@ -0,0 +1,280 @@
+"""Per-upstream resilience: circuit breakers, adaptive concurrency limits and retries"""
+import asyncio
+import time
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+from app.config import settings
+from app.utils.retry import retry_with_backoff
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the upstream when its breaker is open or its concurrency limit is full"""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+def is_retriable(error: Exception) -> bool:
+    """
+    Classify an upstream error.
+
+    Timeouts, connection failures, rate limiting (429) and server errors (5xx)
+    are transient and worth retrying. Client errors (bad request, auth) and
+    local failures such as unparseable responses are not.
+    """
+    if isinstance(error, UpstreamUnavailable):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+
+    # openai/httpx connection and timeout errors carry no status code
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    closed: calls pass; consecutive failures are counted.
+    open: calls fail fast until reset_timeout has elapsed.
+    half_open: a single probe call is let through; success closes, failure re-opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning("Circuit opened after %d consecutive failures", self._failures)
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Give back a half-open probe slot that ended without a health signal"""
+        self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+        }
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit driven by observed latency.
+
+    Each fast success raises the limit by 1/limit (about +1 per window of
+    calls); a failure or a call slower than latency_target halves it.
+    Calls beyond the current limit are rejected instead of queued.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int = 1, max_limit: int = 64, latency_target: float = 5.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float, ok: bool):
+        self.in_flight -= 1
+        if ok and latency <= self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        else:
+            self.limit = max(self.min_limit, self.limit / 2)
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "latency_target_seconds": self.latency_target,
+        }
+
+
+class Upstream:
+    """Resilience policy for one external dependency (OpenAI, Valyu)"""
+
+    def __init__(self, name: str, breaker: CircuitBreaker, limiter: AdaptiveLimiter, max_retries: int = 2, initial_delay: float = 0.5):
+        self.name = name
+        self.breaker = breaker
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.initial_delay = initial_delay
+        self.calls = 0
+        self.failures = 0
+        self._latency_ewma: Optional[float] = None
+
+    def _acquire(self) -> float:
+        """Take a concurrency slot (and the half-open probe); returns the start time"""
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.name, "circuit open")
+        if not self.limiter.try_acquire():
+            self.breaker.release_probe()
+            raise UpstreamUnavailable(self.name, f"concurrency limit {int(self.limiter.limit)} reached")
+        self.calls += 1
+        return time.monotonic()
+
+    def _finish(self, latency: float, error: Optional[BaseException] = None):
+        """Release the slot and record the outcome of a call that took `latency` seconds"""
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, Exception):
+            self.failures += 1
+            if is_retriable(error):
+                self.breaker.record_failure()
+            else:
+                # The upstream answered; a client error says nothing about its health
+                self.breaker.release_probe()
+        else:
+            # Cancelled, or a stream closed early by its reader
+            self.breaker.release_probe()
+        self.limiter.release(latency, error is None)
+        self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+
+    async def _attempt(self, func: Callable[[], Awaitable[T]]) -> T:
+        start = self._acquire()
+        try:
+            result = await func()
+        except BaseException as e:
+            self._finish(time.monotonic() - start, e)
+            raise
+        self._finish(time.monotonic() - start)
+        return result
+
+    async def call(self, func: Callable[[], Awaitable[T]], max_retries: Optional[int] = None) -> T:
+        """
+        Call the upstream through its breaker and concurrency limit.
+
+        Retriable errors are retried with jittered exponential backoff;
+        anything else, including UpstreamUnavailable, fails immediately so
+        callers can switch to their fallback.
+        """
+        async def attempt():
+            return await self._attempt(func)
+        attempt.__name__ = f"{self.name} call"
+
+        return await retry_with_backoff(
+            attempt,
+            max_retries=self.max_retries if max_retries is None else max_retries,
+            initial_delay=self.initial_delay,
+            jitter=True,
+            retry_on=is_retriable
+        )
+
+    async def stream(self, func: Callable[[], Awaitable[AsyncIterator[T]]], max_retries: Optional[int] = None) -> AsyncIterator[T]:
+        """
+        Call a streaming endpoint and iterate over its response.
+
+        Opening the stream is retried like call(). The concurrency slot is then
+        held, and success or failure recorded, only once the stream has been
+        read to the end, so a stream that dies midway counts against the
+        breaker. The limiter's latency is the time to open the stream, which
+        does not depend on how long the response is.
+        """
+        async def attempt():
+            start = self._acquire()
+            try:
+                return start, await func()
+            except BaseException as e:
+                self._finish(time.monotonic() - start, e)
+                raise
+        attempt.__name__ = f"{self.name} stream"
+
+        start, response = await retry_with_backoff(
+            attempt,
+            max_retries=self.max_retries if max_retries is None else max_retries,
+            initial_delay=self.initial_delay,
+            jitter=True,
+            retry_on=is_retriable
+        )
+        latency = time.monotonic() - start
+        try:
+            async for item in response:
+                yield item
+        except BaseException as e:
+            self._finish(latency, e)
+            raise
+        self._finish(latency)
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "latency_ewma_seconds": round(self._latency_ewma, 3) if self._latency_ewma is not None else None,
+            "circuit": self.breaker.snapshot(),
+            "concurrency": self.limiter.snapshot(),
+        }
+
+
+def _build_upstream(name: str, concurrency: int, latency_target: float) -> Upstream:
+    return Upstream(
+        name,
+        CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_SECONDS),
+        AdaptiveLimiter(concurrency, max_limit=concurrency * 4, latency_target=latency_target),
+        max_retries=settings.UPSTREAM_MAX_RETRIES
+    )
+
+
+# Global upstream registry
+upstreams: Dict[str, Upstream] = {
+    "openai": _build_upstream("openai", settings.OPENAI_CONCURRENCY_LIMIT, settings.OPENAI_LATENCY_TARGET_SECONDS),
+    "valyu": _build_upstream("valyu", settings.VALYU_CONCURRENCY_LIMIT, settings.VALYU_LATENCY_TARGET_SECONDS),
+}
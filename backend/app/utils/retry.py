@@ -1,8 +1,10 @@
 """Retry utilities with exponential backoff for API calls"""
 import asyncio
 import functools
-from typing import TypeVar, Callable, Any
+import random
+from typing import TypeVar, Callable, Any, Optional
 import logging
+from app.utils.deadline import get_remaining_time
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +15,15 @@ async def retry_with_backoff(
     max_retries: int = 3,
     initial_delay: float = 1.0,
     backoff_factor: float = 2.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    jitter: bool = False,
+    retry_on: Optional[Callable[[Exception], bool]] = None
 ) -> T:
     """
     Retry an async function with exponential backoff.
+
+    When called while a bid deadline is active, no retry is scheduled whose
+    backoff sleep would end past that deadline; the last error is raised instead.
     
     Args:
         func: Async function to retry
@@ -24,6 +31,10 @@ async def retry_with_backoff(
         initial_delay: Initial delay in seconds
         backoff_factor: Multiplier for delay after each retry
         exceptions: Tuple of exceptions to catch and retry
+        jitter: Sleep a random time in [0, delay] ("full jitter") so
+            concurrent callers do not retry in lockstep
+        retry_on: Optional predicate; errors for which it returns False are
+            raised immediately without retrying
         
     Returns:
         Result of the function call
@@ -39,13 +50,22 @@ async def retry_with_backoff(
             return await func()
         except exceptions as e:
             last_exception = e
-            
+
+            if retry_on is not None and not retry_on(e):
+                raise
+
             if attempt == max_retries:
-                logger.error(f"All {max_retries} retries failed for {func.__name__}: {e}")
+                logger.error("All %d retries failed for %s: %s", max_retries, func.__name__, e)
                 raise
-            
-            logger.warning(f"Attempt {attempt + 1}/{max_retries} failed for {func.__name__}: {e}. Retrying in {delay}s...")
-            await asyncio.sleep(delay)
+
+            remaining = get_remaining_time()
+            if remaining is not None and delay >= remaining:
+                logger.warning("Not retrying %s: %.2fs left before deadline, backoff is %ss", func.__name__, remaining, delay)
+                raise
+
+            sleep_for = random.uniform(0, delay) if jitter else delay
+            logger.warning("Attempt %d/%d failed for %s: %s. Retrying in %.2fs...", attempt + 1, max_retries, func.__name__, e, sleep_for)
+            await asyncio.sleep(sleep_for)
             delay *= backoff_factor
     
     raise last_exception
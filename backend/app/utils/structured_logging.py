@@ -0,0 +1,176 @@
+"""
+Non-blocking structured logging.
+
+Records are filtered (level, sampling, per-call-site rate limits) and tagged
+with the current bid id in the calling thread, then handed to a bounded
+queue. A listener thread formats them as JSON lines and writes them out, so
+a slow or blocked stdout never stalls the event loop; when the queue is full
+records are dropped and counted instead.
+"""
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.token_bucket import TokenBucket
+
+# Bid being processed in this task (propagated to child tasks and to_thread calls)
+current_bid_id: ContextVar[Optional[str]] = ContextVar("current_bid_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "bid", "bid_id", "suppressed"}
+MAX_CALL_SITES = 10000
+
+
+class BidContextFilter(logging.Filter):
+    """Adds the current bid id to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "bid_id"):
+            record.bid_id = current_bid_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of records below WARNING for the loggers in `rates`
+    (e.g. {"app.services.valyu_client": 0.1}); warnings and errors are always kept
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (file and line), so one noisy message cannot
+    flood the log. The next record let through from a site reports how many
+    were suppressed before it. Warnings and errors are never rate-limited.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        super().__init__()
+        self.rate = rate_per_second
+        self.burst = burst
+        self._sites: Dict[Tuple[str, int], Tuple[TokenBucket, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            entry = self._sites.get(site)
+            if entry is None:
+                if len(self._sites) >= MAX_CALL_SITES:
+                    self._sites.clear()
+                entry = (TokenBucket(self.rate, self.burst), 0)
+            bucket, suppressed = entry
+            if not bucket.try_take():
+                self._sites[site] = (bucket, suppressed + 1)
+                metrics.incr("logging.rate_limited")
+                return False
+            self._sites[site] = (bucket, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, bid id and any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "bid_id", None):
+            data["bid_id"] = record.bid_id
+        if getattr(record, "suppressed", None):
+            data["suppressed"] = record.suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain lines for local development, with the bid id when there is one"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(bid)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.bid = f" [{record.bid_id}]" if getattr(record, "bid_id", None) else ""
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueues without waiting; a full queue drops the record (counted in
+    logging.dropped). Formatting is left to the listener thread: only the
+    message arguments and exception text are resolved here.
+    """
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("logging.dropped")
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Arguments and tracebacks may not be safe to read later from another thread.
+        # Other handlers still see the original record.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(stream=None) -> QueueListener:
+    """
+    Route the root logger through a NonBlockingQueueHandler to a listener
+    thread writing to `stream` (stdout by default). Returns the started
+    listener; stop it on shutdown to flush what is queued.
+    """
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+    handler.addFilter(RateLimitFilter(settings.LOG_RATE_PER_SECOND, settings.LOG_BURST))
+    handler.addFilter(BidContextFilter())
+
+    root = logging.getLogger()
+    for existing in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    return listener
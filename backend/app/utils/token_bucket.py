@@ -0,0 +1,31 @@
+"""Token bucket rate limiting"""
+import time
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`; starts full"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate if self.rate > 0 else float("inf")
@@ -0,0 +1,157 @@
+"""Token and latency accounting for LLM calls, per call site and per bid"""
+import logging
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_encoders: Dict[str, object] = {}
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Token count for text the API did not report usage for.
+
+    Uses tiktoken when it is installed (optional dependency), otherwise
+    ~4 characters per token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return max(1, len(text) // 4)
+
+    key = model or "default"
+    encoder = _encoders.get(key)
+    if encoder is None:
+        try:
+            encoder = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            encoder = tiktoken.get_encoding("cl100k_base")
+        _encoders[key] = encoder
+    return len(encoder.encode(text))
+
+
+class TokenLedger:
+    """Prompt/completion tokens and latency of one bid's LLM calls, by call site"""
+
+    def __init__(self):
+        self.call_sites: Dict[str, Dict[str, float]] = {}
+
+    def add(self, task: str, prompt_tokens: int, completion_tokens: int, latency: float):
+        site = self.call_sites.setdefault(task, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0})
+        site["calls"] += 1
+        site["prompt_tokens"] += prompt_tokens
+        site["completion_tokens"] += completion_tokens
+        site["latency_seconds"] = round(site["latency_seconds"] + latency, 4)
+
+    def totals(self) -> Dict[str, float]:
+        return {
+            "calls": sum(s["calls"] for s in self.call_sites.values()),
+            "prompt_tokens": sum(s["prompt_tokens"] for s in self.call_sites.values()),
+            "completion_tokens": sum(s["completion_tokens"] for s in self.call_sites.values()),
+        }
+
+    def snapshot(self) -> dict:
+        return {"totals": self.totals(), "call_sites": self.call_sites}
+
+
+# Ledger of the bid being generated, set by BidPipeline
+current_ledger: ContextVar[Optional[TokenLedger]] = ContextVar("current_ledger", default=None)
+
+
+def record_llm_call(task: str, messages: List[dict], model: Optional[str], usage, completion_text: str, latency: float):
+    """
+    Account one LLM call against its call site and the current bid.
+
+    `usage` is the API's usage object (or None, e.g. an interrupted stream),
+    in which case tokens are counted locally and the call is flagged as estimated.
+    """
+    if usage is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    else:
+        prompt_tokens = sum(count_tokens(m.get("content") or "", model) for m in messages)
+        completion_tokens = count_tokens(completion_text, model) if completion_text else 0
+        metrics.incr(f"llm.{task}.estimated_calls")
+
+    metrics.incr(f"llm.{task}.calls")
+    metrics.incr(f"llm.{task}.prompt_tokens", prompt_tokens)
+    metrics.incr(f"llm.{task}.completion_tokens", completion_tokens)
+    metrics.observe(f"llm.{task}.latency", latency)
+
+    ledger = current_ledger.get()
+    if ledger is not None:
+        ledger.add(task, prompt_tokens, completion_tokens, latency)
+
+
+def call_site_report() -> List[dict]:
+    """Call sites ranked by total tokens, with latency percentiles"""
+    tasks = {name[len("llm."):-len(".calls")] for name in metrics.counters if name.startswith("llm.") and name.endswith(".calls")}
+    rows = []
+    for task in tasks:
+        prompt_tokens = metrics.counters.get(f"llm.{task}.prompt_tokens", 0)
+        completion_tokens = metrics.counters.get(f"llm.{task}.completion_tokens", 0)
+        latency = metrics.summary(f"llm.{task}.latency")
+        rows.append({
+            "call_site": task,
+            "calls": int(metrics.counters[f"llm.{task}.calls"]),
+            "estimated_calls": int(metrics.counters.get(f"llm.{task}.estimated_calls", 0)),
+            "prompt_tokens": int(prompt_tokens),
+            "completion_tokens": int(completion_tokens),
+            "total_tokens": int(prompt_tokens + completion_tokens),
+            "latency_total_seconds": round(latency.total, 3),
+            "latency_p50": round(latency.percentile(0.5), 3),
+            "latency_p95": round(latency.percentile(0.95), 3),
+        })
+    return sorted(rows, key=lambda row: (row["total_tokens"], row["latency_total_seconds"]), reverse=True)
+
+
+def format_report(rows: List[dict]) -> str:
+    """Plain-text table of call_site_report() rows"""
+    header = f"{'call site':<12} {'calls':>6} {'prompt':>9} {'completion':>11} {'total':>9} {'share':>6} {'p50 s':>7} {'p95 s':>7} {'sum s':>8}"
+    grand_total = sum(row["total_tokens"] for row in rows) or 1
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['call_site']:<12} {row['calls']:>6} {row['prompt_tokens']:>9} {row['completion_tokens']:>11} "
+            f"{row['total_tokens']:>9} {row['total_tokens'] / grand_total:>6.0%} {row['latency_p50']:>7.2f} "
+            f"{row['latency_p95']:>7.2f} {row['latency_total_seconds']:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+class BidTokenUsage:
+    """Ledgers of the most recent bids, for per-bid token lookups"""
+
+    def __init__(self, max_bids: int = 1000):
+        self.max_bids = max_bids
+        self._bids: "OrderedDict[str, TokenLedger]" = OrderedDict()
+
+    def record(self, bid_id: str, ledger: TokenLedger):
+        totals = ledger.totals()
+        metrics.observe("llm.bid.total_tokens", totals["prompt_tokens"] + totals["completion_tokens"])
+
+        previous = self._bids.pop(bid_id, None)
+        if previous is not None:
+            # Re-priced bids accumulate across revisions
+            for task, site in previous.call_sites.items():
+                merged = ledger.call_sites.setdefault(task, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0})
+                for field, value in site.items():
+                    merged[field] = round(merged[field] + value, 4)
+        self._bids[bid_id] = ledger
+        if len(self._bids) > self.max_bids:
+            self._bids.popitem(last=False)
+
+    def get(self, bid_id: str) -> Optional[TokenLedger]:
+        return self._bids.get(bid_id)
+
+    def recent(self, limit: int = 20) -> Dict[str, dict]:
+        return {bid_id: self._bids[bid_id].totals() for bid_id in list(self._bids)[-limit:]}
+
+    def clear(self):
+        self._bids.clear()
+
+
+# Global per-bid token usage
+bid_token_usage = BidTokenUsage()
@@ -0,0 +1,88 @@
+"""
+Benchmark indexed bid listing queries against a full scan of the store.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bid_listing [--bids 200000] [--queries 200]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.models.entities import BidSession, BidStore
+from app.models.schemas import BidResponse, CreateBidRequest, FollowUpScripts, PricingBands, PricingOutput, PropertyContext
+
+DISTRICTS = [("London", f"SW{n}") for n in range(1, 20)] + [("Manchester", f"M{n}") for n in range(1, 30)] + [("Leeds", f"LS{n}") for n in range(1, 20)]
+JOB_TYPES = ["roof_repair", "bathroom_remodel", "electrical_rewire", "general_renovation", "other"]
+CONTEXT = PropertyContext(material_cost_band="medium", labour_rate_band="medium")
+FOLLOWUP = FollowUpScripts(email_d2="", email_d7="", price_objection_script="")
+
+
+def make_session(i: int, rng: random.Random, now: datetime) -> BidSession:
+    region, district = rng.choice(DISTRICTS)
+    balanced = round(rng.uniform(500, 30000), 2)
+    request = CreateBidRequest.model_construct(
+        address=f"{i} High St, {district} 1AA", region=region, job_type=rng.choice(JOB_TYPES),
+        job_description="", desired_margin_percent=0.2,
+    )
+    data = BidResponse.model_construct(
+        bid_id=str(i), property_context=CONTEXT, revision=1,
+        pricing=PricingOutput.model_construct(
+            internal_cost_estimate=balanced * 0.8,
+            price_bands=PricingBands.model_construct(win_at_all_costs=balanced * 0.9, balanced=balanced, premium=balanced * 1.2),
+            min_recommended_price=balanced * 0.9,
+        ),
+        dossier_text="", pricing_explanation="", proposal_draft="", followup=FOLLOWUP,
+    )
+    return BidSession.model_construct(id=str(i), data=data, request=request, templates={}, created_at=now - timedelta(minutes=rng.randrange(0, 60 * 24 * 365)))
+
+
+def scan(store: BidStore, district: str, job_type: str, since: datetime, low: float, high: float, limit: int):
+    # Scans the compact records' fields; materializing every session would be far slower still
+    matches = [
+        r for r in map(store.record, store)
+        if r.address.endswith(f"{district} 1AA") and r.job_type == job_type and r.created_at >= since
+        and low <= r.price("balanced") <= high
+    ]
+    return sorted(matches, key=lambda s: (s.created_at, s.id), reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bids", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    now = datetime.now()
+    store = BidStore()
+    start = time.perf_counter()
+    for i in range(args.bids):
+        session = make_session(i, rng, now)
+        store[session.id] = session
+    elapsed = time.perf_counter() - start
+    print(f"insert     {args.bids:>8} bids    in {elapsed:6.3f}s  ->  {elapsed / args.bids * 1e6:8.1f} µs per bid")
+
+    queries = [
+        (rng.choice(DISTRICTS)[1], rng.choice(JOB_TYPES), now - timedelta(days=rng.choice([30, 90, 365])), 5000.0, 10000.0)
+        for _ in range(args.queries)
+    ]
+    for name, run in [
+        ("indexed", lambda q: store.query(postcode=q[0], job_type=q[1], created_from=q[2], min_price=q[3], max_price=q[4], limit=50)[0]),
+        ("scan", lambda q: scan(store, *q, limit=50)),
+    ]:
+        start = time.perf_counter()
+        for query in queries:
+            run(query)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {args.queries:>8} queries in {elapsed:6.3f}s  ->  {elapsed / args.queries * 1e3:8.2f} ms per query")
+
+    start = time.perf_counter()
+    for _ in range(args.queries):
+        store.query(limit=50)
+    elapsed = time.perf_counter() - start
+    print(f"{'newest':<10} {args.queries:>8} pages   in {elapsed:6.3f}s  ->  {elapsed / args.queries * 1e3:8.2f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
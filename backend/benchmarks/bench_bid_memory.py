@@ -0,0 +1,132 @@
+"""
+Benchmark memory per stored bid: compact BidStore records vs plain BidSession objects.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bid_memory [--sizes 1000,10000,100000] [--baseline-max 10000]
+
+The plain-object baseline is only measured up to --baseline-max bids, since
+at 100k bids it needs several GB.
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.models.entities import BidSession, BidStore
+from app.models.schemas import (
+    BidResponse, CreateBidRequest, FollowUpScripts, MarketStats, PricingBands, PricingOutput, PropertyContext
+)
+
+# Pseudo-words from a vocabulary large enough that generated text compresses
+# about as well as English prose (~3x with zlib), not better
+SYLLABLES = "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo ga ge gi go la le li lo lu ma me mi mo mu na ne ni no ra re ri ro ru sa se si so ta te ti to tu va ve vi wa we".split()
+WORDS = [
+    "".join(random.Random(n).choice(SYLLABLES) for _ in range(1 + n % 4))
+    for n in range(4000)
+]
+POOL_SIZE = 50
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + "."
+
+
+def make_session(rng: random.Random, i: int) -> BidSession:
+    """A bid with typical sizes: ~8 KB of generated text plus templates and ten ~4 KB search results"""
+    balanced = rng.uniform(1000, 20000)
+    results = []
+    for r in range(10):
+        content = text(rng, 600)
+        url = f"https://example.com/{i}/{r}"
+        results.append({"title": text(rng, 8), "snippet": content[:300], "url": url,
+                        "raw_metadata": {"full_content": content, "url": url}})
+    followup = FollowUpScripts(email_d2=text(rng, 80), email_d7=text(rng, 80), price_objection_script=text(rng, 100))
+    response = BidResponse(
+        bid_id=str(i),
+        property_context=PropertyContext(
+            property_year_built=1890, architectural_period="Victorian", property_type="terraced",
+            number_of_bedrooms=3, material_cost_band="medium", labour_rate_band="medium", detected_labour_rate=55.0,
+            likely_risk_flags=["Old wiring/plumbing risk"],
+        ),
+        pricing=PricingOutput(
+            internal_cost_estimate=balanced * 0.8,
+            price_bands=PricingBands(win_at_all_costs=balanced * 0.94, balanced=balanced, premium=balanced * 1.25),
+            min_recommended_price=balanced * 0.94,
+            market_stats=MarketStats(mean=balanced * 1.01, std_dev=balanced * 0.12, lower_bound=balanced * 0.65, upper_bound=balanced * 1.37),
+            total_materials_cost=balanced * 0.3, total_labour_cost=balanced * 0.5,
+        ),
+        dossier_text=text(rng, 300),
+        pricing_explanation=text(rng, 150),
+        proposal_draft=text(rng, 600),
+        followup=followup,
+        raw_valyu_results=results,
+    )
+    request = CreateBidRequest(address=f"{i} High St, SW11 1AA", region="London", job_type="roof_repair",
+                               job_description=text(rng, 40), desired_margin_percent=0.2)
+    templates = {"dossier": response.dossier_text, "pricing_explanation": response.pricing_explanation,
+                 "proposal": response.proposal_draft, "followups": followup}
+    return BidSession(id=str(i), data=response, request=request, templates=templates,
+                      estimates={"base_hours": 24.0, "materials_cost": 1200.0},
+                      created_at=datetime(2026, 1, 1) + timedelta(minutes=i))
+
+
+def measure(build, count: int):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build(count)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    gc.collect()
+    return used, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--baseline-max", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    pool = [make_session(rng, i).model_dump_json() for i in range(POOL_SIZE)]
+
+    def session(i: int) -> BidSession:
+        # Independent objects per bid, with ids that do not repeat
+        loaded = BidSession.model_validate_json(pool[i % POOL_SIZE])
+        loaded.id = loaded.data.bid_id = f"bid-{i}"
+        return loaded
+
+    def plain(count: int):
+        return {f"bid-{i}": session(i) for i in range(count)}
+
+    def compact(count: int):
+        store = BidStore()
+        for i in range(count):
+            store[f"bid-{i}"] = session(i)
+        return store
+
+    print(f"{'bids':>8}  {'plain B/bid':>12}  {'compact B/bid':>14}  {'ratio':>6}  {'compact build':>14}")
+    for count in (int(size) for size in args.sizes.split(",")):
+        compact_bytes, compact_time = measure(compact, count)
+        if count <= args.baseline_max:
+            plain_bytes, _ = measure(plain, count)
+            baseline = f"{plain_bytes / count:>12,.0f}"
+            ratio = f"{plain_bytes / compact_bytes:>5.1f}x"
+        else:
+            baseline, ratio = f"{'-':>12}", f"{'-':>6}"
+        print(f"{count:>8}  {baseline}  {compact_bytes / count:>14,.0f}  {ratio}  {compact_time:>12.1f}s")
+
+    store = compact(1)
+    start = time.perf_counter()
+    for _ in range(200):
+        store["bid-0"].data
+    print(f"materialize one BidSession: {(time.perf_counter() - start) / 200 * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark LiveKit token minting with and without the reuse cache.
+
+Usage (from backend/):
+    python -m benchmarks.bench_livekit_tokens [--requests 20000] [--participants 50]
+"""
+import argparse
+import os
+import time
+
+# Dummy credentials so the benchmark runs without a .env
+for key, value in {
+    "OPENAI_API_KEY": "bench", "VALYU_API_KEY": "bench",
+    "LIVEKIT_API_KEY": "bench-key", "LIVEKIT_API_SECRET": "bench-secret-bench-secret-bench-secret",
+    "LIVEKIT_URL": "wss://bench.invalid",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.services.livekit_client import LiveKitClient, load_livekit_sdk
+from app.services.token_service import TokenService
+
+
+def run(label: str, mint, requests: int, participants: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        mint("bench-room", f"participant-{i % participants}")
+    elapsed = time.perf_counter() - start
+    rate = requests / elapsed
+    print(f"{label:<14} {requests:>8} tokens in {elapsed:6.3f}s  ->  {rate:>12,.0f} tokens/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--participants", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Signing path: {'livekit SDK' if load_livekit_sdk() else 'pyjwt fallback'}")
+    client = LiveKitClient()
+    uncached = run("no cache", client.create_token, args.requests, args.participants)
+
+    service = TokenService(client)
+    cached = run("with cache", service.get_token, args.requests, args.participants)
+
+    print(f"Speedup: {cached / uncached:.1f}x  (hits={service.hits}, misses={service.misses})")
+
+
+if __name__ == "__main__":
+    main()
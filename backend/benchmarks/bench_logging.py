@@ -0,0 +1,125 @@
+"""
+Benchmark event-loop lag from logging to a slow stdout: print vs a logging StreamHandler vs the queue handler.
+
+Usage (from backend/):
+    python -m benchmarks.bench_logging [--bids 50] [--messages 40] [--drain-kbps 256]
+
+Log output goes to a pipe drained at --drain-kbps, standing in for a
+container log pipe that cannot keep up. Once the pipe buffer is full, every
+synchronous write blocks the event loop until the reader catches up.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import threading
+import time
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.structured_logging import configure_logging, current_bid_id
+
+# About the size of the old multi-line Valyu property query dump
+MESSAGE = "Executing Valyu search with query: 27 Harbour Court, Bristol BS1 5TY " + "property type year built " * 14
+PROBE_SECONDS = 0.005
+
+
+class SlowPipe:
+    """A pipe whose reader thread drains at most `kbps` kilobytes per second"""
+
+    def __init__(self, kbps: float):
+        read_fd, write_fd = os.pipe()
+        self.writer = os.fdopen(write_fd, "w", buffering=1)
+        self._reader = os.fdopen(read_fd, "rb", buffering=0)
+        self._chunk = 4096
+        self._pause = self._chunk / (kbps * 1024)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while self._reader.read(self._chunk):
+            time.sleep(self._pause)
+
+    def close(self):
+        self.writer.close()
+        self._thread.join()
+        self._reader.close()
+
+
+async def run(log, bids: int, messages: int):
+    """Loop lag samples (seconds) while `bids` concurrent tasks each log `messages` times"""
+    lags = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_SECONDS)
+            lags.append(time.perf_counter() - start - PROBE_SECONDS)
+
+    async def bid(i: int):
+        current_bid_id.set(f"bid-{i}")
+        for _ in range(messages):
+            log(MESSAGE)
+            await asyncio.sleep(0.002)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(bid(i) for i in range(bids)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+    return lags, elapsed
+
+
+def report(name: str, lags, elapsed: float, dropped: int = 0):
+    lags = sorted(lags)
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f"{name:<16} wall {elapsed:6.2f}s  lag p50 {statistics.median(lags) * 1e3:7.2f} ms  "
+          f"p99 {p99 * 1e3:7.2f} ms  max {lags[-1] * 1e3:7.2f} ms  dropped {dropped}")
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bids", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=40)
+    parser.add_argument("--drain-kbps", type=float, default=256)
+    args = parser.parse_args()
+    # Measure the queue itself, not the per-call-site rate limit
+    settings.LOG_RATE_PER_SECOND = 0
+
+    pipe = SlowPipe(args.drain_kbps)
+    lags, elapsed = asyncio.run(run(lambda message: print(message, file=pipe.writer, flush=True), args.bids, args.messages))
+    report("print", lags, elapsed)
+    pipe.close()
+
+    pipe = SlowPipe(args.drain_kbps)
+    reset_root()
+    handler = logging.StreamHandler(pipe.writer)
+    logging.getLogger().addHandler(handler)
+    logger = logging.getLogger("bench")
+    lags, elapsed = asyncio.run(run(logger.info, args.bids, args.messages))
+    report("StreamHandler", lags, elapsed)
+    reset_root()
+    pipe.close()
+
+    pipe = SlowPipe(args.drain_kbps)
+    metrics.reset()
+    listener = configure_logging(stream=pipe.writer)
+    lags, elapsed = asyncio.run(run(logger.info, args.bids, args.messages))
+    listener.stop()
+    report("queue handler", lags, elapsed, metrics.counters.get("logging.dropped", 0))
+    reset_root()
+    pipe.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark rendering templated narratives against a price change.
+
+Usage (from backend/):
+    python -m benchmarks.bench_narrative_render [--revisions 10000]
+"""
+import argparse
+import time
+
+from app.models.schemas import FollowUpScripts, PricingBands, PricingOutput
+from app.services.narrative import NarrativeRenderer
+
+TEMPLATES = {
+    "pricing_explanation": "Our internal cost is {{cost.internal}} ({{cost.materials}} materials, {{cost.labour}} labour at {{rate.labour}}). " * 4,
+    "proposal": "Dear homeowner,\n\n" + "The fixed price for the works is {{price.balanced}}, including all materials and labour. " * 12,
+    "followups": FollowUpScripts(
+        email_d2="Just checking in on our quote of {{price.balanced}}.",
+        email_d7="Our quote of {{price.balanced}} is still available this week.",
+        price_objection_script="We can go as low as {{price.min}} by adjusting the scope.",
+    ),
+}
+
+
+def pricing(balanced: float) -> PricingOutput:
+    return PricingOutput(
+        internal_cost_estimate=balanced * 0.8,
+        price_bands=PricingBands(win_at_all_costs=balanced * 0.9, balanced=balanced, premium=balanced * 1.2),
+        min_recommended_price=balanced * 0.85,
+        total_materials_cost=balanced * 0.3,
+        total_labour_cost=balanced * 0.5,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--revisions", type=int, default=10000)
+    args = parser.parse_args()
+
+    renderer = NarrativeRenderer()
+    start = time.perf_counter()
+    for revision in range(args.revisions):
+        renderer.render_sections("bench", revision, TEMPLATES, pricing(1000.0 + revision), 55.0)
+    elapsed = time.perf_counter() - start
+    print(f"re-render  {args.revisions:>8} price changes in {elapsed:6.3f}s  ->  {elapsed / args.revisions * 1e6:8.1f} µs per change")
+
+    start = time.perf_counter()
+    for _ in range(args.revisions):
+        renderer.render_sections("bench", 0, TEMPLATES, pricing(1000.0), 55.0)
+    elapsed = time.perf_counter() - start
+    print(f"cached     {args.revisions:>8} reads         in {elapsed:6.3f}s  ->  {elapsed / args.revisions * 1e6:8.1f} µs per read")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark price-point extraction over a bid's worth of market search results.
+
+Usage (from backend/):
+    python -m benchmarks.bench_price_points [--bids 1000] [--results 10]
+"""
+import argparse
+import random
+import time
+
+from app.services.price_points import extract_price_points, market_stats_from_points
+
+SENTENCES = [
+    "A typical roof repair costs £{a}-£{b}.",
+    "Replacing the roof covering is £{c},000 to £{d},000 + VAT.",
+    "Roofers charge £{day} per day or £{hour} per hour.",
+    "Felt roofing is around £{sqm} per m2 installed.",
+    "The average house price in the area is £{house},000.",
+    "Most homeowners get three quotes before choosing a contractor.",
+    "Scaffolding adds £{scaffold} to most jobs.",
+    "Guttering and fascias are often replaced at the same time.",
+]
+
+
+def make_results(rng: random.Random, count: int) -> list:
+    results = []
+    for i in range(count):
+        text = " ".join(
+            rng.choice(SENTENCES).format(
+                a=rng.randint(200, 500), b=rng.randint(600, 1200), c=rng.randint(4, 6), d=rng.randint(7, 10),
+                day=rng.randint(150, 300), hour=rng.randint(20, 60), sqm=rng.randint(40, 90),
+                house=rng.randint(300, 900), scaffold=rng.randint(500, 1500),
+            )
+            for _ in range(60)
+        )
+        results.append({"title": f"Result {i}", "snippet": text[:300], "url": f"https://example.com/{i}", "raw_metadata": {"full_content": text}})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bids", type=int, default=1000)
+    parser.add_argument("--results", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    bids = [make_results(rng, args.results) for _ in range(args.bids)]
+    characters = sum(len(r["raw_metadata"]["full_content"]) for r in bids[0])
+
+    start = time.perf_counter()
+    samples = 0
+    for results in bids:
+        points = extract_price_points(results)
+        market_stats_from_points(points, "roof_repair", estimated_hours=24)
+        samples += len(points)
+    elapsed = time.perf_counter() - start
+    print(f"extract    {args.bids:>8} bids ({args.results} results, {characters} chars each) in {elapsed:6.3f}s"
+          f"  ->  {elapsed / args.bids * 1e3:6.2f} ms per bid, {samples / args.bids:.0f} price points")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark local property extraction against the LLM on a labelled corpus.
+
+Reports per-field accuracy, coverage and wrong answers at the usable
+(LOCAL_EXTRACTION_MIN_CONFIDENCE) and skip (LOCAL_EXTRACTION_CONFIDENCE)
+thresholds, how many cases would skip the LLM call, and latency. With
+--llm (needs OPENAI_API_KEY) the same corpus is run through the LLM
+extraction for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_property_extraction [--corpus PATH] [--repeat 200] [--llm]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from app.config import settings
+from app.services.property_extractor import PropertyExtractor
+
+FIELDS = ["property_year_built", "architectural_period", "property_type", "number_of_bedrooms", "property_size_sqm", "last_sale_price", "last_sale_date"]
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "property_extraction_corpus.json")
+
+
+def to_raw_results(case: dict) -> list:
+    """Corpus results in the shape ValyuClient._transform_results produces"""
+    return [{
+        "title": r["title"],
+        "snippet": r["content"][:300],
+        "url": "",
+        "raw_metadata": {"full_content": r["content"], "url": ""},
+    } for r in case["results"]]
+
+
+def matches(expected, actual) -> bool:
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return abs(expected - actual) <= 0.02 * abs(expected)
+    return expected == actual
+
+
+def score(predictions: list, cases: list) -> dict:
+    """Per field: correct / wrong / missed / invented (value for a field the text does not state)"""
+    table = {field: {"correct": 0, "wrong": 0, "missed": 0, "invented": 0} for field in FIELDS}
+    for predicted, case in zip(predictions, cases):
+        for field in FIELDS:
+            expected, actual = case["expected"].get(field), predicted.get(field)
+            if expected is None:
+                table[field]["invented"] += actual is not None
+            elif actual is None:
+                table[field]["missed"] += 1
+            else:
+                table[field]["correct" if matches(expected, actual) else "wrong"] += 1
+    return table
+
+
+def print_table(label: str, table: dict):
+    print(f"\n{label}")
+    print(f"  {'field':<22} {'correct':>7} {'wrong':>6} {'missed':>7} {'invented':>9}")
+    for field, row in table.items():
+        print(f"  {field:<22} {row['correct']:>7} {row['wrong']:>6} {row['missed']:>7} {row['invented']:>9}")
+
+
+def bench_local(cases: list, repeat: int):
+    extractor = PropertyExtractor()
+    inputs = [(to_raw_results(case), case["address"]) for case in cases]
+
+    timings = []
+    for raw_results, address in inputs:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extractor.extract(raw_results, address)
+        timings.append((time.perf_counter() - start) / repeat)
+    print(f"Local extraction: median {statistics.median(timings) * 1e6:.0f} µs, max {max(timings) * 1e6:.0f} µs per bid")
+
+    extractions = [extractor.extract(raw_results, address) for raw_results, address in inputs]
+    for label, threshold in (("usable", settings.LOCAL_EXTRACTION_MIN_CONFIDENCE), ("skip", settings.LOCAL_EXTRACTION_CONFIDENCE)):
+        predictions = [{f: e.value(f, threshold) for f in FIELDS} for e in extractions]
+        print_table(f"Local, confidence >= {threshold} ({label})", score(predictions, cases))
+
+    skips = [e.confident(settings.LOCAL_EXTRACTION_REQUIRED_FIELDS, settings.LOCAL_EXTRACTION_CONFIDENCE) for e in extractions]
+    print(f"\nWould skip the LLM call for {sum(skips)}/{len(cases)} cases (required: {', '.join(settings.LOCAL_EXTRACTION_REQUIRED_FIELDS)})")
+    for case, skipped, extraction in zip(cases, skips, extractions):
+        if skipped:
+            wrong = [f for f in settings.LOCAL_EXTRACTION_REQUIRED_FIELDS if not matches(case["expected"].get(f), extraction.value(f))]
+            if wrong:
+                print(f"  skipped with wrong required fields {wrong}: {case['address']}")
+
+
+async def bench_llm(cases: list):
+    from app.services.context_optimizer import ContextOptimizer
+
+    settings.LOCAL_EXTRACTION_SKIP_LLM = False
+    optimizer = ContextOptimizer()
+    if not optimizer.client:
+        print("\n--llm needs OPENAI_API_KEY")
+        return
+
+    timings, predictions = [], []
+    for case in cases:
+        start = time.perf_counter()
+        context = await optimizer.optimize(to_raw_results(case), {"address": case["address"], "job_type": "roof_repair"})
+        timings.append(time.perf_counter() - start)
+        predictions.append({f: getattr(context, f) for f in FIELDS})
+    print(f"\nLLM extraction: median {statistics.median(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms per bid")
+    print_table("LLM", score(predictions, cases))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--llm", action="store_true", help="Also run the LLM extraction (costs API calls)")
+    args = parser.parse_args()
+
+    with open(args.corpus) as f:
+        cases = json.load(f)["cases"]
+    print(f"{len(cases)} labelled cases")
+
+    bench_local(cases, args.repeat)
+    if args.llm:
+        asyncio.run(bench_llm(cases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark cold start: import time of app.main and time to first request.
+
+Each run is a fresh interpreter, so nothing is cached between runs.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Executed in a fresh interpreter per run
+PROBE = r"""
+import asyncio, json, sys, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def first_request():
+    # Drive the ASGI app directly so no HTTP client import is measured
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/health", "raw_path": b"/health", "query_string": b"",
+             "root_path": "", "headers": [], "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000)}
+    sent = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        sent.append(message)
+    await app(scope, receive, send)
+    return sent[0]["status"]
+
+status = asyncio.run(first_request())
+served = time.perf_counter()
+heavy = [m for m in ("openai", "livekit.api", "valyu") if m in sys.modules]
+print(json.dumps({"import_s": imported - start, "first_request_s": served - start, "status": status, "heavy_modules": heavy}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", PROBE], cwd=backend_dir, capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    import_s = statistics.median(r["import_s"] for r in results)
+    first_s = statistics.median(r["first_request_s"] for r in results)
+    print(f"Runs: {args.runs}")
+    print(f"import app.main (median):        {import_s * 1000:7.1f} ms")
+    print(f"time to first request (median):  {first_s * 1000:7.1f} ms  (GET /health -> {results[-1]['status']})")
+    print(f"SDKs loaded at startup:          {', '.join(results[-1]['heavy_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
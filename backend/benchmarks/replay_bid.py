@@ -0,0 +1,62 @@
+"""
+Re-run a recorded bid from its cassette, without calling Valyu or OpenAI.
+
+Record cassettes by running the API with CASSETTE_RECORD=true; each bid is
+saved to CASSETTE_DIR/<bid_id>.cassette.json.gz.
+
+Usage (from backend/):
+    python -m benchmarks.replay_bid cassettes/<bid_id>.cassette.json.gz [--no-latency] [--repeat 1] [--profile out.speedscope.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+from app.core.pipeline import BidPipeline
+from app.models.schemas import CreateBidRequest
+from app.utils.cassette import Cassette, current_cassette
+from app.utils.profiler import profiled
+
+
+async def replay(path: str, replay_latency: bool, profile_path: Optional[str] = None) -> float:
+    cassette = Cassette.load(path, replay_latency=replay_latency)
+    request = CreateBidRequest(**cassette.meta["request"])
+
+    token = current_cassette.set(cassette)
+    try:
+        pipeline = BidPipeline()
+        async with (profiled("replay") if profile_path else nullcontext()) as profile:
+            start = time.perf_counter()
+            response = await pipeline.run_full_bid(request, cassette=cassette)
+            elapsed = time.perf_counter() - start
+    finally:
+        current_cassette.reset(token)
+    if profile is not None:
+        with open(profile_path, "w") as f:
+            json.dump(profile.speedscope(), f)
+        print(f"Profile written to {profile_path} (open in https://www.speedscope.app)")
+
+    recorded = cassette.meta.get("result", {})
+    print(f"Replayed {cassette.meta.get('bid_id')} in {elapsed:.3f}s (recorded run took {cassette.meta.get('elapsed_seconds')}s)")
+    print(f"  internal cost: {response.pricing.internal_cost_estimate} (recorded {recorded.get('internal_cost_estimate')})")
+    print(f"  balanced:      {response.pricing.price_bands.balanced} (recorded {recorded.get('balanced')})")
+    print(f"  degraded:      {response.degraded_stages} (recorded {recorded.get('degraded_stages')})")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("cassette")
+    parser.add_argument("--no-latency", action="store_true", help="Serve recorded responses immediately")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--profile", help="Write a speedscope profile of the (last) replay to this file")
+    args = parser.parse_args()
+
+    for _ in range(args.repeat):
+        asyncio.run(replay(args.cassette, replay_latency=not args.no_latency, profile_path=args.profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Rank LLM call sites by tokens and latency over recorded bids.
+
+Replays each cassette through the pipeline (no upstream calls, no spend)
+and reports prompt/completion tokens from the recorded API usage.
+Responses are served after their recorded latency, so latency columns
+match the recorded run; pass --no-latency for a quick token-only report.
+A live server exposes the same report at GET /admin/tokens.
+
+Usage (from backend/):
+    python -m benchmarks.token_report cassettes/*.cassette.json.gz [--no-latency] [--json]
+"""
+import argparse
+import asyncio
+import json
+
+from app.core.pipeline import BidPipeline
+from app.models.schemas import CreateBidRequest
+from app.utils.cassette import Cassette, current_cassette
+from app.utils.metrics import metrics
+from app.utils.token_usage import bid_token_usage, call_site_report, format_report
+
+
+async def replay(path: str, replay_latency: bool):
+    cassette = Cassette.load(path, replay_latency=replay_latency)
+    request = CreateBidRequest(**cassette.meta["request"])
+
+    token = current_cassette.set(cassette)
+    try:
+        pipeline = BidPipeline()
+        return await pipeline.run_full_bid(request, cassette=cassette)
+    finally:
+        current_cassette.reset(token)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("cassettes", nargs="+")
+    parser.add_argument("--no-latency", action="store_true", help="Serve recorded responses immediately")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    metrics.reset()
+    bid_token_usage.clear()
+    for path in args.cassettes:
+        asyncio.run(replay(path, replay_latency=not args.no_latency))
+
+    rows = call_site_report()
+    if args.json:
+        print(json.dumps({"call_sites": rows, "bids": bid_token_usage.recent(limit=len(args.cassettes))}, indent=2))
+        return
+
+    print(f"{len(args.cassettes)} bid(s)\n")
+    print(format_report(rows))
+    per_bid = metrics.summary("llm.bid.total_tokens")
+    if per_bid.count:
+        print(f"\ntokens per bid: mean {per_bid.total / per_bid.count:,.0f}  p95 {per_bid.percentile(0.95):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
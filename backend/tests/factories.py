@@ -0,0 +1,71 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from openai.types.chat import ChatCompletion
+from app.core.pipeline import BidPipeline
+from app.models.entities import BidSession
+from app.models.schemas import BidResponse, CreateBidRequest, FollowUpScripts, PricingBands, PricingOutput, PropertyContext
+from app.utils.cassette import Cassette, current_cassette
+
+ESTIMATE = {"base_hours": 20, "materials_cost": 1500, "labour_tasks": [], "materials": []}
+
+def completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-test",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    })
+
+class FakeOpenAI:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        self.calls += 1
+        if params.get("response_format"):
+            return completion(json.dumps({"property_type": "terraced", "property_year_built": 1905}))
+        if "Output ONLY valid JSON" in params["messages"][-1]["content"]:
+            return completion(json.dumps(ESTIMATE))
+        return completion("Generated text")
+
+class FakeValyuSDK:
+    def __init__(self):
+        self.calls = 0
+
+    def search(self, query, search_type):
+        self.calls += 1
+        result = SimpleNamespace(title="Result", content="Labour costs £55 per hour locally.", url="https://example.com")
+        return SimpleNamespace(success=True, results=[result])
+
+def make_pipeline() -> BidPipeline:
+    # Build under a replay cassette so no real credentials are needed
+    token = current_cassette.set(Cassette("replay"))
+    try:
+        return BidPipeline()
+    finally:
+        current_cassette.reset(token)
+
+REQUEST = CreateBidRequest(
+    address="10 Test Road, SW11 1AA",
+    region="London",
+    job_type="roof_repair",
+    job_description="Replace slipped tiles",
+    desired_margin_percent=0.2
+)
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+def make_session(bid_id: str, address: str, region: str, job_type: str, balanced: float, days_ago: int) -> BidSession:
+    request = CreateBidRequest(address=address, region=region, job_type=job_type, job_description="Work", desired_margin_percent=0.2)
+    return BidSession(id=bid_id, request=request, created_at=NOW - timedelta(days=days_ago), data=BidResponse(
+        bid_id=bid_id,
+        property_context=PropertyContext(material_cost_band="medium", labour_rate_band="medium"),
+        pricing=PricingOutput(
+            internal_cost_estimate=balanced * 0.8,
+            price_bands=PricingBands(win_at_all_costs=balanced * 0.9, balanced=balanced, premium=balanced * 1.2),
+            min_recommended_price=balanced * 0.9
+        ),
+        dossier_text="", pricing_explanation="", proposal_draft="",
+        followup=FollowUpScripts(email_d2="", email_d7="", price_objection_script="")
+    ))
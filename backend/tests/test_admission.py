@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from app.config import settings
+from app.services.admission import FairQueue, QueueFull, RateLimited, client_id_from_headers, tenant_report
+from app.utils.metrics import metrics
+from app.utils.token_bucket import TokenBucket
+
+@pytest.fixture(autouse=True)
+def client_limits(monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_LIMITS", {"estimators": {"weight": 3}, "partner": {"weight": 1}})
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def test_client_id_only_honours_configured_clients(monkeypatch):
+    assert client_id_from_headers({"x-api-key": "estimators", "x-client-id": "partner"}) == "estimators"
+    assert client_id_from_headers({"x-client-id": "partner"}) == "partner"
+    assert client_id_from_headers({"x-api-key": "key-1"}) == "other"
+    assert client_id_from_headers({}) == "anonymous"
+    assert client_id_from_headers({}, "203.0.113.7") == "anonymous:203.0.113.7"
+    assert client_id_from_headers({"x-api-key": "key-1"}, "203.0.113.7") == "other"
+
+    monkeypatch.setattr(settings, "CLIENT_API_KEYS", {"s3cret": "estimators"})
+    assert client_id_from_headers({"x-api-key": "s3cret"}) == "estimators"
+    assert client_id_from_headers({"x-api-key": "estimators"}) == "other"
+    assert client_id_from_headers({"x-client-id": "estimators"}) == "other"
+
+@pytest.mark.asyncio
+async def test_rotating_keys_share_one_rate_limit(monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_BURST", 2)
+    monkeypatch.setattr(settings, "CLIENT_RATE_PER_MINUTE", 1)
+    queue = FairQueue(slots=10)
+    for i in range(2):
+        queue.release(await queue.acquire(client_id_from_headers({"x-api-key": f"key-{i}"})))
+
+    with pytest.raises(RateLimited):
+        await queue.acquire(client_id_from_headers({"x-api-key": "key-2"}))
+    # Ids that reach the queue directly are grouped the same way
+    with pytest.raises(RateLimited):
+        await queue.acquire("key-3")
+
+@pytest.mark.asyncio
+async def test_anonymous_callers_are_rate_limited_per_address(monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_BURST", 1)
+    monkeypatch.setattr(settings, "CLIENT_RATE_PER_MINUTE", 1)
+    queue = FairQueue(slots=10)
+    busy, quiet = client_id_from_headers({}, "203.0.113.7"), client_id_from_headers({}, "198.51.100.2")
+    queue.release(await queue.acquire(busy))
+
+    with pytest.raises(RateLimited):
+        await queue.acquire(busy)
+    queue.release(await queue.acquire(quiet))
+    assert metrics.counters["tenant.anonymous.admitted"] == 2
+    assert metrics.counters["tenant.anonymous.rate_limited"] == 1
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    assert bucket.try_take() and bucket.try_take()
+    assert not bucket.try_take()
+    assert 0 < bucket.retry_after() <= 1.0
+
+@pytest.mark.asyncio
+async def test_rate_limited_client_is_rejected_without_affecting_others(monkeypatch):
+    monkeypatch.setattr(settings, "CLIENT_LIMITS", {"partner": {"burst": 2, "rate_per_minute": 1}})
+    queue = FairQueue(slots=10)
+    for _ in range(2):
+        queue.release(await queue.acquire("partner"))
+
+    with pytest.raises(RateLimited) as exc:
+        await queue.acquire("partner")
+    assert exc.value.retry_after > 0
+    queue.release(await queue.acquire("estimators"))
+    assert metrics.counters["tenant.partner.rate_limited"] == 1
+
+@pytest.mark.asyncio
+async def test_weighted_fair_order_under_backlog():
+    queue = FairQueue(slots=1)
+    holder = await queue.acquire("partner")
+    order = []
+
+    async def bid(client_id):
+        ticket = await queue.acquire(client_id)
+        order.append(client_id)
+        await asyncio.sleep(0)
+        queue.release(ticket)
+        return ticket
+
+    # The partner floods the queue before the estimators arrive
+    tasks = [asyncio.create_task(bid("partner")) for _ in range(6)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(bid("estimators")) for _ in range(3)]
+    await asyncio.sleep(0)
+    queue.release(holder)
+    tickets = await asyncio.gather(*tasks)
+
+    # Weight 3 vs 1: the estimators' bids are all admitted within the first four
+    assert order[:4].count("estimators") == 3
+    assert tickets[-1].position <= 4
+    assert queue.in_service == 0 and queue.queued == 0
+
+@pytest.mark.asyncio
+async def test_queue_full_and_cancelled_waiters():
+    queue = FairQueue(slots=1, max_queued=1)
+    holder = await queue.acquire("partner")
+    waiter = asyncio.create_task(queue.acquire("partner"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFull):
+        await queue.acquire("estimators")
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert queue.queued == 0
+
+    queue.release(holder)
+    assert queue.in_service == 0
+    queue.release(await queue.acquire("estimators"))
+
+@pytest.mark.asyncio
+async def test_admit_records_tenant_metrics():
+    queue = FairQueue(slots=2)
+    async with queue.admit("estimators"):
+        pass
+    with pytest.raises(ValueError):
+        async with queue.admit("unknown-key"):
+            raise ValueError("pipeline failed")
+
+    report = tenant_report()
+    assert report["estimators"]["completed"] == 1
+    assert report["estimators"]["latency"]["count"] == 1
+    assert report["other"]["failed"] == 1
+    assert queue.in_service == 0
@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.entities import BidStore, bid_store
+from app.routers import bids
+from app.services import bid_export
+from app.services.bid_export import export_ndjson
+from tests.factories import make_session
+
+client = TestClient(app)
+
+@pytest.fixture
+def export_bids():
+    ids = [f"export-{i}" for i in range(3)]
+    for i, bid_id in enumerate(ids):
+        session = make_session(bid_id, "5 Quay St, BS1 4DJ", "Bristol", "general_renovation", 10000 + i * 1000, days_ago=3 - i)
+        session.data.raw_valyu_results = [{"title": "Result", "snippet": "x" * 50}]
+        bid_store[bid_id] = session
+    yield ids
+    for bid_id in ids:
+        del bid_store[bid_id]
+
+def test_ndjson_export_flattens_and_excludes_raw_results(export_bids):
+    response = client.get("/bids/export", params={"postcode": "BS1"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["bid_id"] for row in rows] == ["export-2", "export-1", "export-0"]
+    assert rows[0]["price_balanced"] == 12000 and rows[0]["postcode_area"] == "BS"
+    assert "raw_valyu_results" not in rows[0]
+
+def test_csv_export_with_selected_columns(export_bids):
+    response = client.get("/bids/export", params={
+        "format": "csv", "postcode": "BS1", "min_price": 10500,
+        "columns": "bid_id,price_balanced,raw_valyu_results",
+    })
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["bid_id", "price_balanced", "raw_valyu_results"]
+    assert [row[0] for row in rows[1:]] == ["export-2", "export-1"]
+    assert json.loads(rows[1][2])[0]["title"] == "Result"
+
+def test_unknown_column_is_rejected():
+    assert client.get("/bids/export", params={"columns": "bid_id,secret"}).status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_streams_in_batches(monkeypatch):
+    monkeypatch.setattr(bid_export, "BATCH_SIZE", 2)
+    store = BidStore()
+    for i in range(5):
+        store[f"b{i}"] = make_session(f"b{i}", "1 Elm Rd, LS6 2AB", "Leeds", "other", 1000, days_ago=i)
+
+    chunks = [chunk async for chunk in export_ndjson(store, {}, ["bid_id"])]
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+def test_parquet_export_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(bids, "parquet_available", lambda: False)
+    assert client.get("/bids/export", params={"format": "parquet"}).status_code == 501
+
+def test_parquet_export(export_bids):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/bids/export", params={"format": "parquet", "postcode": "BS1"})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("bid_id").to_pylist() == ["export-2", "export-1", "export-0"]
@@ -0,0 +1,62 @@
+from datetime import timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.entities import BidStore, bid_store
+from tests.factories import NOW, make_session
+
+client = TestClient(app)
+
+@pytest.fixture
+def store() -> BidStore:
+    store = BidStore()
+    store["a"] = make_session("a", "1 Lavender Hill, SW11 1AA", "London", "roof_repair", 4000, days_ago=40)
+    store["b"] = make_session("b", "2 Falcon Rd, SW11 2BB", "London", "bathroom_remodel", 8000, days_ago=10)
+    store["c"] = make_session("c", "3 Tooting High St, SW17 0RN", "London", "roof_repair", 6000, days_ago=5)
+    store["d"] = make_session("d", "4 Deansgate, M3 4LY", "Manchester", "roof_repair", 9500, days_ago=1)
+    return store
+
+def ids(sessions):
+    return [session.id for session in sessions]
+
+def test_filters_use_indexes(store):
+    assert ids(store.query(postcode="SW11")[0]) == ["b", "a"]
+    assert ids(store.query(postcode="sw")[0]) == ["c", "b", "a"]
+    assert ids(store.query(job_type="roof_repair", created_from=NOW - timedelta(days=30))[0]) == ["d", "c"]
+    assert ids(store.query(min_price=5000, max_price=10000)[0]) == ["d", "c", "b"]
+    assert ids(store.query(region="london", job_type="roof_repair", max_price=5000)[0]) == ["a"]
+    assert store.query(region="Leeds") == ([], None)
+
+def test_cursor_pagination_walks_every_match(store):
+    page, cursor = store.query(limit=3)
+    assert ids(page) == ["d", "c", "b"]
+    page, cursor = store.query(limit=3, cursor=cursor)
+    assert ids(page) == ["a"] and cursor is None
+
+    with pytest.raises(ValueError):
+        store.query(cursor="not-a-cursor")
+
+def test_replacing_a_bid_reindexes_it(store):
+    repriced = make_session("a", "1 Lavender Hill, SW11 1AA", "London", "roof_repair", 7000, days_ago=40)
+    store["a"] = repriced
+    assert ids(store.query(min_price=6500, max_price=7500)[0]) == ["a"]
+    assert ids(store.query(max_price=5000)[0]) == []
+
+    del store["a"]
+    assert ids(store.query(postcode="SW11")[0]) == ["b"]
+    assert len(store) == 3
+
+def test_list_endpoint_paginates():
+    for bid_id, days_ago in [("list-1", 3), ("list-2", 2), ("list-3", 1)]:
+        bid_store[bid_id] = make_session(bid_id, "9 Elm Rd, LS6 2AB", "Leeds", "electrical_rewire", 5000, days_ago)
+
+    response = client.get("/bids", params={"postcode": "LS6", "limit": 2})
+    body = response.json()
+    assert response.status_code == 200
+    assert [item["bid_id"] for item in body["items"]] == ["list-3", "list-2"]
+    assert body["items"][0]["price_bands"]["balanced"] == 5000
+
+    body = client.get("/bids", params={"postcode": "LS6", "limit": 2, "cursor": body["next_cursor"]}).json()
+    assert [item["bid_id"] for item in body["items"]] == ["list-1"]
+    assert body["next_cursor"] is None
+    assert client.get("/bids", params={"cursor": "bad"}).status_code == 400
@@ -0,0 +1,45 @@
+import pytest
+from app.config import settings
+from app.models.schemas import PropertyContext
+from app.services.llm_client import LLMClient
+from app.utils.cassette import Cassette, CassetteMiss, current_cassette, cassette_path
+from tests.factories import FakeOpenAI, FakeValyuSDK, REQUEST, make_pipeline
+
+@pytest.mark.asyncio
+async def test_record_then_replay_reproduces_bid_without_upstreams(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CASSETTE_RECORD", True)
+    monkeypatch.setattr(settings, "CASSETTE_DIR", str(tmp_path))
+
+    recorder = make_pipeline()
+    fake_openai, fake_valyu = FakeOpenAI(), FakeValyuSDK()
+    recorder.valyu.valyu_client = fake_valyu
+    recorder.optimizer.client = fake_openai
+    recorder.llm.client = fake_openai
+    recorded = await recorder.run_full_bid(REQUEST)
+
+    path = cassette_path(str(tmp_path), recorded.bid_id)
+    cassette = Cassette.load(path, replay_latency=False)
+    assert cassette.meta["request"]["address"] == REQUEST.address
+    assert sum(len(v) for v in cassette.calls.values()) == fake_openai.calls + fake_valyu.calls
+
+    monkeypatch.setattr(settings, "CASSETTE_RECORD", False)
+    token = current_cassette.set(cassette)
+    try:
+        replayer = make_pipeline()
+        replayed = await replayer.run_full_bid(REQUEST, cassette=cassette)
+    finally:
+        current_cassette.reset(token)
+
+    assert replayed.pricing == recorded.pricing
+    assert replayed.property_context == recorded.property_context
+    assert replayed.dossier_text == "Generated text"
+
+@pytest.mark.asyncio
+async def test_replay_miss_fails_instead_of_degrading():
+    cassette = Cassette("replay", replay_latency=False)
+    token = current_cassette.set(cassette)
+    try:
+        with pytest.raises(CassetteMiss):
+            await LLMClient().generate_dossier(PropertyContext(material_cost_band="unknown", labour_rate_band="unknown"), {})
+    finally:
+        current_cassette.reset(token)
@@ -0,0 +1,23 @@
+from app.models.compact import CompactBid, pack_results, unpack_results
+from app.models.entities import BidStore
+from tests.factories import make_session
+
+def result(content: str, url: str = "https://example.com") -> dict:
+    return {"title": "Costs", "snippet": content[:300], "url": url, "raw_metadata": {"full_content": content, "url": url}}
+
+def test_results_store_content_once_and_round_trip():
+    results = [result("Roof repair costs " * 100), {"title": "Odd", "snippet": "kept as given"}]
+    assert unpack_results(pack_results(results)) == results
+
+def test_store_round_trips_sessions():
+    session = make_session("a", "1 Lavender Hill, SW11 1AA", "London", "roof_repair", 4000, days_ago=3)
+    session.data.raw_valyu_results = [result("Felt roof £45 per m2. " * 50)]
+    session.data.proposal_draft = "Dear customer, " * 200
+    store = BidStore()
+    store["a"] = session
+
+    assert store["a"] == session
+    record = store.record("a")
+    assert isinstance(record, CompactBid)
+    assert record.price("balanced") == 4000 and record.price_bands.premium == 4800
+    assert record.price("total_labour_cost") is None
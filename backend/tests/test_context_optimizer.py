@@ -31,7 +31,7 @@ async def test_context_optimizer_llm_extraction():
     ]
     mock_client.chat.completions.create.return_value = mock_response
 
-    with patch("app.services.context_optimizer.AsyncOpenAI", return_value=mock_client):
+    with patch("openai.AsyncOpenAI", return_value=mock_client):
         optimizer = ContextOptimizer()
         # Force client to be our mock if __init__ didn't set it (e.g. no API key in env)
         optimizer.client = mock_client
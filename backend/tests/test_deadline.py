@@ -0,0 +1,59 @@
+import asyncio
+import time
+import pytest
+from app.utils.deadline import Deadline, current_deadline, run_with_budget
+from app.utils.retry import retry_with_backoff
+
+@pytest.mark.asyncio
+async def test_stage_over_budget_returns_fallback_and_is_flagged():
+    deadline = Deadline(5.0)
+    token = current_deadline.set(deadline)
+    try:
+        async def slow_stage():
+            await asyncio.sleep(1.0)
+            return "full"
+
+        result = await run_with_budget("context", slow_stage, 0.05, fallback=lambda: "heuristic")
+    finally:
+        current_deadline.reset(token)
+
+    assert result == "heuristic"
+    assert deadline.degraded_stages == ["context"]
+
+@pytest.mark.asyncio
+async def test_stage_budget_is_capped_by_deadline():
+    deadline = Deadline(0.05)
+    token = current_deadline.set(deadline)
+    try:
+        async def slow_stage():
+            await asyncio.sleep(1.0)
+            return "full"
+
+        start = time.monotonic()
+        result = await run_with_budget("estimation", slow_stage, 10.0, fallback=lambda: "defaults")
+        elapsed = time.monotonic() - start
+    finally:
+        current_deadline.reset(token)
+
+    assert result == "defaults"
+    assert elapsed < 0.5
+
+@pytest.mark.asyncio
+async def test_retry_does_not_sleep_past_deadline():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    token = current_deadline.set(Deadline(0.5))
+    try:
+        start = time.monotonic()
+        with pytest.raises(RuntimeError):
+            await retry_with_backoff(failing, max_retries=3, initial_delay=1.0)
+        elapsed = time.monotonic() - start
+    finally:
+        current_deadline.reset(token)
+
+    assert len(calls) == 1
+    assert elapsed < 0.5
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.entities import bid_store
+from app.models.schemas import CreateBidRequest
+from app.routers.bids import get_pipeline
+from app.services.idempotency import BidDeduplicator, IdempotencyConflict, bid_deduplicator, request_fingerprint
+from app.utils.metrics import metrics
+from tests.factories import make_session
+
+REQUEST = {"address": "27 Harbour Court, Bristol BS1 5TY", "region": "Bristol", "job_type": "roof_repair",
+           "job_description": "Replace slipped tiles", "known_issues": ["leak", "moss"], "desired_margin_percent": 0.2}
+
+class CountingPipeline:
+    def __init__(self):
+        self.runs = 0
+
+    async def run_full_bid(self, request):
+        self.runs += 1
+        await asyncio.sleep(0.05)
+        session = make_session(f"dedupe-{self.runs}", request.address, request.region, request.job_type, 5000, days_ago=0)
+        bid_store[session.id] = session
+        return session.data
+
+@pytest.fixture(autouse=True)
+def clean():
+    metrics.reset()
+    bid_deduplicator.clear()
+    yield
+    bid_deduplicator.clear()
+    for bid_id in [bid_id for bid_id in bid_store if bid_id.startswith("dedupe-")]:
+        del bid_store[bid_id]
+
+def test_fingerprint_ignores_formatting_and_deadline():
+    same = dict(REQUEST, address="27  harbour court, bristol bs15ty", job_description=" replace slipped TILES ",
+                known_issues=["moss", "leak"], deadline_seconds=10)
+    assert request_fingerprint(CreateBidRequest(**REQUEST)) == request_fingerprint(CreateBidRequest(**same))
+    assert request_fingerprint(CreateBidRequest(**REQUEST)) != request_fingerprint(CreateBidRequest(**dict(REQUEST, desired_margin_percent=0.3)))
+
+@pytest.mark.asyncio
+async def test_duplicates_join_in_flight_then_replay():
+    dedupe = BidDeduplicator(key_ttl=60, content_ttl=60)
+    pipeline = CountingPipeline()
+    request = CreateBidRequest(**REQUEST)
+    key, fingerprint, ttl = dedupe.key_for("client", request, "submit-1")
+
+    results = await asyncio.gather(*(dedupe.run(key, fingerprint, ttl, lambda: pipeline.run_full_bid(request)) for _ in range(3)))
+    assert pipeline.runs == 1
+    assert [outcome for _, outcome in results] == ["new", "joined", "joined"]
+
+    bid, outcome = await dedupe.run(key, fingerprint, ttl, lambda: pipeline.run_full_bid(request))
+    assert outcome == "replayed" and bid.bid_id == "dedupe-1" and pipeline.runs == 1
+    assert metrics.counters["dedupe.hits"] == 3 and metrics.counters["dedupe.misses"] == 1
+
+    other = CreateBidRequest(**dict(REQUEST, desired_margin_percent=0.4))
+    with pytest.raises(IdempotencyConflict):
+        await dedupe.run(key, dedupe.key_for("client", other, "submit-1")[1], ttl, lambda: pipeline.run_full_bid(other))
+
+@pytest.mark.asyncio
+async def test_failed_run_is_not_remembered():
+    dedupe = BidDeduplicator(key_ttl=60, content_ttl=60)
+    request = CreateBidRequest(**REQUEST)
+    key, fingerprint, ttl = dedupe.key_for("client", request)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+    with pytest.raises(RuntimeError):
+        await dedupe.run(key, fingerprint, ttl, fail)
+
+    pipeline = CountingPipeline()
+    assert (await dedupe.run(key, fingerprint, ttl, lambda: pipeline.run_full_bid(request)))[1] == "new"
+
+def test_content_dedupe_skips_shared_identities():
+    dedupe = BidDeduplicator(key_ttl=60, content_ttl=60)
+    request = CreateBidRequest(**REQUEST)
+
+    assert dedupe.key_for("estimators", request)[0] is not None
+    assert dedupe.key_for("anonymous", request)[0] is None
+    assert dedupe.key_for("anonymous:203.0.113.7", request)[0] is None
+    assert dedupe.key_for("other", request)[0] is None
+    assert BidDeduplicator(content_ttl=0).key_for("estimators", request)[0] is None
+
+def test_post_bids_replays_by_idempotency_key():
+    pipeline = CountingPipeline()
+    app.dependency_overrides[get_pipeline] = lambda: pipeline
+    try:
+        client = TestClient(app)
+        first = client.post("/bids", json=REQUEST, headers={"Idempotency-Key": "abc"})
+        again = client.post("/bids", json=REQUEST, headers={"Idempotency-Key": "abc"})
+        changed = client.post("/bids", json=dict(REQUEST, notes="call first"), headers={"Idempotency-Key": "abc"})
+    finally:
+        app.dependency_overrides.clear()
+    assert first.status_code == again.status_code == 200
+    assert again.headers["X-Deduplicated"] == "replayed" and again.json()["bid_id"] == first.json()["bid_id"]
+    assert changed.status_code == 422
+    assert pipeline.runs == 1
@@ -0,0 +1,69 @@
+import asyncio
+import sys
+import time
+import pytest
+from app.utils.loop_monitor import LoopMonitor, current_route
+from app.utils.metrics import metrics
+from app.utils.structured_logging import current_bid_id
+
+def parse_page_synchronously():
+    time.sleep(0.15)
+
+async def handler():
+    current_route.set("POST /bids")
+    current_bid_id.set("bid-7")
+    await asyncio.sleep(0.05)
+    parse_page_synchronously()
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_captured_with_route_and_bid():
+    metrics.reset()
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.create_task(handler())
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+
+    snapshot = monitor.snapshot()
+    stall = snapshot["recent_stalls"][0]
+    assert stall["route"] == "POST /bids" and stall["bid_id"] == "bid-7"
+    assert "parse_page_synchronously" in stall["site"] and stall["blocked_ms"] >= 90
+    assert any("handler" in line for line in stall["stack"])
+    assert snapshot["sites"][0]["routes"] == ["POST /bids"]
+    assert metrics.counters["event_loop.stalls"] == 1
+    assert snapshot["lag"]["count"] > 1 and asyncio.get_running_loop().get_task_factory() is None
+
+@pytest.mark.asyncio
+async def test_short_callbacks_are_not_stalls():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    try:
+        for _ in range(10):
+            time.sleep(0.005)
+            await asyncio.sleep(0.005)
+    finally:
+        monitor.stop()
+    assert monitor.snapshot()["recent_stalls"] == []
+
+async def answer():
+    return current_route.get()
+
+@pytest.mark.asyncio
+async def test_task_factory_without_context():
+    loop = asyncio.get_running_loop()
+    monitor = LoopMonitor()
+    current_route.set("GET /bids")
+
+    # Loops before Python 3.11 call the factory without a context
+    task = monitor._task_factory(loop, answer())
+    assert await task == "GET /bids"
+    if sys.version_info >= (3, 11):
+        assert monitor._contexts[task].get(current_route) == "GET /bids"
+
+    def legacy_factory(loop, coro):
+        return asyncio.Task(coro, loop=loop)
+
+    monitor._previous_factory = legacy_factory
+    assert await monitor._task_factory(loop, answer()) == "GET /bids"
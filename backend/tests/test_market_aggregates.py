@@ -0,0 +1,70 @@
+import random
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.models.schemas import PricingBands, PricingOutput
+from app.services.market_aggregates import MarketAggregates, market_aggregates
+from app.utils.quantile_sketch import TDigest
+
+client = TestClient(app)
+
+def pricing(balanced: float) -> PricingOutput:
+    return PricingOutput(
+        internal_cost_estimate=balanced * 0.8,
+        price_bands=PricingBands(win_at_all_costs=balanced * 0.9, balanced=balanced, premium=balanced * 1.2),
+        min_recommended_price=balanced * 0.9,
+    )
+
+def test_tdigest_quantiles_in_bounded_memory():
+    rng = random.Random(3)
+    values = [rng.lognormvariate(8, 0.5) for _ in range(50000)]
+    digest = TDigest(compression=100)
+    for value in values:
+        digest.add(value)
+
+    ordered = sorted(values)
+    for q in (0.05, 0.5, 0.95):
+        assert abs(digest.cdf(ordered[int(q * len(ordered))]) - q) < 0.005
+    assert len(digest.centroids) <= 100
+    assert digest.count == 50000 and digest.min == ordered[0]
+
+def test_tdigest_merge():
+    left, right, both = TDigest(), TDigest(), TDigest()
+    for value in range(1000):
+        (left if value % 2 else right).add(value)
+        both.add(value)
+    left.merge(right)
+    assert left.count == 1000
+    assert abs(left.quantile(0.5) - both.quantile(0.5)) < 5
+
+def test_market_stats_need_enough_bids_and_fall_back_to_all_areas(monkeypatch):
+    monkeypatch.setattr(settings, "MARKET_STATS_MIN_SAMPLES", 10)
+    aggregates = MarketAggregates()
+    for i in range(6):
+        aggregates.record("roof_repair", f"{i} High St, SW11 1AA", pricing(4000 + i * 100), 55.0)
+    assert aggregates.market_stats("roof_repair", "1 Lavender Hill, SW11 1AA") is None
+
+    for i in range(6):
+        aggregates.record("roof_repair", f"{i} Deansgate, M3 4LY", pricing(3000 + i * 100), 45.0)
+    stats = aggregates.market_stats("roof_repair", "1 Lavender Hill, SW11 1AA")
+    assert stats.source == "historical" and stats.area is None and stats.sample_size == 12
+    assert 3000 <= stats.percentiles["p50"] <= 4500
+
+    for i in range(4):
+        aggregates.record("roof_repair", f"{i} Falcon Rd, SW11 2BB", pricing(4000), 55.0)
+    stats = aggregates.market_stats("roof_repair", "SW11 1AA")
+    assert stats.area == "SW" and stats.sample_size == 10
+    assert stats.lower_bound >= 4000
+
+def test_distribution_endpoint():
+    market_aggregates.clear()
+    for i in range(20):
+        market_aggregates.record("bathroom_remodel", "2 Park Row, LS1 5AB", pricing(8000 + i * 50), 50.0)
+
+    assert {"job_type": "bathroom_remodel", "area": "LS", "count": 20} in client.get("/market/distributions").json()
+    body = client.get("/market/distributions/bathroom_remodel", params={"area": "ls"}).json()
+    assert body["metrics"]["balanced_price"]["count"] == 20
+    assert body["metrics"]["labour_rate"]["percentiles"]["p50"] == 50.0
+    assert client.get("/market/distributions/roof_repair", params={"area": "ZZ"}).status_code == 404
+    market_aggregates.clear()
@@ -0,0 +1,53 @@
+import pytest
+from app.config import settings
+from app.services.model_routing import chat_params, get_route, latency_metric
+from app.utils.cassette import Cassette, current_cassette
+from app.utils.metrics import metrics
+
+def test_settings_override_route_fields(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ROUTES", {"proposal": {"model": "gpt-4o", "max_tokens": 1200}})
+
+    route = get_route("proposal")
+
+    assert route.model == "gpt-4o"
+    assert route.max_tokens == 1200
+    assert route.temperature == 0.7
+    assert get_route("dossier").model == "gpt-3.5-turbo"
+
+def test_latency_routing_falls_back_when_p95_over_budget(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(settings, "LLM_LATENCY_ROUTING", True)
+    monkeypatch.setattr(settings, "LLM_LATENCY_MIN_SAMPLES", 5)
+    route = get_route("coaching")
+
+    for _ in range(4):
+        metrics.observe(latency_metric("coaching"), route.latency_budget + 1)
+    assert chat_params("coaching")["model"] == route.model  # Too few samples to judge
+
+    metrics.observe(latency_metric("coaching"), route.latency_budget + 1)
+    params = chat_params("coaching")
+
+    assert params["model"] == route.fallback_model
+    assert params["max_tokens"] == route.max_tokens
+    assert metrics.counters["llm.coaching.fallbacks"] == 1
+
+def test_latency_routing_off_by_default():
+    metrics.reset()
+    for _ in range(50):
+        metrics.observe(latency_metric("coaching"), 100.0)
+
+    assert chat_params("coaching")["model"] == get_route("coaching").model
+
+def test_latency_routing_pinned_while_recording(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(settings, "LLM_LATENCY_ROUTING", True)
+    monkeypatch.setattr(settings, "LLM_LATENCY_MIN_SAMPLES", 1)
+    route = get_route("coaching")
+    metrics.observe(latency_metric("coaching"), route.latency_budget + 1)
+
+    token = current_cassette.set(Cassette("record"))
+    try:
+        assert chat_params("coaching")["model"] == route.model
+    finally:
+        current_cassette.reset(token)
+    assert chat_params("coaching")["model"] == route.fallback_model
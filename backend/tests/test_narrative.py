@@ -0,0 +1,44 @@
+from app.models.schemas import FollowUpScripts, PricingBands, PricingOutput
+from app.services.narrative import NarrativeRenderer, placeholder_values, render
+
+def make_pricing(balanced: float) -> PricingOutput:
+    return PricingOutput(
+        internal_cost_estimate=1000.0,
+        price_bands=PricingBands(win_at_all_costs=balanced * 0.9, balanced=balanced, premium=balanced * 1.2),
+        min_recommended_price=1100.0,
+    )
+
+def test_render_formats_known_placeholders_and_keeps_unknown():
+    values = placeholder_values(make_pricing(1250.0), 55.0)
+
+    text = render("Quote {{ price.balanced }} at {{rate.labour}}, not {{price.other}}", values)
+
+    assert text == "Quote £1,250.00 at £55.00/hr, not {{price.other}}"
+
+def test_renderer_caches_per_revision():
+    renderer = NarrativeRenderer()
+    templates = {
+        "proposal": "Total {{price.balanced}}",
+        "followups": FollowUpScripts(email_d2="d2", email_d7="d7", price_objection_script="Firm at {{price.balanced}}"),
+    }
+
+    first = renderer.render_sections("bid", 1, templates, make_pricing(1250.0), None)
+    second = renderer.render_sections("bid", 2, templates, make_pricing(1500.0), None)
+
+    assert first["proposal"] == "Total £1,250.00"
+    assert second["proposal"] == "Total £1,500.00"
+    assert second["followups"].price_objection_script == "Firm at £1,500.00"
+    assert renderer.render_sections("bid", 1, templates, make_pricing(9999.0), None)["proposal"] == "Total £1,250.00"
+
+def test_client_facing_sections_never_render_internal_figures():
+    templates = {
+        "proposal": "Quote {{price.balanced}} (our cost {{cost.internal}}, floor {{price.min}})",
+        "followups": FollowUpScripts(email_d2="d2", email_d7="d7", price_objection_script="Cannot go below {{price.min}}"),
+        "pricing_explanation": "Cost {{cost.internal}}",
+    }
+
+    rendered = NarrativeRenderer().render_sections("bid", 1, templates, make_pricing(1250.0), None)
+
+    assert rendered["proposal"] == "Quote £1,250.00 (our cost , floor )"
+    assert "1,000" not in rendered["proposal"] and "1,100" not in rendered["followups"].price_objection_script
+    assert rendered["pricing_explanation"] == "Cost £1,000.00"
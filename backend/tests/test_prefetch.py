@@ -0,0 +1,70 @@
+import pytest
+from app.config import settings
+from app.models.schemas import CreateBidRequest
+from app.services.labour_rate_cache import labour_rate_cache
+from app.services.market_rate_cache import market_rate_cache
+from app.services.prefetch import BidTraffic, PrefetchScheduler, bid_traffic
+from app.utils.metrics import metrics
+
+class CountingValyu:
+    def __init__(self):
+        self.calls = []
+
+    async def search_market_rates(self, region, job_type, refresh=False):
+        self.calls.append(("market", region, job_type))
+        market_rate_cache.set(region, job_type, [{"title": "rates"}])
+        return []
+
+    async def search_labour_rates(self, region, job_type, address=None, refresh=False):
+        self.calls.append(("labour", address or region, job_type))
+        labour_rate_cache.set(address or region, job_type, 60.0)
+        return 60.0
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    market_rate_cache.clear()
+    labour_rate_cache.clear()
+    yield
+    market_rate_cache.clear()
+    labour_rate_cache.clear()
+
+def make_request(region: str, address: str) -> CreateBidRequest:
+    return CreateBidRequest(address=address, region=region, job_type="roof_repair", job_description="Fix roof", desired_margin_percent=0.2)
+
+def test_traffic_ranks_targets_by_frequency():
+    traffic = BidTraffic()
+    for address in ["1 A St, SW11 1AA", "2 B St, SW11 2BB", "3 C St, M20 2RT"]:
+        with traffic.track(make_request("London" if "SW" in address else "Manchester", address)):
+            assert traffic.in_flight == 1
+
+    assert traffic.top(1) == [("London", "SW11", "roof_repair")]
+    assert traffic.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_run_once_warms_due_targets_once(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_TARGETS", ["London:SW11"])
+    valyu = CountingValyu()
+    scheduler = PrefetchScheduler(valyu=valyu)
+
+    first = await scheduler.run_once()
+    second = await scheduler.run_once()
+
+    assert first == 10  # Market and labour rates for each of the five job types
+    assert second == 0
+    assert ("labour", "SW11", "bathroom_remodel") in valyu.calls
+
+@pytest.mark.asyncio
+async def test_run_once_respects_budget_and_foreground_load(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_TARGETS", ["London"])
+    metrics.reset()
+    valyu = CountingValyu()
+    scheduler = PrefetchScheduler(valyu=valyu)
+    scheduler.budget.tokens = 3
+
+    assert await scheduler.run_once() == 3
+    assert metrics.counters["prefetch.budget_exhausted"] == 1
+
+    scheduler.budget.tokens = 100
+    monkeypatch.setattr(bid_traffic, "in_flight", settings.PREFETCH_PAUSE_IN_FLIGHT_BIDS)
+    assert await scheduler.run_once() == 0
+    assert metrics.counters["prefetch.paused"] == 1
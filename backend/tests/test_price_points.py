@@ -0,0 +1,47 @@
+import pytest
+from app.config import settings
+from app.models.schemas import PricePoint
+from app.services.price_points import extract_price_points, filter_outliers, market_stats_from_points
+
+MARKET_PAGE = """A typical roof repair costs £350-£800. Replacing a whole roof is £5,000 to £8,000 + VAT.
+Roofers charge £200 per day or £25 per hour. Felt roof £45 per m2. The average house price in Battersea is £750,000.
+Scaffolding from £1.2k. Rent is £1,500 pcm."""
+
+def result(text: str, url: str = "https://example.com") -> dict:
+    return {"title": "Costs", "snippet": text[:300], "url": url, "raw_metadata": {"full_content": text, "url": url}}
+
+def test_extracts_amounts_with_units_and_skips_non_job_prices():
+    points = extract_price_points([result(MARKET_PAGE)])
+    assert [(p.amount, p.unit) for p in points] == [
+        (575.0, "job"), (6500.0, "job"), (200.0, "day"), (45.0, "sqm"), (1200.0, "job")
+    ]
+    assert points[1].context == "Replacing a whole roof is £5,000 to £8,000 + VAT"
+
+def test_exclusions_match_whole_words_and_adjacent_percentages_only():
+    text = (
+        "Current roof repair prices are £400-£800. Different roofers quote £500 for a patch repair. "
+        "Learn why a chimney repair is £900 in most homes, while 10% need scaffolding. "
+        "Prices rose 5% to £310,000. Average earnings are £650 a week. Rental yields hit £900."
+    )
+    assert [p.amount for p in extract_price_points([result(text)])] == [600.0, 500.0, 900.0]
+
+def test_outliers_filtered_on_log_scale():
+    values = [900, 1000, 1100, 1200, 1300, 1000, 95000]
+    assert 95000 not in filter_outliers(values)
+    assert len(filter_outliers(values)) == 6
+
+def test_market_stats_from_normalized_points(monkeypatch):
+    monkeypatch.setattr(settings, "MARKET_PRICE_MIN_SAMPLES", 4)
+    points = [
+        PricePoint(amount=1000, unit="job"),
+        PricePoint(amount=1200, unit="job"),
+        PricePoint(amount=80, unit="sqm"),  # 15 m² roof -> 1200
+        PricePoint(amount=250, unit="day"),  # 40 hours -> 5 days -> 1250
+        PricePoint(amount=2, unit="job"),  # Below any plausible job price
+    ]
+    stats = market_stats_from_points(points, "roof_repair", estimated_hours=40)
+    assert stats.source == "market_search" and stats.sample_size == 4
+    assert stats.percentiles["p50"] == pytest.approx(1200)
+    assert stats.mean == pytest.approx(1162.5)
+
+    assert market_stats_from_points(points[:3], "roof_repair", estimated_hours=40) is None
@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app as main_app
+from app.utils import profiler
+from app.utils.profiler import ProfilingMiddleware, label_profile, profile_store, profiled
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+async def stage():
+    await asyncio.sleep(0.01)
+    busy(0.05)
+
+async def waiting():
+    await asyncio.sleep(0.06)
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    profile_store.clear()
+    yield
+    profile_store.clear()
+
+@pytest.mark.asyncio
+async def test_profile_follows_gathered_and_timed_out_tasks():
+    async with profiled("test") as profile:
+        label_profile("bid-1")
+        await asyncio.gather(asyncio.wait_for(stage(), 1), waiting())
+
+    assert profile_store.get("bid-1") is profile
+    folded = profile.collapsed()
+    assert any("stage (" in line and "busy (" in line for line in folded.splitlines())
+    assert any("waiting (" in line and "<await Future>" in line for line in folded.splitlines())
+
+    speedscope = profile.speedscope()
+    frames = speedscope["shared"]["frames"]
+    sampled = speedscope["profiles"][0]
+    assert len(sampled["samples"]) == len(sampled["weights"])
+    assert all(0 <= i < len(frames) for sample in sampled["samples"] for i in sample)
+    assert 0.03 < sampled["endValue"] <= profile.duration + 0.01
+
+def test_missing_asyncio_internals_warn_once(monkeypatch, caplog):
+    monkeypatch.setattr(profiler, "_warned_missing", set())
+    task_like = object()
+
+    with caplog.at_level("WARNING", logger="app.utils.profiler"):
+        assert profiler._internal(task_like, "_fut_waiter", "default") == "default"
+        assert profiler._internal(task_like, "_fut_waiter") is None
+
+    assert len(caplog.records) == 1 and "_fut_waiter" in caplog.records[0].getMessage()
+
+def profiled_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/work")
+    async def work():
+        await stage()
+        return {"ok": True}
+
+    return app
+
+def test_middleware_profiles_flagged_requests_only(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    client = TestClient(profiled_app())
+    assert "x-profile-id" not in client.get("/work").headers
+    assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "1"}).headers
+    key = client.get("/work", params={"profile": "secret"}).headers["x-profile-id"]
+
+    admin = TestClient(main_app, headers={"X-Admin-Token": "admin-secret"})
+    assert admin.get("/admin/profiles").json()[0]["name"] == "GET /work"
+    download = admin.get(f"/admin/profiles/{key}", params={"format": "collapsed"})
+    assert download.status_code == 200 and "busy (" in download.text
+    assert admin.get("/admin/profiles/missing").status_code == 404
+
+def test_profiling_and_admin_closed_without_tokens(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", None)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    client = TestClient(profiled_app())
+    assert "x-profile-id" not in client.get("/work", headers={"X-Profile": "1"}).headers
+
+    admin = TestClient(main_app)
+    for path in ("/admin/profiles", "/admin/tenants", "/admin/metrics"):
+        assert admin.get(path).status_code == 403
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    assert admin.get("/admin/metrics").status_code == 401
+    assert admin.get("/admin/metrics", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    assert admin.get("/admin/metrics", headers={"X-Admin-Token": "admin-secret"}).status_code == 200
@@ -0,0 +1,55 @@
+import pytest
+from app.config import settings
+from app.models.schemas import PropertyContext
+from app.services.labour_rate_cache import labour_rate_cache
+from app.services.market_rate_cache import market_rate_cache
+from app.services.property_context_cache import PropertyContextCache, property_context_cache
+from app.utils.address import canonical_address
+from app.utils.metrics import metrics
+from tests.factories import FakeOpenAI, FakeValyuSDK, REQUEST, make_pipeline
+
+def test_canonical_address_ignores_formatting():
+    assert canonical_address("Flat 3, 27 Harbour Ct., Bristol bs1 5ty") == canonical_address("flat 3 27 harbour court BS15TY")
+    assert canonical_address("Flat 3, 27 Harbour Court, BS1 5TY") != canonical_address("Flat 4, 27 Harbour Court, BS1 5TY")
+    assert canonical_address("Rose Cottage, Mill Lane, Ludlow SY8 1BB") == "SY8 1BB||rose cottage|mill lane"
+    assert canonical_address("Somewhere in London") is None
+
+def test_set_merges_new_fields_into_earlier_entry():
+    cache = PropertyContextCache(freshness_days=30)
+    cache.set("10 Test Road, SW11 1AA", PropertyContext(material_cost_band="unknown", labour_rate_band="unknown", property_year_built=1905), [{"url": "a"}])
+    cache.set("10 test rd, sw11 1aa", PropertyContext(material_cost_band="medium", labour_rate_band="unknown", number_of_bedrooms=3, detected_labour_rate=60.0), [{"url": "b"}, {"url": "a"}])
+
+    context, results = cache.get("10 Test Road SW11 1AA")
+
+    assert (context.property_year_built, context.number_of_bedrooms, context.material_cost_band) == (1905, 3, "medium")
+    assert context.detected_labour_rate is None
+    assert [r["url"] for r in results] == ["b", "a"]
+
+def test_expired_entries_miss():
+    cache = PropertyContextCache(freshness_days=0)
+    cache.set("10 Test Road, SW11 1AA", PropertyContext(material_cost_band="unknown", labour_rate_band="unknown"), [])
+
+    assert cache.get("10 Test Road, SW11 1AA") is None
+
+@pytest.mark.asyncio
+async def test_repeat_bid_skips_property_search_and_extraction(monkeypatch):
+    monkeypatch.setattr(settings, "CASSETTE_RECORD", False)
+    metrics.reset()
+    property_context_cache.clear()
+    labour_rate_cache.clear()
+    market_rate_cache.clear()
+    pipeline = make_pipeline()
+    fake_openai, fake_valyu = FakeOpenAI(), FakeValyuSDK()
+    pipeline.valyu.valyu_client = fake_valyu
+    pipeline.optimizer.client = fake_openai
+    pipeline.llm.client = fake_openai
+
+    first = await pipeline.run_full_bid(REQUEST)
+    valyu_calls, openai_calls = fake_valyu.calls, fake_openai.calls
+    second = await pipeline.run_full_bid(REQUEST.model_copy(update={"address": "10 test rd, sw111aa"}))
+
+    assert valyu_calls == 3
+    assert fake_valyu.calls == valyu_calls  # Property context, market and labour rates all cached
+    assert fake_openai.calls - openai_calls == openai_calls - 1  # No extraction
+    assert second.property_context == first.property_context
+    assert metrics.snapshot()["gauges"]["property_cache.hit_rate"] == 0.5
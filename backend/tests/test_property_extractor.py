@@ -0,0 +1,86 @@
+import pytest
+from types import SimpleNamespace
+from app.services.context_optimizer import ContextOptimizer
+from app.services.property_extractor import property_extractor
+from app.utils.metrics import metrics
+from tests.factories import FakeOpenAI
+
+ADDRESS = "14 Elm Grove, London SW11 4JP"
+
+def result(title: str, content: str) -> dict:
+    return {"title": title, "snippet": content[:300], "url": "", "raw_metadata": {"full_content": content, "url": ""}}
+
+LISTING = result(
+    "14 Elm Grove, London SW11 4JP",
+    "A three bedroom Victorian terraced house built in 1892. Floor area 1,130 sq ft. "
+    "Last sold for £865,000 on 12 April 2018. Previously sold in June 2005 for £410,000. Rear flat roof extension."
+)
+NEIGHBOURS = result("Elm Grove sold prices", "2 bed flat sold for £520,000 in June 2022.")
+
+def test_extracts_fields_and_prefers_address_matched_results():
+    extraction = property_extractor.extract([LISTING, NEIGHBOURS], ADDRESS)
+    values = {name: field.value for name, field in extraction.fields.items()}
+
+    assert values == {
+        "property_year_built": 1892,
+        "architectural_period": "Victorian",
+        "property_type": "terraced",
+        "number_of_bedrooms": 3,
+        "property_size_sqm": 105.0,
+        "last_sale_date": "2018-04-12",
+        "last_sale_price": 865000.0,
+    }
+    assert extraction.fields["property_year_built"].detail == "exact"
+    assert extraction.confident(["property_type", "property_year_built", "number_of_bedrooms"], 0.8)
+
+def test_flat_rate_is_not_a_flat():
+    extraction = property_extractor.extract([result("Roofers", "Flat rate of £200 per day. Detached garage re-roofed.")])
+
+    assert "property_type" not in extraction.fields
+
+def test_conflicting_mentions_lower_confidence():
+    extraction = property_extractor.extract([result("Listing", "3 bedroom house. Also a 4 bedroom option.")])
+
+    assert extraction.fields["number_of_bedrooms"].confidence < 0.5
+
+class FailingOpenAI:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        raise AssertionError("LLM extraction should have been skipped")
+
+@pytest.mark.asyncio
+async def test_confident_local_extraction_skips_llm():
+    metrics.reset()
+    optimizer = ContextOptimizer()
+    optimizer.client = FailingOpenAI()
+
+    context = await optimizer.optimize([LISTING, NEIGHBOURS], {"address": ADDRESS, "job_type": "roof_repair"})
+
+    assert context.property_type == "terraced"
+    assert context.property_year_built == 1892
+    assert context.ownership_duration_years is not None
+    assert metrics.counters["local_extraction.hits"] == 1
+
+OTHER_LISTINGS = [
+    result("Elm Grove sold prices", "No. 9: a three bedroom Victorian terraced house built in 1890."),
+    result("Nearby homes", "Three bedroom Victorian terraced house, built in 1890, sold last spring."),
+]
+
+@pytest.mark.asyncio
+async def test_off_target_results_never_skip_or_fill_llm_extraction():
+    metrics.reset()
+    extraction = property_extractor.extract(OTHER_LISTINGS, ADDRESS)
+    assert extraction.fields["number_of_bedrooms"].confidence >= 0.8
+    assert not extraction.fields["number_of_bedrooms"].on_target
+    assert not extraction.confident(["property_type", "property_year_built", "number_of_bedrooms"], 0.8)
+
+    optimizer = ContextOptimizer()
+    optimizer.client = FakeOpenAI()
+    context = await optimizer.optimize(OTHER_LISTINGS, {"address": ADDRESS, "job_type": "roof_repair"})
+
+    assert optimizer.client.calls == 1
+    assert metrics.counters["local_extraction.misses"] == 1
+    assert context.property_year_built == 1905  # From the LLM
+    assert context.number_of_bedrooms is None
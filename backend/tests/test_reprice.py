@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+from app.core.pipeline import BidPipeline, InvalidBidChanges, RepriceUnavailable
+from app.models.entities import BidSession, bid_store
+from app.models.schemas import (
+    BidResponse, CreateBidRequest, FollowUpScripts, PropertyContext, UpdateBidRequest
+)
+from app.services.coaching_session import CoachingSession, coaching_sessions
+from app.services.pricing_engine import PricingEngine
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_dossier(self, context, job_info):
+        self.calls.append("dossier")
+        return "new dossier"
+
+    async def generate_pricing_explanation(self, context):
+        self.calls.append("pricing_explanation")
+        return "explained {{price.balanced}}"
+
+    async def generate_proposal(self, context, job_info, notes):
+        self.calls.append("proposal")
+        return f"proposal {{{{price.balanced}}}} {notes}"
+
+    async def generate_followups(self, context, job_info):
+        self.calls.append("followups")
+        return FollowUpScripts(email_d2="d2", email_d7="d7", price_objection_script="obj at {{price.balanced}}")
+
+    async def estimate_job_parameters(self, context, job_info):
+        self.calls.append("estimation")
+        return {"base_hours": 20.0, "materials_cost": 1000.0}
+
+def make_pipeline() -> BidPipeline:
+    pipeline = BidPipeline.__new__(BidPipeline)
+    pipeline.pricing = PricingEngine()
+    pipeline.llm = CountingLLM()
+    return pipeline
+
+def store_bid(pipeline: BidPipeline, bid_id: str, templated: bool = True) -> BidResponse:
+    request = CreateBidRequest(
+        address="1 Test St", region="London", job_type="roof_repair",
+        job_description="Fix roof", desired_margin_percent=0.2
+    )
+    context = PropertyContext(material_cost_band="medium", labour_rate_band="medium", detected_labour_rate=50.0)
+    estimates = {"base_hours": 10.0, "materials_cost": 500.0}
+    response = BidResponse(
+        bid_id=bid_id,
+        property_context=context,
+        pricing=pipeline._price(context, request, 50.0, estimates),
+        dossier_text="old dossier",
+        pricing_explanation="old explanation",
+        proposal_draft="old proposal",
+        followup=FollowUpScripts(email_d2="old", email_d7="old", price_objection_script="old")
+    )
+    templates = {
+        "dossier": "old dossier",
+        "pricing_explanation": "old explanation at {{price.balanced}}",
+        "proposal": "old proposal at {{price.balanced}}",
+        "followups": FollowUpScripts(email_d2="old", email_d7="old", price_objection_script="old at {{price.balanced}}")
+    } if templated else {}
+    bid_store[bid_id] = BidSession(id=bid_id, data=response, request=request, estimates=estimates, templates=templates)
+    return response
+
+@pytest.mark.asyncio
+async def test_margin_change_rerenders_without_llm_calls():
+    pipeline = make_pipeline()
+    original = store_bid(pipeline, "reprice-margin")
+
+    updated = await pipeline.reprice_bid("reprice-margin", UpdateBidRequest(desired_margin_percent=0.3))
+
+    assert pipeline.llm.calls == []
+    assert updated.revision == 2
+    assert updated.pricing.internal_cost_estimate == original.pricing.internal_cost_estimate
+    assert updated.pricing.price_bands.balanced == round(1000.0 / 0.7, 2)
+    assert updated.proposal_draft == "old proposal at £1,428.57"
+    assert updated.pricing_explanation == "old explanation at £1,428.57"
+    assert updated.dossier_text == "old dossier"
+    assert bid_store["reprice-margin"].data.revision == 2
+    assert bid_store["reprice-margin"].request.desired_margin_percent == 0.3
+
+@pytest.mark.asyncio
+async def test_notes_change_only_regenerates_proposal():
+    pipeline = make_pipeline()
+    original = store_bid(pipeline, "reprice-notes")
+
+    updated = await pipeline.reprice_bid("reprice-notes", UpdateBidRequest(notes="Access via rear"))
+
+    assert pipeline.llm.calls == ["proposal"]
+    assert updated.pricing == original.pricing
+    assert updated.proposal_draft == "proposal £1,250.00 Access via rear"
+
+@pytest.mark.asyncio
+async def test_margin_change_regenerates_untemplated_sections():
+    pipeline = make_pipeline()
+    store_bid(pipeline, "reprice-plain", templated=False)
+
+    updated = await pipeline.reprice_bid("reprice-plain", UpdateBidRequest(desired_margin_percent=0.3))
+
+    assert sorted(pipeline.llm.calls) == ["dossier", "followups", "pricing_explanation", "proposal"]
+    assert updated.followup.price_objection_script == "obj at £1,428.57"
+
+@pytest.mark.asyncio
+async def test_reprice_unknown_bid():
+    with pytest.raises(KeyError):
+        await make_pipeline().reprice_bid("missing", UpdateBidRequest(notes="x"))
+
+@pytest.mark.asyncio
+async def test_null_clears_optional_fields_but_not_required_ones():
+    pipeline = make_pipeline()
+    store_bid(pipeline, "reprice-clear")
+    await pipeline.reprice_bid("reprice-clear", UpdateBidRequest(notes="Access via rear", urgency="high"))
+
+    await pipeline.reprice_bid("reprice-clear", UpdateBidRequest(notes=None, urgency=None))
+    assert bid_store["reprice-clear"].request.notes is None
+    assert bid_store["reprice-clear"].request.urgency is None
+
+    with pytest.raises(InvalidBidChanges):
+        await pipeline.reprice_bid("reprice-clear", UpdateBidRequest(desired_margin_percent=None))
+
+@pytest.mark.asyncio
+async def test_reprice_bid_without_inputs():
+    pipeline = make_pipeline()
+    response = store_bid(pipeline, "reprice-legacy")
+    bid_store["reprice-legacy"] = BidSession(id="reprice-legacy", data=response)
+
+    with pytest.raises(RepriceUnavailable):
+        await pipeline.reprice_bid("reprice-legacy", UpdateBidRequest(notes="x"))
+
+@pytest.mark.asyncio
+async def test_reprice_drops_coaching_session():
+    pipeline = make_pipeline()
+    original = store_bid(pipeline, "reprice-coach")
+    coaching_sessions.set("reprice-coach", CoachingSession(original))
+
+    await pipeline.reprice_bid("reprice-coach", UpdateBidRequest(desired_margin_percent=0.3))
+
+    assert coaching_sessions.get("reprice-coach") is None
+
+@pytest.mark.asyncio
+async def test_concurrent_patches_keep_both_changes():
+    pipeline = make_pipeline()
+    store_bid(pipeline, "reprice-race")
+
+    await asyncio.gather(
+        pipeline.reprice_bid("reprice-race", UpdateBidRequest(notes="Access via rear")),
+        pipeline.reprice_bid("reprice-race", UpdateBidRequest(desired_margin_percent=0.3)),
+    )
+
+    stored = bid_store["reprice-race"]
+    assert stored.data.revision == 3
+    assert stored.request.notes == "Access via rear"
+    assert stored.request.desired_margin_percent == 0.3
@@ -0,0 +1,103 @@
+import pytest
+from app.utils.resilience import (
+    AdaptiveLimiter, CircuitBreaker, Upstream, UpstreamUnavailable, is_retriable
+)
+
+class FakeHTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+def make_upstream(threshold=2, reset=60.0, limit=4):
+    return Upstream(
+        "test",
+        CircuitBreaker(failure_threshold=threshold, reset_timeout=reset),
+        AdaptiveLimiter(limit, latency_target=1.0),
+        max_retries=0
+    )
+
+def test_error_classification():
+    assert is_retriable(TimeoutError())
+    assert is_retriable(ConnectionError())
+    assert is_retriable(FakeHTTPError(429))
+    assert is_retriable(FakeHTTPError(503))
+    assert not is_retriable(FakeHTTPError(400))
+    assert not is_retriable(ValueError("bad json"))
+    assert not is_retriable(UpstreamUnavailable("openai", "circuit open"))
+
+@pytest.mark.asyncio
+async def test_breaker_opens_then_fails_fast():
+    upstream = make_upstream(threshold=2)
+    calls = []
+
+    async def down():
+        calls.append(1)
+        raise FakeHTTPError(503)
+
+    for _ in range(2):
+        with pytest.raises(FakeHTTPError):
+            await upstream.call(down)
+
+    assert upstream.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailable):
+        await upstream.call(down)
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_breaker_on_success():
+    upstream = make_upstream(threshold=1, reset=0.0)
+
+    async def down():
+        raise FakeHTTPError(500)
+
+    async def up():
+        return "ok"
+
+    with pytest.raises(FakeHTTPError):
+        await upstream.call(down)
+    assert upstream.breaker.state == CircuitBreaker.HALF_OPEN
+
+    assert await upstream.call(up) == "ok"
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_breaker():
+    upstream = make_upstream(threshold=1)
+
+    async def bad_request():
+        raise FakeHTTPError(400)
+
+    with pytest.raises(FakeHTTPError):
+        await upstream.call(bad_request)
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+def test_limiter_aimd():
+    limiter = AdaptiveLimiter(4, latency_target=1.0)
+    assert all(limiter.try_acquire() for _ in range(4))
+    assert not limiter.try_acquire()
+
+    limiter.release(latency=5.0, ok=True)  # slow call halves the limit
+    assert int(limiter.limit) == 2
+
+    limiter.release(latency=0.1, ok=True)  # fast call grows it additively
+    assert limiter.limit == 2.5
+
+@pytest.mark.asyncio
+async def test_stream_holds_slot_until_read_and_counts_midstream_failure():
+    upstream = make_upstream(threshold=1)
+
+    async def chunks():
+        yield "a"
+        raise ConnectionError("stream reset")
+
+    async def open_stream():
+        return chunks()
+
+    stream = upstream.stream(open_stream)
+    assert await stream.__anext__() == "a"
+    assert upstream.limiter.in_flight == 1
+
+    with pytest.raises(ConnectionError):
+        await stream.__anext__()
+    assert upstream.limiter.in_flight == 0
+    assert upstream.breaker.state == CircuitBreaker.OPEN
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from app.core.pipeline import BidPipeline
+from app.models.schemas import PropertyContext
+from app.services.property_extractor import Extraction
+from app.utils.metrics import metrics
+
+class StubExtractor:
+    def __init__(self):
+        self.calls = 0
+
+    def extract(self, raw_results, address=None):
+        self.calls += 1
+        return Extraction({})
+
+class StubOptimizer:
+    def __init__(self, extracted: PropertyContext):
+        self.extracted = extracted
+        self.extractor = StubExtractor()
+        self.received = []
+
+    def _heuristic_optimize(self, raw_results, job_info, extraction=None):
+        self.received.append(extraction)
+        return PropertyContext(material_cost_band="unknown", labour_rate_band="unknown", property_type="terraced")
+
+    async def optimize(self, raw_results, job_info, extraction=None):
+        self.received.append(extraction)
+        await asyncio.sleep(0.05)
+        return self.extracted
+
+class StubLLM:
+    def __init__(self):
+        self.estimated_with = []
+
+    async def estimate_job_parameters(self, context, job_info):
+        self.estimated_with.append(context.property_type)
+        return {"base_hours": 10.0, "materials_cost": 100.0, "property_type": context.property_type}
+
+    def default_estimates(self, job_type):
+        return {"base_hours": 1.0, "materials_cost": 1.0}
+
+def make_pipeline(extracted: PropertyContext) -> BidPipeline:
+    pipeline = BidPipeline.__new__(BidPipeline)
+    pipeline.optimizer = StubOptimizer(extracted)
+    pipeline.llm = StubLLM()
+    return pipeline
+
+@pytest.mark.asyncio
+async def test_speculative_estimate_kept_when_inputs_match():
+    metrics.reset()
+    extracted = PropertyContext(material_cost_band="unknown", labour_rate_band="unknown", property_type="terraced", last_sale_price=500000)
+    pipeline = make_pipeline(extracted)
+
+    context, estimates = await pipeline._speculative_context_and_estimates([], {"job_type": "roof_repair"})
+
+    assert context is extracted
+    assert pipeline.llm.estimated_with == ["terraced"]
+    assert metrics.counters["speculative_estimation.hits"] == 1
+    assert metrics.snapshot()["gauges"]["speculative_estimation.hit_rate"] == 1.0
+
+@pytest.mark.asyncio
+async def test_speculative_estimate_recomputed_when_inputs_differ():
+    metrics.reset()
+    extracted = PropertyContext(material_cost_band="unknown", labour_rate_band="unknown", property_type="detached")
+    pipeline = make_pipeline(extracted)
+
+    context, estimates = await pipeline._speculative_context_and_estimates([], {"job_type": "roof_repair"})
+
+    assert estimates["property_type"] == "detached"
+    assert metrics.counters["speculative_estimation.misses"] == 1
+
+@pytest.mark.asyncio
+async def test_speculative_mode_extracts_once():
+    extracted = PropertyContext(material_cost_band="unknown", labour_rate_band="unknown", property_type="terraced")
+    pipeline = make_pipeline(extracted)
+
+    await pipeline._speculative_context_and_estimates([], {"job_type": "roof_repair", "address": "1 High St"})
+
+    optimizer = pipeline.optimizer
+    assert optimizer.extractor.calls == 1
+    assert len(optimizer.received) == 2
+    assert optimizer.received[0] is optimizer.received[1] is not None
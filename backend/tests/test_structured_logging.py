@@ -0,0 +1,79 @@
+import io
+import json
+import logging
+import queue
+import pytest
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.structured_logging import (
+    NonBlockingQueueHandler, RateLimitFilter, SamplingFilter, configure_logging, current_bid_id
+)
+
+logger = logging.getLogger("app.tests.logging")
+
+@pytest.fixture
+def log_output(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_RATE_PER_SECOND", 0.001)
+    monkeypatch.setattr(settings, "LOG_BURST", 2)
+    stream = io.StringIO()
+    root = logging.getLogger()
+    level = root.level
+    listener = configure_logging(stream=stream)
+    yield lambda: (listener.stop(), [json.loads(line) for line in stream.getvalue().splitlines()])[1]
+    for handler in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+def test_json_records_carry_bid_id_and_extra_fields(log_output):
+    token = current_bid_id.set("bid-42")
+    try:
+        logger.info("Market rate search returned %d results", 7, extra={"query": "London roof"})
+    finally:
+        current_bid_id.reset(token)
+    try:
+        raise ValueError("bad estimate")
+    except ValueError:
+        logger.exception("Estimation failed")
+
+    first, second = log_output()
+    assert first["message"] == "Market rate search returned 7 results"
+    assert first["bid_id"] == "bid-42" and first["query"] == "London roof" and first["level"] == "INFO"
+    assert "bid_id" not in second and "ValueError: bad estimate" in second["exc_info"]
+
+def test_noisy_call_site_is_rate_limited(log_output):
+    metrics.reset()
+    for i in range(5):
+        logger.info("Noisy %d", i)
+    logger.warning("Other site")
+    records = log_output()
+    assert [r["message"] for r in records] == ["Noisy 0", "Noisy 1", "Other site"]
+    assert metrics.counters["logging.rate_limited"] == 3
+
+def test_rate_limited_site_reports_suppressed_count():
+    limiter = RateLimitFilter(rate_per_second=1000, burst=1)
+    record = lambda: logging.LogRecord("x", logging.INFO, "f.py", 10, "m", None, None)
+    assert limiter.filter(record())
+    assert not limiter.filter(record())
+    limiter._sites[("f.py", 10)][0].tokens = 1
+    passed = record()
+    assert limiter.filter(passed) and passed.suppressed == 1
+
+def test_warnings_are_never_rate_limited():
+    limiter = RateLimitFilter(rate_per_second=1000, burst=1)
+    record = lambda level: logging.LogRecord("x", level, "f.py", 10, "m", None, None)
+    assert limiter.filter(record(logging.INFO))
+    assert not limiter.filter(record(logging.INFO))
+    assert limiter.filter(record(logging.WARNING)) and limiter.filter(record(logging.ERROR))
+
+def test_sampling_keeps_warnings():
+    sampler = SamplingFilter({"noisy": 0.0})
+    assert not sampler.filter(logging.LogRecord("noisy", logging.INFO, "f.py", 1, "m", None, None))
+    assert sampler.filter(logging.LogRecord("noisy", logging.WARNING, "f.py", 1, "m", None, None))
+    assert sampler.filter(logging.LogRecord("other", logging.DEBUG, "f.py", 1, "m", None, None))
+
+def test_full_queue_drops_instead_of_blocking():
+    metrics.reset()
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    for _ in range(3):
+        handler.handle(logging.LogRecord("x", logging.INFO, "f.py", 1, "m", None, None))
+    assert metrics.counters["logging.dropped"] == 2
@@ -0,0 +1,53 @@
+import jwt
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services import livekit_client
+from app.services.livekit_client import LiveKitClient
+from app.services.token_service import TokenService
+
+@pytest.fixture(autouse=True)
+def livekit_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LIVEKIT_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "LIVEKIT_API_SECRET", "test-secret-test-secret-test-secret")
+    monkeypatch.setattr(settings, "LIVEKIT_URL", "wss://test.invalid")
+
+def decode(token):
+    claims = jwt.decode(token, options={"verify_signature": False})
+    claims.pop("nbf"), claims.pop("exp")
+    return claims
+
+def test_fallback_jwt_matches_sdk_claims():
+    client = LiveKitClient()
+    sdk_claims = decode(client.create_token("room-1", "alice"))
+
+    with patch.object(livekit_client, "load_livekit_sdk", return_value=None):
+        fallback_claims = decode(client.create_token("room-1", "alice"))
+
+    assert fallback_claims == sdk_claims
+
+def test_token_reused_until_refresh_margin():
+    service = TokenService(LiveKitClient(), ttl_seconds=3600, refresh_margin=300)
+    first, expires_at = service.get_token("room-1", "alice")
+    second, _ = service.get_token("room-1", "alice")
+    assert first == second
+    assert service.hits == 1 and service.misses == 1
+
+    # Different grants are a different cache entry
+    service.get_token("room-1", "alice", grants={"can_publish": False})
+    assert service.misses == 2
+
+    with patch("app.services.token_service.time.time", return_value=expires_at - 60):
+        service.get_token("room-1", "alice")
+    assert service.misses == 3
+
+def test_batch_mints_each_participant_once():
+    service = TokenService(LiveKitClient())
+    tokens = service.get_tokens("room-1", ["alice", "bob", "alice"])
+    assert set(tokens) == {"alice", "bob"}
+    assert service.misses == 2
+
+def test_livekit_client_requires_configuration(monkeypatch):
+    monkeypatch.setattr(settings, "LIVEKIT_URL", None)
+    with pytest.raises(RuntimeError):
+        LiveKitClient()
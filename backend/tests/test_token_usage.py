@@ -0,0 +1,37 @@
+import pytest
+from app.config import settings
+from app.models.schemas import PropertyContext
+from app.utils.metrics import metrics
+from app.utils.prompt_format import compact_json
+from app.services.property_context_cache import property_context_cache
+from app.utils.token_usage import bid_token_usage, call_site_report, format_report
+from tests.factories import FakeOpenAI, FakeValyuSDK, REQUEST, make_pipeline
+
+def test_compact_json_drops_nulls_and_defaults():
+    context = PropertyContext(material_cost_band="medium", labour_rate_band="unknown", property_year_built=1905, detected_labour_rate=55.0)
+
+    assert compact_json(context) == '{"property_year_built":1905,"material_cost_band":"medium","labour_rate_band":"unknown","detected_labour_rate":55}'
+    assert compact_json({"notes": None, "known_issues": [], "job_type": "roof_repair"}) == '{"job_type":"roof_repair"}'
+
+@pytest.mark.asyncio
+async def test_bid_tokens_accounted_per_call_site(monkeypatch):
+    monkeypatch.setattr(settings, "CASSETTE_RECORD", False)
+    metrics.reset()
+    bid_token_usage.clear()
+    property_context_cache.clear()
+    pipeline = make_pipeline()
+    fake_openai = FakeOpenAI()
+    pipeline.valyu.valyu_client = FakeValyuSDK()
+    pipeline.optimizer.client = fake_openai
+    pipeline.llm.client = fake_openai
+
+    response = await pipeline.run_full_bid(REQUEST)
+
+    ledger = bid_token_usage.get(response.bid_id)
+    assert ledger.totals() == {"calls": fake_openai.calls, "prompt_tokens": 10 * fake_openai.calls, "completion_tokens": 5 * fake_openai.calls}
+    assert ledger.call_sites["followups"]["calls"] == 3
+
+    rows = call_site_report()
+    assert rows[0]["call_site"] == "followups"
+    assert {row["call_site"] for row in rows} == {"extraction", "estimation", "dossier", "explanation", "proposal", "followups"}
+    assert "followups" in format_report(rows)
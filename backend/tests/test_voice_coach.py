@@ -0,0 +1,142 @@
+import json
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.entities import BidSession, bid_store
+from app.models.schemas import BidResponse, PropertyContext, PricingOutput, PricingBands, FollowUpScripts
+from app.routers.voice import get_llm
+from app.services.coaching_session import CoachingSession, CoachingSessionStore, coaching_sessions
+
+client = TestClient(app)
+
+def store_test_bid(bid_id: str):
+    bid_store[bid_id] = BidSession(id=bid_id, data=BidResponse(
+        bid_id=bid_id,
+        property_context=PropertyContext(material_cost_band="medium", labour_rate_band="medium"),
+        pricing=PricingOutput(
+            internal_cost_estimate=1000.0,
+            price_bands=PricingBands(win_at_all_costs=1176.47, balanced=1250.0, premium=1538.46),
+            min_recommended_price=1176.47
+        ),
+        dossier_text="",
+        pricing_explanation="",
+        proposal_draft="",
+        followup=FollowUpScripts(email_d2="", email_d7="", price_objection_script="")
+    ))
+
+class FakeStreamingLLM:
+    def __init__(self):
+        self.seen_messages = []
+
+    async def stream_coaching(self, bid_context, message, usage=None):
+        for token in ["Hold ", "your ", "price."]:
+            yield token
+        if usage is not None:
+            usage.update(prompt_tokens=40, completion_tokens=4)
+
+    async def stream_chat(self, messages, usage=None):
+        self.seen_messages.append(messages)
+        for token in ["Hold ", "your ", "price."]:
+            yield token
+
+def test_coach_stream_forwards_tokens_and_reports_ttft():
+    store_test_bid("stream-bid")
+    app.dependency_overrides[get_llm] = lambda: FakeStreamingLLM()
+    try:
+        response = client.post("/voice/coach/stream", json={"bid_id": "stream-bid", "message": "Too expensive"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [block for block in response.text.split("\n\n") if block]
+    tokens = [json.loads(e.split("data: ", 1)[1])["token"] for e in events if e.startswith("event: token")]
+    assert "".join(tokens) == "Hold your price."
+
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert done["chunks"] == 3
+    assert done["completion_tokens"] == 4 and not done["usage_estimated"]
+    assert done["ttft_ms"] is not None
+
+def test_coach_stream_unknown_bid_404():
+    response = client.post("/voice/coach/stream", json={"bid_id": "missing", "message": "hi"})
+    assert response.status_code == 404
+
+def test_coach_websocket_keeps_memory_and_reports_turn_stats():
+    store_test_bid("ws-bid")
+    coaching_sessions.pop("ws-bid", None)
+    llm = FakeStreamingLLM()
+    app.dependency_overrides[get_llm] = lambda: llm
+    try:
+        with client.websocket_connect("/voice/coach/ws/ws-bid") as ws:
+            for message in ["They want 10% off", "They mentioned another quote"]:
+                ws.send_text(message)
+                while True:
+                    frame = ws.receive_json()
+                    if frame["type"] == "done":
+                        break
+    finally:
+        app.dependency_overrides.clear()
+
+    assert frame["reply"] == "Hold your price."
+    assert frame["turn"] == 2
+    assert frame["prompt_tokens"] > 0 and frame["latency_ms"] >= 0
+
+    first, second = llm.seen_messages
+    # Static system prompt stays identical and first; history carries the earlier exchange
+    assert first[0] == second[0]
+    assert "balanced £1,250" in first[0]["content"]
+    assert [m["content"] for m in second[1:]] == ["They want 10% off", "Hold your price.", "They mentioned another quote"]
+
+def test_coaching_memory_is_token_bounded():
+    store_test_bid("memory-bid")
+    session = CoachingSession(bid_store["memory-bid"].data, memory_tokens=50)
+    for i in range(10):
+        session.record_turn(f"message {i} " + "x" * 80, "reply " + "y" * 80)
+
+    # One exchange is 22 + 21 estimated tokens; two would exceed the budget
+    assert [m["content"][:9] for m in session.history] == ["message 9", "reply yyy"]
+    assert session.history_tokens == 43
+    assert session.turns == 10
+
+class FailingStreamingLLM(FakeStreamingLLM):
+    async def stream_chat(self, messages, usage=None):
+        self.seen_messages.append(messages)
+        if len(self.seen_messages) == 1:
+            yield "[ERROR] Failed to generate text: timeout"
+        else:
+            yield "Hold your price."
+
+def test_coach_websocket_does_not_remember_failed_turns():
+    store_test_bid("ws-fail-bid")
+    coaching_sessions.pop("ws-fail-bid", None)
+    llm = FailingStreamingLLM()
+    app.dependency_overrides[get_llm] = lambda: llm
+    try:
+        with client.websocket_connect("/voice/coach/ws/ws-fail-bid") as ws:
+            frames = []
+            for message in ["They want 10% off", "They want 10% off"]:
+                ws.send_text(message)
+                while (frame := ws.receive_json())["type"] != "done":
+                    pass
+                frames.append(frame)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert frames[0]["failed"] and frames[0]["turn"] == 0
+    assert not frames[1]["failed"] and frames[1]["turn"] == 1
+    assert [m["content"] for m in llm.seen_messages[1][1:]] == ["They want 10% off"]
+
+def test_coaching_sessions_are_bounded_and_expire_when_idle():
+    store_test_bid("memory-bid")
+    store = CoachingSessionStore(max_entries=2, idle_seconds=60)
+    for bid_id in ["a", "b", "c"]:
+        store.set(bid_id, CoachingSession(bid_store["memory-bid"].data))
+
+    assert store.get("a") is None
+    assert len(store) == 2
+
+    store.get("b").last_used -= timedelta(minutes=5)
+    assert store.get("b") is None
+    assert store.get("c") is not None
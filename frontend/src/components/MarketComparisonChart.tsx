@@ -31,6 +31,24 @@ function erf(x: number) {
     return 2 * sum / Math.sqrt(Math.PI);
 }
 
+// Percentile of a price by linear interpolation between known percentile points
+function empiricalPercentile(price: number, percentiles: Record<string, number>, lower: number, upper: number) {
+    const points: [number, number][] = [
+        [0, lower],
+        ...Object.entries(percentiles).map(([key, value]): [number, number] => [Number(key.slice(1)), value]),
+        [100, upper],
+    ].sort((a, b) => a[0] - b[0]);
+    if (price <= points[0][1]) return 0;
+    for (let i = 1; i < points.length; i++) {
+        const [p0, v0] = points[i - 1];
+        const [p1, v1] = points[i];
+        if (price <= v1) {
+            return Math.round(v1 === v0 ? p1 : p0 + ((price - v0) / (v1 - v0)) * (p1 - p0));
+        }
+    }
+    return 100;
+}
+
 const MarketComparisonChart = ({ marketStats, pricingBands, selectedPrice }: MarketComparisonChartProps) => {
     const data = useMemo(() => {
         const { mean, std_dev, lower_bound, upper_bound } = marketStats;
@@ -47,10 +65,17 @@ const MarketComparisonChart = ({ marketStats, pricingBands, selectedPrice }: Mar
         return points;
     }, [marketStats]);
 
-    // Calculate percentile
+    // Calculate percentile: empirical when historical percentiles are available
     const zScore = (selectedPrice - marketStats.mean) / marketStats.std_dev;
     // Approximation of CDF for normal distribution
-    const percentile = Math.round((0.5 * (1 + erf(zScore / Math.sqrt(2)))) * 100);
+    const percentile = marketStats.percentiles
+        ? empiricalPercentile(selectedPrice, marketStats.percentiles, marketStats.lower_bound, marketStats.upper_bound)
+        : Math.round((0.5 * (1 + erf(zScore / Math.sqrt(2)))) * 100);
+    const source = marketStats.source === 'market_search'
+        ? `Source: ${marketStats.sample_size} competitor prices found via Valyu AI`
+        : marketStats.source === 'historical'
+            ? `Source: ${marketStats.sample_size} of our earlier bids${marketStats.area ? ` in ${marketStats.area}` : ''}`
+            : 'Source: Aggregated local market data via Valyu AI';
 
     const isCheaper = selectedPrice < marketStats.mean;
     const diffPercent = Math.abs(Math.round(((selectedPrice - marketStats.mean) / marketStats.mean) * 100));
@@ -141,7 +166,7 @@ const MarketComparisonChart = ({ marketStats, pricingBands, selectedPrice }: Mar
                 </div>
                 <div className="mt-4 text-sm text-muted-foreground text-center space-y-1">
                     <p>Your selected price is higher than {percentile}% of estimated market bids.</p>
-                    <p className="text-xs italic">Source: Aggregated local market data via Valyu AI</p>
+                    <p className="text-xs italic">{source}</p>
                 </div>
             </CardContent>
         </Card>
@@ -0,0 +1,125 @@
+// Types mirror backend/app/models/schemas.py
+
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+
+export type JobType = "roof_repair" | "bathroom_remodel" | "electrical_rewire" | "general_renovation" | "other";
+export type Urgency = "low" | "medium" | "high" | "emergency";
+
+export interface CreateBidRequest {
+  address: string;
+  region: string;
+  job_type: JobType;
+  job_description: string;
+  scope_of_work?: string;
+  known_issues?: string[];
+  complications?: string[];
+  urgency?: Urgency;
+  lead_channel?: string;
+  notes?: string;
+  desired_margin_percent: number;
+  deadline_seconds?: number;
+}
+
+export interface PropertyContext {
+  property_year_built?: number | null;
+  year_built_confidence?: "exact" | "estimated" | "inferred" | "unknown" | null;
+  architectural_period?: string | null;
+  property_type?: "flat" | "terraced" | "semi_detached" | "detached" | "bungalow" | "other" | null;
+  property_size_sqm?: number | null;
+  number_of_bedrooms?: number | null;
+  number_of_floors?: number | null;
+  last_sale_price?: number | null;
+  last_sale_date?: string | null;
+  ownership_duration_years?: number | null;
+  neighbourhood_price_median?: number | null;
+  neighbourhood_price_trend?: string | null;
+  estimated_value?: number | null;
+  zoning?: string | null;
+  permits: Record<string, string>[];
+  likely_risk_flags: string[];
+  material_cost_band: string;
+  labour_rate_band: string;
+  detected_labour_rate?: number | null;
+}
+
+export interface PricingBands {
+  win_at_all_costs: number;
+  balanced: number;
+  premium: number;
+}
+
+export interface MarketStats {
+  mean: number;
+  std_dev: number;
+  lower_bound: number;
+  upper_bound: number;
+  // "market_search": competitor prices from the market search; "historical": our earlier bids
+  source: "simulated" | "market_search" | "historical";
+  percentiles?: Record<string, number> | null;  // Balanced price at p5 ... p95
+  sample_size?: number | null;
+  area?: string | null;  // Postcode area, or null when aggregated across all areas
+}
+
+export interface MaterialLineItem {
+  item: string;
+  quantity: number;
+  unit: string;
+  unit_cost: number;
+  total_cost: number;
+}
+
+export interface LabourTask {
+  task: string;
+  hours: number;
+  workers: number;
+  skill_level?: string | null;
+}
+
+export interface PricingOutput {
+  internal_cost_estimate: number;
+  price_bands: PricingBands;
+  min_recommended_price: number;
+  market_stats?: MarketStats | null;
+  materials_breakdown?: MaterialLineItem[] | null;
+  labour_breakdown?: LabourTask[] | null;
+  total_materials_cost?: number | null;
+  total_labour_cost?: number | null;
+}
+
+export interface FollowUpScripts {
+  email_d2: string;
+  email_d7: string;
+  price_objection_script: string;
+}
+
+export interface BidResponse {
+  bid_id: string;
+  property_context: PropertyContext;
+  pricing: PricingOutput;
+  dossier_text: string;
+  pricing_explanation: string;
+  proposal_draft: string;
+  followup: FollowUpScripts;
+  raw_valyu_results: Record<string, unknown>[];
+  degraded_stages: string[];
+  revision: number;
+  materials_breakdown?: MaterialLineItem[] | null;
+  labour_breakdown?: LabourTask[] | null;
+  total_materials_cost?: number | null;
+  total_labour_cost?: number | null;
+}
+
+export const api = {
+  async createBid(request: CreateBidRequest): Promise<BidResponse> {
+    const response = await fetch(`${API_BASE_URL}/bids`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(request),
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => null);
+      throw new Error(error?.detail || `Failed to create bid (${response.status})`);
+    }
+    return response.json();
+  },
+};